@@ -1 +1 @@
-__all__ = ["matrix", "pcd", "points", "stl", "vector"]
+__all__ = ["io", "matrix", "pcd", "points", "stl", "vector"]
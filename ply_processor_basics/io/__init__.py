@@ -0,0 +1,6 @@
+from .as_points import as_points as as_points
+from .ply_chunks import PlyChunks as PlyChunks
+from .read_ply import read_ply as read_ply
+from .write_ply import write_ply as write_ply
+
+__all__ = ["as_points", "PlyChunks", "read_ply", "write_ply"]
@@ -0,0 +1,36 @@
+from typing import Sequence
+
+from numpy.lib import recfunctions
+from numpy.lib.stride_tricks import as_strided
+from numpy.typing import NDArray
+
+
+def as_points(elements: NDArray, fields: Sequence[str] = ("x", "y", "z")) -> NDArray:
+    """
+    構造化配列の指定フィールドを点群(N, D)として取り出す
+
+    フィールドが同じ型で連続して並んでいる場合(PLYの x, y, z など)は、コピーせずに元の配列(np.memmap を含む)の
+    ビューを返す。そうでない場合はコピーを返す。
+
+    :param elements: 構造化配列(N, ) (read_plyの戻り値など)
+    :param fields: 取り出すフィールド名
+    :return: 点群(N, D)
+    """
+    names = list(fields)
+    if elements.dtype.fields is None:
+        raise ValueError("elements must be a structured array.")
+    field_types = [elements.dtype.fields[name] for name in names]
+    first_type, first_offset = field_types[0][0], field_types[0][1]
+    contiguous = all(
+        type_ == first_type and offset == first_offset + i * first_type.itemsize
+        for i, (type_, offset, *_) in enumerate(field_types)
+    )
+    if contiguous and elements.ndim == 1:
+        first_field = elements[names[0]]
+        return as_strided(
+            first_field,
+            shape=(len(elements), len(names)),
+            strides=(first_field.strides[0], first_type.itemsize),
+        )
+    points: NDArray = recfunctions.structured_to_unstructured(elements[names])
+    return points
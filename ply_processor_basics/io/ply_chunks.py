@@ -0,0 +1,68 @@
+from itertools import islice
+from typing import Iterator, Sequence
+
+import numpy as np
+from numpy.typing import NDArray
+
+from .as_points import as_points
+from .ply_header import read_ply_header
+from .read_ply import read_ply
+
+
+class PlyChunks:
+    """
+    PLYファイルの点群を chunk_size 点ずつ読み込む
+
+    反復するたびにファイルを先頭から読み直し、点群(M, D) (M <= chunk_size) を順に返す。
+    同時にメモリに載るのは1チャンク分のみのため、メモリに収まらない点群も扱える。
+    何度でも反復できるため、複数回の走査が必要な処理(points.stream.clip_by_plane など)にもそのまま渡せる。
+
+    :param path: PLYファイルのパス
+    :param chunk_size: 1チャンクの点数
+    :param element: 読み込む要素名
+    :param fields: 点の座標とするフィールド名
+    """
+
+    def __init__(
+        self,
+        path: str,
+        chunk_size: int = 1 << 20,
+        element: str = "vertex",
+        fields: Sequence[str] = ("x", "y", "z"),
+    ):
+        if chunk_size <= 0:
+            raise ValueError("chunk_size must be positive.")
+        self.path = path
+        self.chunk_size = chunk_size
+        self.element = element
+        self.fields = tuple(fields)
+
+        with open(path, "rb") as f:
+            self.header = read_ply_header(f)
+        self.target, _, self.skip_rows = self.header.locate(element)
+
+    def __len__(self) -> int:
+        return self.target.length
+
+    def __iter__(self) -> Iterator[NDArray]:
+        if self.header.format == "ascii":
+            yield from self._iter_ascii()
+            return
+        elements = read_ply(self.path, self.element)
+        for start in range(0, len(elements), self.chunk_size):
+            # メモリマップのビューをコピーし、ファイルのページを保持しない
+            yield np.array(as_points(elements[start : start + self.chunk_size], self.fields))
+
+    def _iter_ascii(self) -> Iterator[NDArray]:
+        dtype = self.header.dtype(self.target)
+        with open(self.path, "rb") as f:
+            f.seek(self.header.size)
+            for _ in islice(f, self.skip_rows):
+                pass
+            remaining = self.target.length
+            while remaining > 0:
+                lines = list(islice(f, min(self.chunk_size, remaining)))
+                if len(lines) == 0:
+                    raise ValueError("PLY file ends before the element.")
+                remaining -= len(lines)
+                yield as_points(np.loadtxt(lines, dtype=dtype, ndmin=1), self.fields)
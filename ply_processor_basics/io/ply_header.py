@@ -0,0 +1,123 @@
+from typing import BinaryIO, List, NamedTuple, Tuple
+
+import numpy as np
+
+# PLYの型名とNumPyの型の対応
+PLY_TYPES = {
+    "char": "i1",
+    "int8": "i1",
+    "uchar": "u1",
+    "uint8": "u1",
+    "short": "i2",
+    "int16": "i2",
+    "ushort": "u2",
+    "uint16": "u2",
+    "int": "i4",
+    "int32": "i4",
+    "uint": "u4",
+    "uint32": "u4",
+    "float": "f4",
+    "float32": "f4",
+    "double": "f8",
+    "float64": "f8",
+}
+
+# NumPyの型とPLYの型名の対応(書き出し用)
+NUMPY_TYPES = {
+    "i1": "char",
+    "u1": "uchar",
+    "i2": "short",
+    "u2": "ushort",
+    "i4": "int",
+    "u4": "uint",
+    "f4": "float",
+    "f8": "double",
+}
+
+FORMATS = {"ascii": "", "binary_little_endian": "<", "binary_big_endian": ">"}
+
+
+class PlyElement(NamedTuple):
+    name: str
+    length: int
+    # 固定長のプロパティの (名前, NumPy型)
+    properties: List[Tuple[str, str]]
+    has_list: bool
+
+
+class PlyHeader(NamedTuple):
+    format: str
+    elements: List[PlyElement]
+    # ヘッダのバイト数(本体の開始位置)
+    size: int
+
+    def dtype(self, element: PlyElement) -> np.dtype:
+        """
+        要素の1行分の構造化型, ASCIIの場合はネイティブのバイト順
+        """
+        byteorder = FORMATS[self.format] or "="
+        return np.dtype([(name, byteorder + type_) for name, type_ in element.properties])
+
+    def locate(self, name: str) -> Tuple[PlyElement, int, int]:
+        """
+        要素の本体の位置を求める
+
+        :param name: 要素名
+        :return: 要素, 本体の開始バイト位置(バイナリ形式), 本体の開始行(ASCII形式, ヘッダの次の行を0とする)
+        """
+        offset = self.size
+        skip_rows = 0
+        for target in self.elements:
+            if target.name == name:
+                if target.has_list:
+                    raise ValueError(f"Element '{name}' has list properties.")
+                return target, offset, skip_rows
+            if target.has_list:
+                raise ValueError(f"Cannot locate element '{name}' after list property element '{target.name}'.")
+            offset += target.length * self.dtype(target).itemsize
+            skip_rows += target.length
+        raise ValueError(f"PLY file has no element '{name}'.")
+
+
+def read_ply_header(f: BinaryIO) -> PlyHeader:
+    """
+    PLYファイルのヘッダを読む
+
+    :param f: 先頭から読み込むバイナリファイル
+    :return: ヘッダ
+    """
+    if f.readline().strip() != b"ply":
+        raise ValueError("Not a PLY file.")
+
+    format_ = ""
+    elements: List[PlyElement] = []
+    while True:
+        line = f.readline()
+        if not line:
+            raise ValueError("PLY header is not terminated by end_header.")
+        words = line.decode("ascii").split()
+        if len(words) == 0 or words[0] in ("comment", "obj_info"):
+            continue
+        if words[0] == "end_header":
+            break
+        if words[0] == "format":
+            if words[1] not in FORMATS:
+                raise ValueError(f"Unknown PLY format: {words[1]}")
+            format_ = words[1]
+        elif words[0] == "element":
+            elements.append(PlyElement(words[1], int(words[2]), [], False))
+        elif words[0] == "property":
+            if len(elements) == 0:
+                raise ValueError("PLY property is defined before element.")
+            if words[1] == "list":
+                elements[-1] = elements[-1]._replace(has_list=True)
+            elif words[1] in PLY_TYPES:
+                elements[-1].properties.append((words[2], PLY_TYPES[words[1]]))
+            else:
+                raise ValueError(f"Unknown PLY property type: {words[1]}")
+        else:
+            raise ValueError(f"Unknown PLY header line: {line!r}")
+
+    if format_ == "":
+        raise ValueError("PLY format is not specified.")
+    return PlyHeader(format_, elements, f.tell())
@@ -0,0 +1,32 @@
+import numpy as np
+from numpy.typing import NDArray
+
+from .ply_header import read_ply_header
+
+
+def read_ply(path: str, element: str = "vertex", mmap: bool = True) -> NDArray:
+    """
+    PLYファイルの要素を構造化配列として読み込む
+
+    バイナリ形式(リトルエンディアン/ビッグエンディアン)はファイルを読み取り専用の np.memmap として開くため、
+    ファイル全体をメモリに読み込まず、コピーも行わない。ASCII形式は読み込んだ配列を返す。
+
+    :param path: PLYファイルのパス
+    :param element: 読み込む要素名
+    :param mmap: バイナリ形式でメモリマップを使うかどうか, Falseの場合はメモリに読み込む
+    :return: 要素の構造化配列(N, ) (例: vertex["x"])
+    """
+    with open(path, "rb") as f:
+        header = read_ply_header(f)
+
+        target, offset, skip_rows = header.locate(element)
+        dtype = header.dtype(target)
+        if header.format == "ascii":
+            # 要素の1要素は1行
+            f.seek(header.size)
+            rows: NDArray = np.loadtxt(f, dtype=dtype, skiprows=skip_rows, max_rows=target.length, ndmin=1)
+            return rows
+
+    if mmap:
+        return np.memmap(path, dtype=dtype, mode="r", offset=offset, shape=(target.length,))
+    return np.fromfile(path, dtype=dtype, count=target.length, offset=offset)
@@ -0,0 +1,69 @@
+from typing import Literal, Optional
+
+import numpy as np
+from numpy.typing import NDArray
+
+from .ply_header import FORMATS, NUMPY_TYPES
+
+
+def write_ply(
+    path: str,
+    elements: NDArray,
+    format: Literal["binary_little_endian", "binary_big_endian", "ascii"] = "binary_little_endian",
+    element: str = "vertex",
+    comment: Optional[str] = None,
+    chunk_size: int = 1 << 20,
+) -> None:
+    """
+    構造化配列をPLYファイルに書き出す
+
+    バイナリ形式は chunk_size 要素ずつバイト順を揃えてそのまま書き出すため、np.memmap の入力でも全体をメモリに展開しない。
+
+    :param path: PLYファイルのパス
+    :param elements: 要素の構造化配列(N, ), または点群(N, 3) (x, y, z として書き出す)
+    :param format: PLYの形式
+    :param element: 要素名
+    :param comment: ヘッダに書き込むコメント
+    :param chunk_size: 一度に書き出す要素の数
+    """
+    if format not in FORMATS:
+        raise ValueError(f"Unknown PLY format: {format}")
+    # 点群(N, 3)は全体を構造化配列に変換せず、書き出すチャンクごとに x, y, z のフィールドへ詰める
+    is_points = elements.dtype.names is None
+    if is_points:
+        if elements.ndim != 2 or elements.shape[1] != 3:
+            raise ValueError("elements must be a structured array or a (N, 3) array.")
+        element_dtype = np.dtype([("x", elements.dtype), ("y", elements.dtype), ("z", elements.dtype)])
+    else:
+        element_dtype = elements.dtype
+
+    byteorder = FORMATS[format] or "="
+    names = element_dtype.names or ()
+    fields = []
+    lines = ["ply", f"format {format} 1.0"]
+    if comment is not None:
+        lines.append(f"comment {comment}")
+    lines.append(f"element {element} {len(elements)}")
+    for name in names:
+        type_ = element_dtype[name]
+        if type_.shape != () or type_.str[1:] not in NUMPY_TYPES:
+            raise ValueError(f"Unsupported field type for PLY: {name} {type_}")
+        lines.append(f"property {NUMPY_TYPES[type_.str[1:]]} {name}")
+        fields.append((name, byteorder + type_.str[1:]))
+    lines.append("end_header")
+    dtype = np.dtype(fields)
+
+    with open(path, "wb") as f:
+        f.write(("\n".join(lines) + "\n").encode("ascii"))
+        for start in range(0, len(elements), chunk_size):
+            chunk = elements[start : start + chunk_size]
+            if is_points:
+                points = chunk
+                chunk = np.empty(len(points), dtype=element_dtype)
+                chunk["x"], chunk["y"], chunk["z"] = points.T
+            if format == "ascii":
+                formats = ["%.17g" if dtype[name].kind == "f" else "%d" for name in names]
+                np.savetxt(f, chunk, fmt=formats)
+            else:
+                # 同じ型でフィールドの並びとバイト順を揃える(packedな構造に詰め直す)
+                np.asarray(chunk.astype(dtype, copy=False)).tofile(f)
@@ -1,32 +1,100 @@
+import math
+from typing import List
+
 import numpy as np
 from numpy.typing import NDArray
-from scipy.spatial.transform import Rotation
-
-from ply_processor_basics.vector import normalize
 
 
-def get_rotation_from_vectors(vec1: NDArray[np.float32], vec2: NDArray[np.float32]):
+def get_rotation_from_vectors(vec1: NDArray[np.float32], vec2: NDArray[np.float32]) -> NDArray[np.floating]:
     """_summary_
     2つのベクトルから回転行列を求める関数
 
+    ロドリゲスの回転公式で閉じた形で求める。(K, 3) のベクトルの組を与えると K 個の回転行列を一括で求める。
+    vec1, vec2 が同じ向きの場合は単位行列、逆向きの場合は vec1 に垂直な軸まわりの180度回転を返す。
+
     Args:
-        vec1: The vector from.
-        vec2: The vector to.
+        vec1: The vector from. (3,) or (K, 3), 4成分以上の場合は先頭3成分を用いる
+        vec2: The vector to. (3,) or (K, 3)
 
     Returns:
-        The rotation matrix from vec1 to vec2.
+        The rotation matrix from vec1 to vec2. (3, 3) or (K, 3, 3)
     """
-    # vec1 -> vec2 の回転ベクトルを導出
-    a = normalize(vec1[:3])
-    b = normalize(vec2[:3])
-    if np.allclose(a, b):
+    a = np.asarray(vec1, dtype=np.float64)[..., :3]
+    b = np.asarray(vec2, dtype=np.float64)[..., :3]
+    if a.ndim == 1 and b.ndim == 1:
+        return _get_rotation(a.tolist(), b.tolist())
+    a, b = np.broadcast_arrays(np.atleast_2d(a), np.atleast_2d(b))
+
+    norm_a = np.linalg.norm(a, axis=1)
+    norm_b = np.linalg.norm(b, axis=1)
+    if np.any(norm_a == 0) or np.any(norm_b == 0):
+        raise ZeroDivisionError("The norm of the vector is zero.")
+    a = a / norm_a[:, np.newaxis]
+    b = b / norm_b[:, np.newaxis]
+
+    # vec1 -> vec2 の回転軸 k = a x b / |a x b|, cosθ = a・b, sinθ = |a x b|
+    # R = cosθ I + sinθ [k]x + (1 - cosθ) k k^T
+    axes = np.cross(a, b)
+    sines = np.linalg.norm(axes, axis=1)
+    cosines = np.einsum("ij,ij->i", a, b)
+    parallel = np.all(np.abs(a - b) <= 1e-8 + 1e-5 * np.abs(b), axis=1)
+    antiparallel = np.all(np.abs(a + b) <= 1e-8 + 1e-5 * np.abs(b), axis=1)
+
+    # 逆向きの場合は vec1 に垂直な軸(vec1 がZ軸方向ならX軸, それ以外は Z x vec1)まわりに180度回転する
+    z_aligned = np.all(np.abs(np.abs(a) - [0, 0, 1]) <= 1e-8 + 1e-5 * np.array([0, 0, 1]), axis=1)
+    perpendicular = np.where(z_aligned[:, np.newaxis], [1.0, 0.0, 0.0], np.cross([0.0, 0.0, 1.0], a))
+    axes = np.where(antiparallel[:, np.newaxis], perpendicular, axes)
+    sines = np.where(antiparallel, 0.0, sines)
+    cosines = np.where(antiparallel, -1.0, cosines)
+
+    valid = sines > 0
+    axes = axes / np.where(valid | antiparallel, np.linalg.norm(axes, axis=1), 1.0)[:, np.newaxis]
+    skews = np.zeros((len(axes), 3, 3))
+    skews[:, 0, 1], skews[:, 0, 2], skews[:, 1, 2] = -axes[:, 2], axes[:, 1], -axes[:, 0]
+    skews -= skews.transpose(0, 2, 1)
+    rotations: NDArray[np.floating] = (
+        cosines[:, np.newaxis, np.newaxis] * np.eye(3)
+        + sines[:, np.newaxis, np.newaxis] * skews
+        + (1 - cosines)[:, np.newaxis, np.newaxis] * axes[:, :, np.newaxis] * axes[:, np.newaxis, :]
+    )
+    rotations[parallel] = np.eye(3)
+    return rotations
+
+
+def _get_rotation(a: List[float], b: List[float]) -> NDArray[np.floating]:
+    """
+    1組のベクトルの回転行列(3, 3), 小さな配列の演算を避けてPythonの浮動小数点数で計算する
+    """
+    norm_a = math.sqrt(a[0] * a[0] + a[1] * a[1] + a[2] * a[2])
+    norm_b = math.sqrt(b[0] * b[0] + b[1] * b[1] + b[2] * b[2])
+    if norm_a == 0 or norm_b == 0:
+        raise ZeroDivisionError("The norm of the vector is zero.")
+    ax, ay, az = a[0] / norm_a, a[1] / norm_a, a[2] / norm_a
+    bx, by, bz = b[0] / norm_b, b[1] / norm_b, b[2] / norm_b
+
+    def close(x: float, y: float) -> bool:
+        # np.allclose と同じ判定
+        return abs(x - y) <= 1e-8 + 1e-5 * abs(y)
+
+    if close(ax, bx) and close(ay, by) and close(az, bz):
         return np.eye(3)
-    if np.allclose(a, -b):
-        perpendicular = normalize(
-            np.array([1, 0, 0]) if np.allclose(a, [0, 0, 1]) or np.allclose(a, [0, 0, -1]) else np.cross([0, 0, 1], a)
-        )
-        return Rotation.from_rotvec(np.pi * perpendicular).as_matrix()
-    axis = normalize(np.cross(a, b))
-    angle = np.arccos(np.clip(np.dot(a, b), -1.0, 1.0))
-
-    return Rotation.from_rotvec(axis * angle).as_matrix()
+    if close(ax, -bx) and close(ay, -by) and close(az, -bz):
+        if close(ax, 0) and close(ay, 0) and close(abs(az), 1):
+            kx, ky, kz = 1.0, 0.0, 0.0
+        else:
+            kx, ky, kz = -ay, ax, 0.0
+        sine, cosine = 0.0, -1.0
+    else:
+        kx, ky, kz = ay * bz - az * by, az * bx - ax * bz, ax * by - ay * bx
+        sine, cosine = math.sqrt(kx * kx + ky * ky + kz * kz), ax * bx + ay * by + az * bz
+    norm_k = math.sqrt(kx * kx + ky * ky + kz * kz)
+    if norm_k > 0:
+        kx, ky, kz = kx / norm_k, ky / norm_k, kz / norm_k
+    c1 = 1 - cosine
+    return np.array(
+        [
+            [cosine + c1 * kx * kx, c1 * kx * ky - sine * kz, c1 * kx * kz + sine * ky],
+            [c1 * ky * kx + sine * kz, cosine + c1 * ky * ky, c1 * ky * kz - sine * kx],
+            [c1 * kz * kx - sine * ky, c1 * kz * ky + sine * kx, cosine + c1 * kz * kz],
+        ]
+    )
@@ -1,12 +1,14 @@
-from typing import Callable, List, Optional
+from typing import TYPE_CHECKING, Callable, List, Optional
 
 import numpy as np
-import open3d as o3d
 from numpy.typing import NDArray
 
+if TYPE_CHECKING:
+    import open3d as o3d
+
 
 def snapshot(
-    pcds: List[o3d.geometry.PointCloud],
+    pcds: List["o3d.geometry.PointCloud"],
     save_path: str,
     cam_front: NDArray[np.floating],
     cam_lookat: NDArray[np.floating],
@@ -24,6 +26,8 @@ def snapshot(
     :param cam_up: Up vector of the camera.
     :param cam_zoom: Zoom of the camera.
     """
+    # open3dの読み込みは時間がかかるため、使用時に読み込む
+    import open3d as o3d
 
     vis = o3d.visualization.Visualizer()
     vis.create_window(visible=False)
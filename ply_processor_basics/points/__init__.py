@@ -1,20 +1,38 @@
 from .clip_by_plane import clip_by_plane as clip_by_plane
+from .clip_by_planes import clip_by_planes as clip_by_planes
+from .clustering import grid_clustering as grid_clustering
 from .clustering import line_clustering as line_clustering
 from .clustering import plane_clustering as plane_clustering
+from .estimate_normals import estimate_normals as estimate_normals
 from .get_distances_to_line import get_distances_to_line as get_distances_to_line
+from .get_distances_to_lines import get_distances_to_lines as get_distances_to_lines
 from .get_distances_to_plane import get_distances_to_plane as get_distances_to_plane
+from .get_distances_to_planes import get_distances_to_planes as get_distances_to_planes
+from .get_nearest_plane import get_nearest_plane as get_nearest_plane
 from .get_normal_vector import get_normal_vector as get_normal_vector
+from .point_index import PointIndex as PointIndex
 from .rotate_euler import rotate_euler as rotate_euler
 from .transform_to_plane_coordinates import transform_to_plane_coordinates as transform_to_plane_coordinates
+from .voxel_downsample import voxel_downsample as voxel_downsample
 
 __all__ = [
     "clip_by_plane",
+    "clip_by_planes",
     "plane_clustering",
     "line_clustering",
-    "get_distance_to_line",
-    "get_distance_to_plane",
+    "grid_clustering",
+    "get_distances_to_line",
+    "get_distances_to_lines",
+    "get_distances_to_plane",
+    "get_distances_to_planes",
+    "get_nearest_plane",
     "get_normal_vector",
+    "estimate_normals",
+    "PointIndex",
     "rotate_euler",
     "transform_to_plane_coordinates",
-    "ransac" "convex_hull",
+    "voxel_downsample",
+    "stream",
+    "ransac",
+    "convex_hull",
 ]
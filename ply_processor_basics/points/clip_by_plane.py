@@ -1,7 +1,7 @@
 import numpy as np
 from numpy.typing import NDArray
 
-from .transform_to_plane_coordinates import transform_to_plane_coordinates
+from .float_dtype import float_dtype
 
 
 def clip_by_plane(
@@ -16,29 +16,36 @@ def clip_by_plane(
 
     :return: Clipped point cloud. (N, 3)
     """
-    points = points_raw
+    above = _above_plane(points_raw, plane_eq, np.mean(points_raw, axis=0, dtype=np.float64))
+
+    # 点を多く含む側を返す
+    n_above = int(np.count_nonzero(above))
+    keep_above = n_above >= len(above) - n_above
+    if invert:
+        keep_above = not keep_above
+    return points_raw[above if keep_above else ~above]
+
+
+def _clip_origin(plane_eq: NDArray[np.floating], mean: NDArray[np.floating]) -> NDArray[np.floating]:
+    """
+    切り取りの基準点, 点群の重心のXYで z = (d - ax - by) / c とする(c = 0 の場合は z = 0)
+    """
     a, b, c, d = plane_eq
-    mean = np.mean(points, axis=0)
-    origin = np.array([mean[0], mean[1], 0])
     if c != 0:
-        origin = np.array(
-            [
-                mean[0],
-                mean[1],
-                (d - mean[0] * a - mean[1] * b) / c,
-            ]
-        )
-    points, _ = transform_to_plane_coordinates(points, origin, plane_eq[:3])
+        return np.array([mean[0], mean[1], (d - mean[0] * a - mean[1] * b) / c])
+    return np.array([mean[0], mean[1], 0])
 
-    # 点を多く含む側を返す
-    points_intp = np.where(points[:, 2] >= 0.0)[0]
-    points_intp_inv = np.where(points[:, 2] < 0.0)[0]
-    if len(points_intp) < len(points_intp_inv):
-        tmp = points_intp
-        points_intp = points_intp_inv
-        points_intp_inv = tmp
 
-    if invert:
-        return points_raw[points_intp_inv]
-    else:
-        return points_raw[points_intp]
+def _above_plane(
+    points: NDArray[np.floating], plane_eq: NDArray[np.floating], mean: NDArray[np.floating]
+) -> NDArray[np.bool_]:
+    """
+    基準点を原点とし法線方向をZ軸とする座標系で z >= 0 となる点のマスク(N, )
+
+    平面座標系への変換は行わず、法線と基準点からの変位の内積の符号で判定する。
+    """
+    normal = np.asarray(plane_eq[:3], dtype=np.float64)
+    threshold = np.dot(normal, _clip_origin(plane_eq, mean))
+    dtype = float_dtype(points)
+    above: NDArray[np.bool_] = np.dot(points[:, :3], normal.astype(dtype)) >= dtype.type(threshold)
+    return above
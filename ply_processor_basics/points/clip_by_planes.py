@@ -0,0 +1,42 @@
+from typing import List
+
+import numpy as np
+from numpy.typing import NDArray
+
+from .clip_by_plane import _clip_origin
+from .float_dtype import float_dtype
+
+
+def clip_by_planes(
+    points_raw: NDArray[np.floating], plane_eqs: NDArray[np.floating], invert: bool = False, chunk_size: int = 65536
+) -> List[NDArray[np.floating]]:
+    """
+    複数の平面それぞれで clip_by_plane を行う
+
+    全平面の符号付き距離を chunk_size 点ずつ (chunk_size, 3) x (3, K) の行列積で一括に求めるため、
+    点群の走査は平面の数によらず1回で済む。
+
+    :param points_raw: 点群 (N, 3)
+    :param plane_eqs: 平面の方程式の係数 (K, 4)
+    :param invert: 点の少ない側を返す
+    :param chunk_size: 一度に評価する点の数
+    :return: 平面ごとの切り出した点群 (K, M, 3), clip_by_plane(points_raw, plane_eqs[k], invert) と同じ
+    """
+    plane_eqs = np.asarray(plane_eqs).reshape(-1, 4)
+    mean = np.mean(points_raw, axis=0, dtype=np.float64)
+    normals = np.asarray(plane_eqs[:, :3], dtype=np.float64)
+    thresholds = np.array([np.dot(normals[k], _clip_origin(plane_eqs[k], mean)) for k in range(len(plane_eqs))])
+    dtype = float_dtype(points_raw)
+    normals, thresholds = normals.astype(dtype), thresholds.astype(dtype)
+
+    above = np.empty((len(points_raw), len(plane_eqs)), dtype=bool)
+    for start in range(0, len(points_raw), chunk_size):
+        signed = np.dot(points_raw[start : start + chunk_size, :3], normals.T)
+        np.greater_equal(signed, thresholds, out=above[start : start + chunk_size])
+
+    # 点を多く含む側を返す
+    n_above = np.count_nonzero(above, axis=0)
+    keep_above = n_above >= len(points_raw) - n_above
+    if invert:
+        keep_above = ~keep_above
+    return [points_raw[above[:, k] if keep_above[k] else ~above[:, k]] for k in range(len(plane_eqs))]
@@ -1,37 +1,304 @@
+from typing import TYPE_CHECKING, Iterator, List, Literal, Optional, Tuple
+
 import numpy as np
 from numpy.typing import NDArray
-from sklearn.cluster import DBSCAN
 
+from .point_index import PointIndex
+
+if TYPE_CHECKING:
+    from scipy.sparse import csr_matrix
 
-def plane_clustering(points: NDArray[np.floating], eps: float = 1.0, min_samples: int = 100):
+
+def plane_clustering(
+    points: NDArray[np.floating],
+    eps: float = 1.0,
+    min_samples: int = 100,
+    index: Optional[PointIndex] = None,
+    n_jobs: Optional[int] = None,
+    neighbors: Optional["csr_matrix"] = None,
+    algorithm: Literal["dbscan", "grid"] = "dbscan",
+) -> List[NDArray[np.intp]]:
     """
     DBSCANによる平面上の点群のクラスタリングを行う
 
     :param points: 平面上の点群(N, 2)
+    :param index: points[:, :2] で構築した空間インデックス, 指定時は近傍探索の結果を使い回す
+    :param n_jobs: DBSCANの近傍探索の並列数(-1で全コア)
+    :param neighbors: 距離eps以内の点の組の疎な距離行列(N, N) (自身との距離0を含む), 指定時は近傍探索を行わない
+    :param algorithm: "dbscan": sklearnのDBSCAN
+        "grid": 一辺epsの格子で近傍候補を絞り込む2次元DBSCAN(境界点は隣接するコア点のうち最小のクラスタ番号に属する)
+            index または neighbors を指定した場合は、その近傍探索の結果を使い回すため "dbscan" で計算する
     :return: クラスタ点数の多い順にソートされたクラスタ点群ポインタ(N, M)
     """
-    dbscan = DBSCAN(eps=eps, min_samples=min_samples, metric="euclidean")
-    clusters = dbscan.fit_predict(points[:, :2])
-    unique_clusters, counts = np.unique(clusters, return_counts=True)
-    # クラスタリングできなかった点群(-1)は除外
-    unique_clusters = unique_clusters[unique_clusters != -1]
-    # 各クラスタの点群ポインタを返す
-    cluster_indices = [np.where(clusters == cluster)[0] for cluster in unique_clusters]
-    return cluster_indices
+    if algorithm not in ("dbscan", "grid"):
+        raise ValueError(f"Unknown algorithm: {algorithm}")
+    if algorithm == "grid" and neighbors is None and index is None:
+        clusters = _grid_dbscan(points[:, :2], eps, min_samples)
+    else:
+        clusters = _dbscan(points[:, :2], eps, min_samples, index, n_jobs, neighbors)
+    return _split_clusters(clusters)
 
 
-def line_clustering(points: NDArray[np.floating], eps: float = 1.0, min_samples: int = 10):
+def line_clustering(
+    points: NDArray[np.floating],
+    eps: float = 1.0,
+    min_samples: int = 10,
+    index: Optional[PointIndex] = None,
+    n_jobs: Optional[int] = None,
+    neighbors: Optional["csr_matrix"] = None,
+) -> List[NDArray[np.intp]]:
     """
     直線近傍に分布する点群のクラスタリングを行う
 
     :param points: 直線近傍の点群(N, 3)
+    :param index: pointsで構築した空間インデックス, 指定時は近傍探索の結果を使い回す
+    :param n_jobs: DBSCANの近傍探索の並列数(-1で全コア)
+    :param neighbors: 距離eps以内の点の組の疎な距離行列(N, N) (自身との距離0を含む), 指定時は近傍探索を行わない
     :return: クラスタ点数の多い順にソートされたクラスタ点群ポインタ(N, M)
     """
-    dbscan = DBSCAN(eps=eps, min_samples=min_samples, metric="euclidean")
-    clusters = dbscan.fit_predict(points)
-    unique_clusters, counts = np.unique(clusters, return_counts=True)
-    # クラスタリングできなかった点群(-1)は除外
-    unique_clusters = unique_clusters[unique_clusters != -1]
-    # 各クラスタの点群ポインタを返す
-    cluster_indices = [np.where(clusters == cluster)[0] for cluster in unique_clusters]
-    return cluster_indices
+    clusters = _dbscan(points, eps, min_samples, index, n_jobs, neighbors)
+    return _split_clusters(clusters)
+
+
+def grid_clustering(points_2d: NDArray[np.floating], cell: float, min_points: int = 1) -> List[NDArray[np.intp]]:
+    """
+    占有格子の連結成分による平面上の点群のクラスタリングを行う
+
+    点群を一辺cellの格子に割り当て、点を含むマスの連結成分(8近傍)をクラスタとする。
+    計算量は点数とマス数にほぼ比例し、DBSCANのように近傍点の組を保持しない。
+
+    :param points_2d: 平面上の点群(N, 2)
+    :param cell: 格子のサイズ
+    :param min_points: クラスタとみなす最小点数, これより少ないクラスタの点は除外する
+    :return: クラスタ点数の多い順にソートされたクラスタ点群ポインタ(N, M)
+    """
+    from scipy.ndimage import label
+
+    if len(points_2d) == 0:
+        return []
+    cells = np.floor((points_2d[:, :2] - points_2d[:, :2].min(axis=0)) / cell).astype(np.intp)
+    grid = np.zeros(cells.max(axis=0) + 1, dtype=bool)
+    grid[cells[:, 0], cells[:, 1]] = True
+    labels, _ = label(grid, structure=np.ones((3, 3), dtype=bool))
+
+    # 点に連結成分番号(1始まり)を割り当て、点数の少ないクラスタは除外する
+    clusters = labels[cells[:, 0], cells[:, 1]].astype(np.intp) - 1
+    counts = np.bincount(clusters)
+    clusters[counts[clusters] < min_points] = -1
+    return _split_clusters(clusters)
+
+
+def _dbscan(
+    points: NDArray[np.floating],
+    eps: float,
+    min_samples: int,
+    index: Optional[PointIndex],
+    n_jobs: Optional[int],
+    neighbors: Optional["csr_matrix"],
+) -> NDArray[np.intp]:
+    """
+    DBSCANのクラスタ番号(N, ), 近傍グラフまたは空間インデックス指定時は近傍グラフを距離行列として与える
+    """
+    # sklearnの読み込みは時間がかかるため、使用時に読み込む
+    from sklearn.cluster import DBSCAN
+    from sklearn.neighbors import sort_graph_by_row_values
+
+    if neighbors is None and index is not None:
+        if len(index) != len(points):
+            raise ValueError("index must be built on the same points.")
+        neighbors = index.neighbors(eps)
+
+    if neighbors is None:
+        dbscan = DBSCAN(eps=eps, min_samples=min_samples, metric="euclidean", n_jobs=n_jobs)
+        clusters: NDArray[np.intp] = dbscan.fit_predict(points)
+        return clusters
+
+    if neighbors.shape != (len(points), len(points)):
+        raise ValueError("neighbors must be a (N, N) matrix.")
+    graph = sort_graph_by_row_values(neighbors, warn_when_not_sorted=False)
+    dbscan = DBSCAN(eps=eps, min_samples=min_samples, metric="precomputed", n_jobs=n_jobs)
+    clusters = dbscan.fit_predict(graph)
+    return clusters
+
+
+def _grid_dbscan(points: NDArray[np.floating], eps: float, min_samples: int) -> NDArray[np.intp]:
+    """
+    一辺 eps/√2 の格子による2次元DBSCAN
+
+    同じマスの2点は必ず距離eps以内となるため、min_samples点以上を含むマスの点は距離計算なしにコア点とし、
+    同じマスのコア点は同じクラスタとする。近傍候補は周囲21マスの点に限定する。
+    クラスタはコア点を含むマスの連結成分とし、境界点は隣接するコア点のうち最小のクラスタ番号に属する。
+
+    :param points: 点群(N, 2)
+    :param eps: 近傍とみなす距離
+    :param min_samples: コア点とみなす近傍点数(自身を含む)
+    :return: クラスタ番号(N, ), ノイズは-1
+    """
+    from scipy.sparse import coo_matrix
+    from scipy.sparse.csgraph import connected_components
+
+    n_points = len(points)
+    if n_points == 0:
+        return np.empty(0, dtype=np.intp)
+
+    # 格子番号で点を並べる(周囲2マスが負にならないよう2マスずらす)
+    cell_size = eps / np.sqrt(2)
+    origin = points.min(axis=0)
+    cells = np.floor((points - origin) / cell_size).astype(np.int64) + 2
+    width = int(cells[:, 1].max()) + 3
+    codes = cells[:, 0] * width + cells[:, 1]
+    order = np.argsort(codes, kind="stable")
+    sorted_codes = codes[order]
+    sorted_points = points[order]
+    cell_codes, cell_ids, cell_counts = np.unique(sorted_codes, return_inverse=True, return_counts=True)
+    cell_ids = cell_ids.reshape(-1)
+
+    # 距離eps以内になり得るマス(四隅を除く5x5マス), 連結判定には片側のみを使う
+    offsets = [(dx, dy) for dx in range(-2, 3) for dy in range(-2, 3) if abs(dx) + abs(dy) < 4]
+    all_offsets = np.array([dx * width + dy for dx, dy in offsets], dtype=np.int64)
+    forward = [(dx, dy) for dx, dy in offsets if (dx, dy) > (0, 0)]
+
+    # コア点の判定
+    core = cell_counts[cell_ids] >= min_samples
+    counts = np.zeros(n_points, dtype=np.intp)
+    for i, _ in _neighbor_pairs(sorted_codes, sorted_points, np.flatnonzero(~core), all_offsets, eps):
+        counts += np.bincount(i, minlength=n_points)
+    core |= counts >= min_samples
+
+    if not np.any(core):
+        return np.full(n_points, -1, dtype=np.intp)
+
+    cell_centers = origin + (np.column_stack([cell_codes // width, cell_codes % width]) - 1.5) * cell_size
+    # コア点はマス順に並んでいるため、マスごとの最小値は区間ごとの最小値として求める
+    core_positions = np.flatnonzero(core)
+    core_cells = cell_ids[core_positions]
+    group_starts = np.flatnonzero(np.diff(core_cells, prepend=-1))
+    group_sizes = np.diff(np.append(group_starts, len(core_positions)))
+
+    def nearest(direction: NDArray[np.floating]) -> NDArray[np.intp]:
+        # マスごとに、マス中心 + direction に最も近いコア点の位置
+        distances = np.sum((sorted_points[core_positions] - cell_centers[core_cells] - direction) ** 2, axis=1)
+        minimums = np.repeat(np.minimum.reduceat(distances, group_starts), group_sizes)
+        candidates = np.flatnonzero(distances == minimums)
+        first = candidates[np.flatnonzero(np.diff(core_cells[candidates], prepend=-1))]
+        nearest_positions = np.zeros(len(cell_codes), dtype=np.intp)
+        nearest_positions[core_cells[first]] = core_positions[first]
+        return nearest_positions
+
+    # コア点を含む隣接マスのうち、距離eps以内のコア点の組があるマスを連結する
+    n_cells = len(cell_codes)
+    has_core = np.zeros(n_cells, dtype=bool)
+    has_core[cell_ids[core]] = True
+    edges_a: List[NDArray[np.intp]] = []
+    edges_b: List[NDArray[np.intp]] = []
+    unresolved_a: List[NDArray[np.intp]] = []
+    unresolved_b: List[NDArray[np.intp]] = []
+    for dx, dy in forward:
+        target = cell_codes + (dx * width + dy)
+        b = np.minimum(np.searchsorted(cell_codes, target), n_cells - 1)
+        a = np.flatnonzero(has_core & (cell_codes[b] == target))
+        b = b[a]
+        a, b = a[has_core[b]], b[has_core[b]]
+        # 互いに相手のマスに最も近いコア点の組が距離eps以内であれば、点の組を調べずに連結する
+        direction = np.array([dx, dy]) * cell_size
+        close = (
+            np.sum((sorted_points[nearest(direction)[a]] - sorted_points[nearest(-direction)[b]]) ** 2, axis=1)
+            <= eps**2
+        )
+        edges_a.append(a[close])
+        edges_b.append(b[close])
+        unresolved_a.append(a[~close])
+        unresolved_b.append(b[~close])
+
+    # 残りのマスの組はコア点の組を全て調べる
+    a = np.concatenate(unresolved_a)
+    b = np.concatenate(unresolved_b)
+    core_start = np.searchsorted(core_cells, np.arange(n_cells + 1))
+    spans = core_start[a + 1] - core_start[a]
+    owners = core_positions[np.repeat(core_start[a] - np.cumsum(spans) + spans, spans) + np.arange(np.sum(spans))]
+    targets = np.repeat(cell_codes[b], spans) - sorted_codes[owners]
+    for i, j in _neighbor_pairs(sorted_codes, sorted_points, owners, targets[:, np.newaxis], eps):
+        linked = np.unique(np.column_stack([cell_ids[i], cell_ids[j]])[core[j]], axis=0)
+        edges_a.append(linked[:, 0])
+        edges_b.append(linked[:, 1])
+    a = np.concatenate(edges_a)
+    b = np.concatenate(edges_b)
+    graph = coo_matrix((np.ones(len(a)), (a, b)), shape=(n_cells, n_cells))
+    _, components = connected_components(graph, directed=False)
+
+    # 元の点の順で最初に現れるコア点の順にクラスタ番号を振る
+    labels = np.full(n_points, -1, dtype=np.intp)
+    core_components = np.full(n_points, -1, dtype=np.intp)
+    core_components[order[core]] = components[cell_ids[core]]
+    found = core_components[core_components >= 0]
+    _, first = np.unique(found, return_index=True)
+    numbering = np.full(n_cells, -1, dtype=np.intp)
+    numbering[found[np.sort(first)]] = np.arange(len(first))
+    labels[core] = numbering[components[cell_ids[core]]]
+
+    # 境界点は隣接するコア点のうち最小のクラスタ番号に属する
+    no_label = np.iinfo(np.intp).max
+    border_labels = np.full(n_points, no_label, dtype=np.intp)
+    for i, j in _neighbor_pairs(sorted_codes, sorted_points, np.flatnonzero(~core), all_offsets, eps):
+        np.minimum.at(border_labels, i[core[j]], labels[j[core[j]]])
+    border = ~core & (border_labels != no_label)
+    labels[border] = border_labels[border]
+
+    clusters = np.empty(n_points, dtype=np.intp)
+    clusters[order] = labels
+    return clusters
+
+
+def _neighbor_pairs(
+    sorted_codes: NDArray[np.int64],
+    sorted_points: NDArray[np.floating],
+    owners: NDArray[np.intp],
+    offsets: NDArray[np.int64],
+    eps: float,
+    block_size: int = 8192,
+    max_candidates: int = 1 << 22,
+) -> Iterator[Tuple[NDArray[np.intp], NDArray[np.intp]]]:
+    """
+    格子番号順に並べた点群で、owners の各点と周囲のマスにある距離eps以内の点の組を分割して列挙する
+
+    一度に展開する近傍候補の数を max_candidates 程度に抑えるため、使用メモリは点数によらない。
+
+    :param offsets: 周囲のマスの格子番号の差(K, ), または owners ごとの差(M, K)
+    :return: (点の位置(L, ), 近傍点の位置(L, )) の列
+    """
+    n_offsets = offsets.shape[-1]
+    for block_start in range(0, len(owners), block_size):
+        block = owners[block_start : block_start + block_size]
+        block_offsets = offsets if offsets.ndim == 1 else offsets[block_start : block_start + block_size]
+        neighbor_codes = sorted_codes[block, np.newaxis] + block_offsets
+        lo = np.searchsorted(sorted_codes, neighbor_codes, side="left")
+        spans = np.searchsorted(sorted_codes, neighbor_codes, side="right") - lo
+
+        # 候補数がmax_candidatesを超えないよう点単位で分割する
+        cumulative = np.cumsum(spans.sum(axis=1))
+        splits = np.searchsorted(cumulative, np.arange(max_candidates, cumulative[-1], max_candidates), side="right")
+        for rows in np.split(np.arange(len(block)), np.unique(splits)):
+            if len(rows) == 0:
+                continue
+            row_spans = spans[rows].ravel()
+            i = np.repeat(np.repeat(block[rows], n_offsets), row_spans)
+            j = np.repeat(lo[rows].ravel() - np.cumsum(row_spans) + row_spans, row_spans) + np.arange(row_spans.sum())
+            close = np.sum((sorted_points[i] - sorted_points[j]) ** 2, axis=1) <= eps**2
+            yield i[close], j[close]
+
+
+def _split_clusters(clusters: NDArray[np.intp]) -> List[NDArray[np.intp]]:
+    """
+    クラスタ番号(N, )を、クラスタ点数の多い順に並べたクラスタごとの点ポインタのリストに分割する
+
+    クラスタリングできなかった点(-1)は除外する。同じ点数のクラスタはクラスタ番号順とする。
+    """
+    order = np.argsort(clusters, kind="stable")
+    sorted_clusters = clusters[order]
+    boundaries = np.flatnonzero(np.diff(sorted_clusters)) + 1
+    groups = np.split(order, boundaries)
+    if len(sorted_clusters) > 0 and sorted_clusters[0] == -1:
+        groups = groups[1:]
+    # 点数の多い順(同数はクラスタ番号順)
+    sizes = np.array([len(group) for group in groups])
+    return [groups[k] for k in np.argsort(-sizes, kind="stable")]
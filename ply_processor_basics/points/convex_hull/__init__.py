@@ -1,5 +1,6 @@
 from .detect_circle import detect_circle as detect_circle
 from .detect_line import detect_edge_as_line as detect_line
 from .detect_plane_edge import detect_plane_edge as detect_plane_edge
+from .detect_plane_edge import detect_plane_edge_layers as detect_plane_edge_layers
 
-__all__ = ["detect_circle", "detect_line", "detect_plane_edge"]
+__all__ = ["detect_circle", "detect_line", "detect_plane_edge", "detect_plane_edge_layers"]
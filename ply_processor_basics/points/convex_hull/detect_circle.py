@@ -1,14 +1,22 @@
-import datetime
-from typing import Tuple
+from typing import Literal, Optional, Tuple, Union
 
 import numpy as np
 from numpy.typing import NDArray
 
+from ply_processor_basics.points import PointIndex, transform_to_plane_coordinates
+from ply_processor_basics.points.ransac.sample_indices import sample_indices
+
 from .detect_plane_edge import detect_plane_edge
 
 
 def detect_circle(
-    points: NDArray[np.floating], plane_model: NDArray[np.floating], iterations: int = 100, tolerance: float = 1.0
+    points: NDArray[np.floating],
+    plane_model: NDArray[np.floating],
+    iterations: int = 100,
+    tolerance: float = 1.0,
+    seed: Union[None, int, np.random.Generator] = None,
+    method: Literal["median", "kasa", "taubin"] = "median",
+    index: Optional[PointIndex] = None,
 ) -> Tuple[NDArray[np.intp], NDArray[np.floating], NDArray[np.floating], float]:
     """
     ConvexHullを用いて円検出
@@ -16,66 +24,136 @@ def detect_circle(
     :param points: 点群(N, 3)
     :param plane_model: 平面モデル(4,)
     :param iterations: RANSACのイテレーション数
+    :param seed: 乱数シードまたは乱数生成器, 同じシードでは同じ結果を返す
+    :param method: 円の推定方法
+        "median": エッジ点からランダムに選んだ3点を通る円の中央値
+        "kasa", "taubin": エッジ点への代数的円当てはめ(乱数を使わない)
+    :param index: pointsで構築した空間インデックス, 指定時は円内の点を全点走査せずに探索する
     :return: 円の中心(3,), 法線ベクトル(3,), 半径
     """
+    if index is not None and len(index) != len(points):
+        raise ValueError("index must be built on the same points.")
 
     inliers, lines = detect_plane_edge(points, plane_model)
-    centers = []
-    normals = []
-    radiuses = []
-    # 点を3点取得して、その3点を通る円を求める
-    for i in range(iterations):
-        np.random.seed(datetime.datetime.now().microsecond)
-        idx = np.random.choice(inliers, 3, replace=False)
-        center, normal, radius = fit_circle(points[idx])
-        centers.append(center)
-        normals.append(normal)
-        radiuses.append(radius)
-    center = np.median(centers, axis=0)
-    normal = np.median(normals, axis=0)
-    radius = np.median(radiuses)
-
-    inliers = np.array([i for i in range(points.shape[0]) if np.linalg.norm(points[i] - center) < radius + tolerance])
+    if method == "median":
+        # 点を3点取得して、その3点を通る円を求める
+        samples = inliers[sample_indices(len(inliers), 3, iterations, np.random.default_rng(seed))]
+        centers, normals, radiuses = fit_circles(points[samples])
+        # 3点が同一直線上にある組は除外する
+        valid = radiuses > 0
+        center = np.median(centers[valid], axis=0)
+        normal = np.median(normals[valid], axis=0)
+        radius = float(np.median(radiuses[valid]))
+    elif method in ("kasa", "taubin"):
+        assert abs(plane_model[2]) > 1e-6
+        origin = np.asarray([0, 0, -plane_model[3] / plane_model[2]])
+        points_rotated, inv_matrix = transform_to_plane_coordinates(points[inliers], origin, plane_model[:3])
+        center_xy, radius = fit_circle_algebraic(points_rotated[:, :2], method)
+        center = np.dot(inv_matrix, np.hstack([center_xy, 0, 1]))[:3]
+        normal = plane_model[:3] / np.linalg.norm(plane_model[:3])
+    else:
+        raise ValueError(f"Unknown method: {method}")
+    # モデルのパラメータは入力の型によらずfloat64で返す
+    center = np.asarray(center, dtype=np.float64)
+    normal = np.asarray(normal, dtype=np.float64)
+
+    if index is not None:
+        inliers = index.query_radius(center, radius + tolerance, strict=True)
+    else:
+        inliers = np.where(np.linalg.norm(points - center, axis=1) < radius + tolerance)[0]
     return inliers, center, normal, radius
 
 
 def fit_circle(points: NDArray[np.floating]):
     assert points.shape[0] == 3
 
-    p1 = points[0]
-    p2 = points[1]
-    p3 = points[2]
+    centers, normals, radiuses = fit_circles(points[np.newaxis])
+    if radiuses[0] == 0:
+        raise ValueError("Three points in a line.")
+    return centers[0], normals[0], radiuses[0]
 
-    normal = np.cross(p2 - p1, p3 - p1)
-    normal /= np.linalg.norm(normal)
 
-    A = np.array([p2 - p1, p3 - p1])
-    if np.linalg.matrix_rank(A) < 2:
-        raise ValueError("Three points in a line.")
+def fit_circles(
+    points: NDArray[np.floating],
+) -> Tuple[NDArray[np.floating], NDArray[np.floating], NDArray[np.floating]]:
+    """
+    3点を通る円(外接円)を一括で求める
 
-    # 2. 平面の法線ベクトルを計算
-    normal = np.cross(p2 - p1, p3 - p1)
-    normal = normal / np.linalg.norm(normal)  # 正規化
-
-    # 3. 円の中心を求める
-    # 3点の中点を計算
-    mid1 = (p1 + p2) / 2
-    mid2 = (p1 + p3) / 2
-
-    # 中点を通り、p1p2とp2p3に垂直な2つのベクトルを計算
-    v1 = np.cross(p2 - p1, normal)
-    v2 = np.cross(p3 - p1, normal)
-
-    # 2つの直線の交点を求める
-    # mid1 + t*v1 = mid2 + s*v2 を解く
-    # np.linalgが正方行列のみを扱うので、2次元にスライス FIXME: 特異点対応
-    A = np.array([v1, -v2]).T
-    A = A[:2, :2]
-    b = mid2 - mid1
-    b = b[:2]
-    t, s = np.linalg.solve(A, b)
-    center = mid1 + t * v1
-
-    # 4. 半径を計算
-    radius = np.linalg.norm(center - p1)
-    return center, normal, radius
+    :param points: 3点の組(K, 3, 3)
+    :return: 円の中心(K, 3), 法線ベクトル(K, 3), 半径(K, ), 3点が同一直線上にある場合の半径は0
+    """
+    p1 = points[:, 0, :]
+    p2 = points[:, 1, :]
+    p3 = points[:, 2, :]
+
+    # 法線ベクトル (p2 - p1) x (p3 - p1) = a x b
+    a = p1 - p3
+    b = p2 - p3
+    cross = np.cross(a, b)
+    cross_norm2 = np.sum(cross**2, axis=1)
+    valid = cross_norm2 > 0
+    cross_norm2 = np.where(valid, cross_norm2, 1.0)
+    normals = cross / np.sqrt(cross_norm2)[:, np.newaxis]
+
+    # 外心 p3 + ((|a|^2 b - |b|^2 a) x (a x b)) / (2|a x b|^2)
+    a_norm2 = np.sum(a**2, axis=1)[:, np.newaxis]
+    b_norm2 = np.sum(b**2, axis=1)[:, np.newaxis]
+    centers = p3 + np.cross(a_norm2 * b - b_norm2 * a, cross) / (2 * cross_norm2[:, np.newaxis])
+    radiuses: NDArray[np.floating] = np.where(valid, np.linalg.norm(centers - p1, axis=1), 0.0)
+    return centers, normals, radiuses
+
+
+def fit_circle_algebraic(
+    points_xy: NDArray[np.floating], method: Literal["kasa", "taubin"] = "taubin"
+) -> Tuple[NDArray[np.floating], float]:
+    """
+    平面上の点群に代数的最小二乗法で円を当てはめる
+
+    "kasa": x^2 + y^2 = 2ax + 2by + c の線形最小二乗解。円弧のみの点群では半径が小さく偏る。
+    "taubin": 勾配の大きさで正規化した代数距離を最小化する(Kåsa法より偏りが小さい)。
+
+    :param points_xy: 平面座標系の点群(N, 2), N >= 3
+    :param method: 当てはめ方法
+    :return: 円中心(2, ), 円半径
+    """
+    if len(points_xy) < 3:
+        raise ValueError("At least 3 points are required.")
+
+    # 数値安定性のため重心を原点とする
+    centroid = np.mean(points_xy, axis=0)
+    x, y = (points_xy - centroid).T
+    z = x**2 + y**2
+
+    if method == "kasa":
+        a = np.column_stack([2 * x, 2 * y, np.ones(len(x))])
+        (cx, cy, c), *_ = np.linalg.lstsq(a, z, rcond=None)
+        return np.asarray([cx, cy]) + centroid, float(np.sqrt(c + cx**2 + cy**2))
+    if method != "taubin":
+        raise ValueError(f"Unknown method: {method}")
+
+    # Taubin法の特性多項式の最小根をニュートン法で求める
+    mxx, myy, mxy = np.mean(x * x), np.mean(y * y), np.mean(x * y)
+    mxz, myz, mzz = np.mean(x * z), np.mean(y * z), np.mean(z * z)
+    mz = mxx + myy
+    cov_xy = mxx * myy - mxy * mxy
+    var_z = mzz - mz * mz
+    a3 = 4 * mz
+    a2 = -3 * mz * mz - mzz
+    a1 = var_z * mz + 4 * cov_xy * mz - mxz * mxz - myz * myz
+    a0 = mxz * (mxz * myy - myz * mxy) + myz * (myz * mxx - mxz * mxy) - var_z * cov_xy
+
+    root, value = 0.0, a0
+    for _ in range(100):
+        derivative = a1 + root * (2 * a2 + 3 * a3 * root)
+        next_root = root - value / derivative
+        if next_root == root or not np.isfinite(next_root):
+            break
+        next_value = a0 + next_root * (a1 + next_root * (a2 + next_root * a3))
+        if abs(next_value) >= abs(value):
+            break
+        root, value = next_root, next_value
+
+    det = root * root - root * mz + cov_xy
+    cx = (mxz * (myy - root) - myz * mxy) / det / 2
+    cy = (myz * (mxx - root) - mxz * mxy) / det / 2
+    return np.asarray([cx, cy]) + centroid, float(np.sqrt(cx**2 + cy**2 + mz))
@@ -1,4 +1,4 @@
-from typing import List, Tuple
+from typing import List, Tuple, Union
 
 import numpy as np
 from numpy.typing import NDArray
@@ -6,7 +6,7 @@ from numpy.typing import NDArray
 from ply_processor_basics.points.ransac import detect_line
 from ply_processor_basics.vector import normalize
 
-from .detect_plane_edge import detect_plane_edge
+from .detect_plane_edge import detect_plane_edge_layers
 
 
 def detect_edge_as_line(
@@ -15,6 +15,7 @@ def detect_edge_as_line(
     threshold: float = 0.5,
     expected_edges: int = 4,
     edge_density: int = 5,
+    seed: Union[None, int, np.random.Generator] = None,
 ) -> List[Tuple[NDArray[np.intp], NDArray[np.floating], NDArray[np.floating]]]:
     """
     ConvexHullを用いて平面の外形直線検出
@@ -23,6 +24,7 @@ def detect_edge_as_line(
     :param plane_model: 平面モデル(4,)
     :param expected_edges: 期待されるエッジ数
     :param edge_density: エッジ点の密度(詳細はREADME.md参照)
+    :param seed: 乱数シードまたは乱数生成器, 同じシードでは同じ結果を返す
     Returns:
         List[Tuple]: 各エッジに関する以下の情報を含むタプルのリスト
             1. エッジ点のポインタ: shape (N,) の numpy 配列
@@ -32,15 +34,13 @@ def detect_edge_as_line(
     return_list: List[Tuple[NDArray[np.intp], NDArray[np.floating], NDArray[np.floating]]] = []
 
     # エッジ点を抽出
-    edge_inliers = np.array([], dtype=np.intp)
-    for _ in range(edge_density):
-        outliers = np.where(np.logical_not(np.isin(np.arange(len(points)), edge_inliers)))[0]
-        inliers, _ = detect_plane_edge(points[outliers], plane_model)
-        edge_inliers = np.concatenate([edge_inliers, outliers[inliers]])
+    edge_inliers = detect_plane_edge_layers(points, plane_model, edge_density)
+    detected = np.zeros(len(points), dtype=bool)
 
     # 抽出点から直線を検出
+    rng = np.random.default_rng(seed)
     for i in range(expected_edges):
-        tmp_inliers, line_model = detect_line(points[edge_inliers], threshold=threshold)
+        tmp_inliers, line_model = detect_line(points[edge_inliers], threshold=threshold, seed=rng)
         inliers = edge_inliers[tmp_inliers]
 
         # 線分検出失敗時はこれまでの計算結果のみを返す
@@ -65,7 +65,8 @@ def detect_edge_as_line(
         return_list.append((cluster, np.array([start_point, end_point]), line_model))
 
         # 検出した線分をエッジ点から消去
-        edge_inliers = edge_inliers[np.where(np.logical_not(np.isin(edge_inliers, cluster)))[0]]
+        detected[cluster] = True
+        edge_inliers = edge_inliers[np.logical_not(detected[edge_inliers])]
 
     return return_list
 
@@ -1,4 +1,4 @@
-from typing import Tuple
+from typing import List, Sequence, Tuple
 
 import numpy as np
 from numpy.typing import NDArray
@@ -31,30 +31,125 @@ def detect_plane_edge(
     return inliers, lines
 
 
+def detect_plane_edge_layers(
+    points: NDArray[np.floating], plane_model: NDArray[np.floating], n_layers: int
+) -> NDArray[np.intp]:
+    """
+    ConvexHullを外側から繰り返し剥がし(onion peeling)、平面上の外側n_layers層のエッジ点を抽出する
+
+    座標変換は1回のみ行い、抽出済みの点は有効点マスクで除外する。
+
+    :param points: 点群(N, 3)
+    :param plane_model: 平面モデル(4,)
+    :param n_layers: 抽出する層の数
+    :return: エッジ点のポインタ(M, ) (外側の層から順に、各層はConvexHullの頂点順)
+    """
+    assert abs(plane_model[2]) > 1e-6
+    origin = np.asarray([0, 0, -plane_model[3] / plane_model[2]])
+    points_rotated, _ = transform_to_plane_coordinates(points, origin, plane_model[:3])
+    points_xy = points_rotated[:, :2]
+
+    active = np.ones(len(points), dtype=bool)
+    layers = []
+    for _ in range(n_layers):
+        active_indices = np.where(active)[0]
+        # 残りの点で凸包が作れない場合は終了
+        if len(active_indices) < 3:
+            break
+        hull = ConvexHull(points_xy[active_indices])
+        layer = active_indices[hull.vertices]
+        layers.append(layer)
+        active[layer] = False
+
+    if len(layers) == 0:
+        return np.array([], dtype=np.intp)
+    return np.concatenate(layers)
+
+
 def ramer_douglas_peucker(
-    points_raw: NDArray[np.floating], inliers: NDArray[np.intp], epsilon: float
+    points_raw: NDArray[np.floating], inliers: NDArray[np.intp], epsilon: float, closed: bool = False
 ) -> NDArray[np.intp]:
     """
     Ramer-Douglas-Peuckerアルゴリズム
+
+    :param points_raw: 点群(N, 3)
+    :param inliers: 折れ線(closed=Trueの場合は多角形)の頂点順の点ポインタ(M, )
+    :param epsilon: 線分からの距離閾値
+    :param closed: 多角形として扱う(末尾の点と先頭の点を結ぶ)
+    :return: 簡略化した折れ線の点ポインタ(L, )
+    """
+    return ramer_douglas_peucker_batch(points_raw, [inliers], epsilon, closed)[0]
+
+
+def ramer_douglas_peucker_batch(
+    points_raw: NDArray[np.floating], polylines: Sequence[NDArray[np.intp]], epsilon: float, closed: bool = False
+) -> List[NDArray[np.intp]]:
     """
-    points = points_raw[inliers]
+    複数の折れ線をRamer-Douglas-Peuckerアルゴリズムでまとめて簡略化する
 
-    def recursive(start_index, end_index):
-        dmax = 0
-        index = start_index
-        for i in range(start_index + 1, end_index):
-            p = points[start_index]
-            v = points[end_index] - points[start_index]
-            d = get_distances_to_line(np.asarray([points[i]]), p, v)[0]
-            if d > dmax:
-                index = i
-                dmax = d
+    再帰の代わりに全折れ線で共有する明示的なスタックで区間を分割し、区間内の点と線分の距離は一括で計算する。
+    closed=Trueの場合は先頭の点と、先頭から最も遠い点で多角形を2つの折れ線に分割する。
 
-        if dmax > epsilon:
-            results = recursive(start_index, index) + recursive(index, end_index)[1:]
-        else:
-            results = [inliers[start_index], inliers[end_index]]
+    :param points_raw: 点群(N, 3)
+    :param polylines: 各折れ線の頂点順の点ポインタのリスト
+    :param epsilon: 線分からの距離閾値
+    :param closed: 多角形として扱う(末尾の点と先頭の点を結ぶ)
+    :return: 簡略化した各折れ線の点ポインタのリスト
+    """
+    # 全折れ線を連結し、区間(start, end)を連結後の位置で扱う
+    indices: List[NDArray[np.intp]] = []
+    offsets: List[int] = []
+    stack: List[Tuple[int, int]] = []
+    offset = 0
+    for polyline in polylines:
+        polyline = np.asarray(polyline, dtype=np.intp)
+        n = len(polyline)
+        if closed and n > 2:
+            # 先頭の点を末尾に複製して閉じる
+            far = int(np.argmax(np.linalg.norm(points_raw[polyline] - points_raw[polyline[0]], axis=1)))
+            polyline = np.append(polyline, polyline[0])
+            stack.extend([(offset + far, offset + n), (offset, offset + far)])
+        elif n > 0:
+            stack.append((offset, offset + n - 1))
+        indices.append(polyline)
+        offsets.append(offset)
+        offset += len(polyline)
+
+    if offset == 0:
+        return [np.array([], dtype=np.intp) for _ in polylines]
+    points = points_raw[np.concatenate(indices)]
+    keep = np.zeros(offset, dtype=bool)
+    for start, end in stack:
+        keep[start] = True
+        keep[end] = True
+
+    while stack:
+        start, end = stack.pop()
+        if end - start < 2:
+            continue
+        distances = _distances_to_segment(points[start + 1 : end], points[start], points[end])
+        index = int(np.argmax(distances))
+        if distances[index] > epsilon:
+            index += start + 1
+            keep[index] = True
+            stack.extend([(index, end), (start, index)])
 
-        return results
+    results = []
+    for polyline, polyline_offset, original in zip(indices, offsets, polylines):
+        # 閉じるために複製した末尾の点は除く
+        n = len(original)
+        results.append(polyline[:n][keep[polyline_offset : polyline_offset + n]])
+    return results
 
-    return np.array(recursive(0, len(inliers) - 1))
+
+def _distances_to_segment(
+    points: NDArray[np.floating], start: NDArray[np.floating], end: NDArray[np.floating]
+) -> NDArray[np.floating]:
+    """
+    点群と、線分の両端点を通る直線との距離(両端点が一致する場合は端点との距離)
+    """
+    v = end - start
+    if not np.any(v):
+        distances: NDArray[np.floating] = np.linalg.norm(points - start, axis=1)
+        return distances
+    return get_distances_to_line(points, start, v)
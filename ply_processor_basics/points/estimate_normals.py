@@ -0,0 +1,48 @@
+from typing import Optional
+
+import numpy as np
+from numpy.typing import NDArray
+
+from .float_dtype import float_dtype
+from .point_index import PointIndex
+
+
+def estimate_normals(
+    points: NDArray[np.floating],
+    index: Optional[PointIndex] = None,
+    k: int = 30,
+    chunk_size: int = 16384,
+    workers: int = 1,
+) -> NDArray[np.floating]:
+    """
+    各点のk近傍に対して主成分分析を行い、点ごとの法線ベクトルを求める
+
+    chunk_size 点ずつk近傍を (M, k, 3) にまとめ、共分散行列(M, 3, 3)と固有値分解(eigh)を一括で行う。
+    共分散はfloat64で計算する。法線の向き(符号)は揃えないため、必要に応じて
+    vector.ensure_consistent_direction などで揃える。
+
+    :param points: 点群(N, 3)
+    :param index: pointsで構築した空間インデックス, 指定時はKD木を使い回す
+    :param k: 近傍点数(自身を含む), 点数より多い場合は点数とする
+    :param chunk_size: 一度に処理する点の数
+    :param workers: 近傍探索の並列数(-1で全コア)
+    :return: 単位法線ベクトル(N, 3)
+    """
+    if index is None:
+        index = PointIndex(points)
+    elif len(index) != len(points):
+        raise ValueError("index must be built on the same points.")
+    k = min(k, len(points))
+    if k < 3:
+        raise ValueError("At least 3 neighbors are required.")
+
+    normals = np.empty((len(points), 3), dtype=float_dtype(points))
+    for start in range(0, len(points), chunk_size):
+        _, neighbors = index.tree.query(points[start : start + chunk_size], k=k, workers=workers)
+        neighborhoods = np.asarray(points[neighbors, :3], dtype=np.float64)
+        neighborhoods -= np.mean(neighborhoods, axis=1, keepdims=True)
+        covariances = np.matmul(neighborhoods.transpose(0, 2, 1), neighborhoods)
+        # 固有値は昇順のため、最小の固有値の固有ベクトルは先頭の列
+        _, eigenvectors = np.linalg.eigh(covariances)
+        normals[start : start + chunk_size] = eigenvectors[:, :, 0]
+    return normals
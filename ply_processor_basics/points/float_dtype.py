@@ -0,0 +1,15 @@
+import numpy as np
+from numpy.typing import NDArray
+
+
+def float_dtype(points: NDArray) -> np.dtype:
+    """
+    点群の計算に用いる浮動小数点型
+
+    点数に比例する配列(点群, 距離など)は呼び出し元の型で扱い、float32の点群はfloat32のまま計算する。
+    それ以外(float64, 整数など)はfloat64とする。
+
+    :param points: 点群
+    :return: float32 または float64
+    """
+    return np.dtype(np.float32) if points.dtype == np.float32 else np.dtype(np.float64)
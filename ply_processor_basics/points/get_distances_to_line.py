@@ -1,13 +1,20 @@
+from typing import Optional
+
 import numpy as np
 from numpy.typing import NDArray
 
 from ply_processor_basics.vector import normalize
 
+from .float_dtype import float_dtype
+from .point_index import PointIndex
+
 
 def get_distances_to_line(
     points: NDArray[np.floating],
     line_point: NDArray[np.floating],
     line_vector: NDArray[np.floating],
+    index: Optional[PointIndex] = None,
+    max_distance: Optional[float] = None,
 ) -> NDArray[np.floating]:
     """
     点群と直線の距離を求める。
@@ -15,10 +22,35 @@ def get_distances_to_line(
     :param points: 点群 (N, 3)
     :param line_point: 直線上の1点 (3,)
     :param line_vector: 直線の方向ベクトル (3,)
+    :param index: pointsで構築した空間インデックス, ボクセルハッシュを持つ場合はmax_distanceより遠いボクセルの点を計算しない
+    :param max_distance: 指定時はこれより遠い点の距離をinfとする
     :return: 点群と直線の距離 (N,)
     """
-    u = points - line_point
-    v = normalize(line_vector)
-    vt: NDArray[np.floating] = np.inner(u, v).reshape(-1, 1).dot(v.reshape(-1, 3))
-    norms: NDArray[np.floating] = np.linalg.norm(u - vt, axis=1)
+    if index is not None and len(index) != len(points):
+        raise ValueError("index must be built on the same points.")
+    if max_distance is None:
+        return _distances_to_line(points, line_point, line_vector)
+
+    if index is not None and index.voxel_size is not None:
+        voxel_distances = _distances_to_line(index.voxel_centers, line_point, line_vector)
+        candidates = index.prune_voxels(voxel_distances, max_distance)
+        distances = np.full(len(points), np.inf, dtype=float_dtype(points))
+        distances[candidates] = _distances_to_line(points[candidates], line_point, line_vector)
+    else:
+        distances = _distances_to_line(points, line_point, line_vector)
+    distances[distances > max_distance] = np.inf
+    return distances
+
+
+def _distances_to_line(
+    points: NDArray[np.floating],
+    line_point: NDArray[np.floating],
+    line_vector: NDArray[np.floating],
+) -> NDArray[np.floating]:
+    # u から方向成分を除いた垂線ベクトルの長さ
+    dtype = float_dtype(points)
+    u = np.subtract(points, np.asarray(line_point, dtype=dtype), dtype=dtype)
+    v = normalize(np.asarray(line_vector, dtype=np.float64)).astype(dtype)
+    u -= np.dot(u, v)[:, np.newaxis] * v
+    norms: NDArray[np.floating] = np.sqrt(np.einsum("ij,ij->i", u, u))
     return norms
@@ -0,0 +1,61 @@
+from typing import Optional
+
+import numpy as np
+from numpy.typing import NDArray
+
+from .float_dtype import float_dtype
+
+
+def get_distances_to_lines(
+    points: NDArray[np.floating],
+    line_models: NDArray[np.floating],
+    squared: bool = False,
+    chunk_size: int = 2048,
+    out: Optional[NDArray[np.floating]] = None,
+) -> NDArray[np.floating]:
+    """
+    複数の直線と点の距離を一括で求める
+
+    直線上の点 p, 単位方向ベクトル v, u = x - p に対し、距離の2乗を |u|^2 - (u・v)^2 として
+    (chunk_size, 3) x (3, K) の行列積で求める。桁落ちを抑えるため座標は直線上の点の重心を原点として計算する。
+    距離の2乗の丸め誤差は (点と直線上の点の距離)^2 * 1e-16 程度のため、閾値判定用であり、
+    直線のごく近くの点の距離を精密に求める場合は get_distances_to_line を用いる。
+    計算はfloat64で行い、float32の点群の結果はfloat32で返す。
+
+    :param points: 点群 (N, 3)
+    :param line_models: 直線の方程式p+tv=0 (K, 2, 3)
+    :param squared: Trueの場合は距離の2乗を返す(閾値との比較では平方根を省略できる)
+    :param chunk_size: 一度に評価する点の数
+    :param out: 指定時は結果をこの配列(N, K)に書き込み、新たな配列を確保しない
+    :return: 点と各直線の距離 (N, K)
+    """
+    line_models = np.asarray(line_models, dtype=np.float64).reshape(-1, 2, 3)
+    norms = np.linalg.norm(line_models[:, 1], axis=1)
+    if np.any(norms == 0):
+        raise ZeroDivisionError("The norm of the vector is zero.")
+    line_vectors = line_models[:, 1] / norms[:, np.newaxis]
+    center = np.mean(line_models[:, 0], axis=0) if len(line_models) > 0 else np.zeros(3)
+    line_points = line_models[:, 0] - center
+    # |u|^2 - (u・v)^2 = |x|^2 - 2x・p + |p|^2 - (x・v - p・v)^2
+    point_offsets = np.einsum("ij,ij->i", line_points, line_vectors)
+    point_norms = np.einsum("ij,ij->i", line_points, line_points)
+
+    if out is None:
+        out = np.empty((len(points), len(line_models)), dtype=float_dtype(points))
+    elif out.shape != (len(points), len(line_models)):
+        raise ValueError("out must be a (N, K) array.")
+
+    for start in range(0, len(points), chunk_size):
+        chunk = points[start : start + chunk_size, :3] - center
+        projections = np.dot(chunk, line_vectors.T)
+        projections -= point_offsets
+        np.square(projections, out=projections)
+        result = np.dot(chunk, -2 * line_points.T)
+        result += np.einsum("ij,ij->i", chunk, chunk)[:, np.newaxis]
+        result += point_norms
+        result -= projections
+        np.maximum(result, 0, out=result)
+        if not squared:
+            np.sqrt(result, out=result)
+        out[start : start + chunk_size] = result
+    return out
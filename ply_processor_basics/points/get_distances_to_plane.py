@@ -1,25 +1,59 @@
+from typing import Optional
+
 import numpy as np
 from numpy.typing import NDArray
 
+from .float_dtype import float_dtype
+from .point_index import PointIndex
+
 
 def get_distances_to_plane(
     points: NDArray[np.floating],
     plane_model: NDArray[np.floating],
+    index: Optional[PointIndex] = None,
+    max_distance: Optional[float] = None,
 ) -> NDArray[np.floating]:
     """
     平面と点の距離を求める
 
     :param points: 点群 (N, 3)
     :param plane_model: 平面の方程式の係数 (4,)
+    :param index: pointsで構築した空間インデックス, ボクセルハッシュを持つ場合はmax_distanceより遠いボクセルの点を計算しない
+    :param max_distance: 指定時はこれより遠い点の距離をinfとする
     :return: 点と平面の距離 (N,)
     """
+    if index is not None and len(index) != len(points):
+        raise ValueError("index must be built on the same points.")
     a, b, c, d = plane_model
 
     # 平面の法線ベクトル
-    normal = np.array([a, b, c])
+    normal = np.array([a, b, c], dtype=np.float64)
     norm = np.linalg.norm(normal)
     if norm == 0:
         raise ValueError("Invalid plane model")
+    # 点群の型で計算する
+    dtype = float_dtype(points)
+    normal = (normal / norm).astype(dtype)
+    offset = dtype.type(d / norm)
 
-    distances: NDArray[np.floating] = np.abs(np.dot(points[:, :3], normal) + d) / norm
+    if max_distance is None:
+        return _distances_to_plane(points, normal, offset)
+
+    if index is not None and index.voxel_size is not None:
+        candidates = index.prune_voxels(get_distances_to_plane(index.voxel_centers, plane_model), max_distance)
+        distances = np.full(len(points), np.inf, dtype=dtype)
+        distances[candidates] = _distances_to_plane(points[candidates], normal, offset)
+    else:
+        distances = _distances_to_plane(points, normal, offset)
+    distances[distances > max_distance] = np.inf
+    return distances
+
+
+def _distances_to_plane(
+    points: NDArray[np.floating], normal: NDArray[np.floating], offset: np.floating
+) -> NDArray[np.floating]:
+    # 内積の結果の配列を使い回し、一時配列を作らない
+    distances: NDArray[np.floating] = np.dot(points[:, :3], normal)
+    distances += offset
+    np.abs(distances, out=distances)
     return distances
@@ -0,0 +1,50 @@
+from typing import Optional, Tuple
+
+import numpy as np
+from numpy.typing import NDArray
+
+from .float_dtype import float_dtype
+
+
+def get_distances_to_planes(
+    points: NDArray[np.floating],
+    plane_models: NDArray[np.floating],
+    chunk_size: int = 65536,
+    out: Optional[NDArray[np.floating]] = None,
+) -> NDArray[np.floating]:
+    """
+    複数の平面と点の距離を一括で求める
+
+    点群を chunk_size 点ずつ (chunk_size, 3) x (3, K) の行列積で評価し、結果を直接 out に書き込む。
+    float32の点群はfloat32のまま計算する(それ以外はfloat64)。
+
+    :param points: 点群 (N, 3)
+    :param plane_models: 平面の方程式の係数 (K, 4)
+    :param chunk_size: 一度に評価する点の数
+    :param out: 指定時は距離をこの配列(N, K)に書き込み、新たな配列を確保しない
+    :return: 点と各平面の距離 (N, K)
+    """
+    dtype = float_dtype(points)
+    normals, offsets = _normalize_planes(plane_models)
+    normals, offsets = normals.astype(dtype), offsets.astype(dtype)
+    if out is None:
+        out = np.empty((len(points), len(normals)), dtype=dtype)
+    elif out.shape != (len(points), len(normals)):
+        raise ValueError("out must be a (N, K) array.")
+    for start in range(0, len(points), chunk_size):
+        chunk = out[start : start + chunk_size]
+        np.matmul(points[start : start + chunk_size, :3], normals.T, out=chunk)
+        chunk += offsets
+        np.abs(chunk, out=chunk)
+    return out
+
+
+def _normalize_planes(plane_models: NDArray[np.floating]) -> Tuple[NDArray[np.floating], NDArray[np.floating]]:
+    """
+    平面の方程式の係数(K, 4)を単位法線(K, 3)と定数項(K, )に分ける
+    """
+    plane_models = np.asarray(plane_models, dtype=np.float64).reshape(-1, 4)
+    norms = np.linalg.norm(plane_models[:, :3], axis=1)
+    if np.any(norms == 0):
+        raise ValueError("Invalid plane model")
+    return plane_models[:, :3] / norms[:, np.newaxis], plane_models[:, 3] / norms
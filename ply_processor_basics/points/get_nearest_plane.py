@@ -0,0 +1,46 @@
+from typing import Optional, Tuple
+
+import numpy as np
+from numpy.typing import NDArray
+
+from .float_dtype import float_dtype
+from .get_distances_to_planes import get_distances_to_planes
+
+
+def get_nearest_plane(
+    points: NDArray[np.floating],
+    plane_models: NDArray[np.floating],
+    max_distance: Optional[float] = None,
+    chunk_size: int = 65536,
+) -> Tuple[NDArray[np.intp], NDArray[np.floating]]:
+    """
+    各点に最も近い平面を求める
+
+    (N, K) の距離行列は作らず、chunk_size 点ずつ距離を求めて最小値を取るため、使用メモリは chunk_size * K に抑えられる。
+
+    :param points: 点群 (N, 3)
+    :param plane_models: 平面の方程式の係数 (K, 4)
+    :param max_distance: 指定時はこれより遠い点の平面番号を-1, 距離をinfとする
+    :param chunk_size: 一度に評価する点の数
+    :return: 最も近い平面の番号 (N, ), その平面との距離 (N, ) (同じ距離の場合は番号の小さい平面)
+    """
+    plane_models = np.asarray(plane_models, dtype=np.float64).reshape(-1, 4)
+    dtype = float_dtype(points)
+    labels = np.full(len(points), -1, dtype=np.intp)
+    distances = np.full(len(points), np.inf, dtype=dtype)
+    if len(plane_models) == 0:
+        return labels, distances
+
+    buffer = np.empty((min(chunk_size, len(points)), len(plane_models)), dtype=dtype)
+    for start in range(0, len(points), chunk_size):
+        chunk = points[start : start + chunk_size]
+        chunk_distances = get_distances_to_planes(chunk, plane_models, chunk_size, out=buffer[: len(chunk)])
+        nearest = np.argmin(chunk_distances, axis=1)
+        labels[start : start + len(chunk)] = nearest
+        distances[start : start + len(chunk)] = np.take_along_axis(chunk_distances, nearest[:, np.newaxis], 1)[:, 0]
+
+    if max_distance is not None:
+        far = distances > max_distance
+        labels[far] = -1
+        distances[far] = np.inf
+    return labels, distances
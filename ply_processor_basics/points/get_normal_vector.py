@@ -2,24 +2,30 @@ import numpy as np
 from numpy.typing import NDArray
 
 
-def get_normal_vector(points: NDArray[np.floating]) -> NDArray[np.floating]:
+def get_normal_vector(points: NDArray[np.floating], chunk_size: int = 65536) -> NDArray[np.floating]:
     """_summary_
     点群データに対して主成分分析を行い、最小の固有値の固有ベクトルを返す（法線ベクトル）
 
+    重心と共分散行列はfloat64で累積する。float32の点群でもfloat64の中心化した点群(N, 3)を作らず、
+    chunk_size 点ずつ累積する。
+
     :param points: 点群データ(N, 3)
+    :param chunk_size: 共分散行列の累積で一度に扱う点の数
     :returns: 法線ベクトル
     """
     # 重心
-    centeroid = np.mean(points, axis=0)
-    centered_points = points - centeroid
+    centeroid = np.mean(points, axis=0, dtype=np.float64)
 
     # 共分散行列
-    cov_m = np.cov(centered_points.T)
+    cov_m = np.zeros((points.shape[1], points.shape[1]))
+    for start in range(0, len(points), chunk_size):
+        centered_points = points[start : start + chunk_size] - centeroid
+        cov_m += np.dot(centered_points.T, centered_points)
+    cov_m /= len(points) - 1
 
-    # 固有値と固有ベクトルを計算
-    eigenvalues, eigenvectors = np.linalg.eig(cov_m)
+    # 共分散行列は対称なので、固有値が昇順の実数で求まる eigh を用いる
+    _, eigenvectors = np.linalg.eigh(cov_m)
 
     # 最小の固有値に対応する固有ベクトルを返す
-    normal_vector = eigenvectors[:, np.argmin(eigenvalues)]
-    normal_vector = normal_vector / np.linalg.norm(normal_vector)
-    return normal_vector.real
+    normal_vector: NDArray[np.floating] = eigenvectors[:, 0] / np.linalg.norm(eigenvectors[:, 0])
+    return normal_vector
@@ -0,0 +1,134 @@
+from typing import TYPE_CHECKING, Dict, Optional
+
+import numpy as np
+from numpy.typing import NDArray
+
+if TYPE_CHECKING:
+    from scipy.sparse import csr_matrix
+
+
+class PointIndex:
+    """
+    点群の空間インデックス
+
+    点群ごとに1回だけ構築し、近傍探索を行う複数の関数で使い回す。
+    KD木(cKDTree)に加え、voxel_size指定時はボクセルハッシュ(点の属するボクセル番号)を持つ。
+
+    :param points: 点群(N, D)
+    :param voxel_size: ボクセルハッシュのボクセルサイズ, Noneの場合はボクセルハッシュを作らない
+    :param leafsize: KD木の葉の点数
+    """
+
+    def __init__(self, points: NDArray[np.floating], voxel_size: Optional[float] = None, leafsize: int = 16):
+        # scipyの読み込みは時間がかかるため、使用時に読み込む
+        from scipy.spatial import cKDTree
+
+        self.points = np.asarray(points)
+        self.tree = cKDTree(self.points, leafsize=leafsize)
+        self.voxel_size = voxel_size
+        self._neighbors: Dict[float, "csr_matrix"] = {}
+
+        if voxel_size is not None:
+            keys = np.floor(self.points / voxel_size).astype(np.int64)
+            # voxel_keys: 点を含むボクセルの格子座標(V, D), voxel_ids: 各点のボクセル番号(N, )
+            self.voxel_keys, voxel_ids = np.unique(keys, axis=0, return_inverse=True)
+            self.voxel_ids: NDArray[np.intp] = voxel_ids.reshape(-1)
+
+    def __len__(self) -> int:
+        return len(self.points)
+
+    @property
+    def voxel_centers(self) -> NDArray[np.floating]:
+        """
+        点を含むボクセルの中心座標(V, D)
+        """
+        if self.voxel_size is None:
+            raise ValueError("PointIndex was built without voxel_size.")
+        centers: NDArray[np.floating] = (self.voxel_keys + 0.5) * self.voxel_size
+        return centers
+
+    def points_in_voxels(self, voxel_mask: NDArray[np.bool_]) -> NDArray[np.intp]:
+        """
+        指定したボクセルに含まれる点のポインタ
+
+        :param voxel_mask: ボクセルごとの選択フラグ(V, )
+        :return: 点ポインタ(M, ) (昇順)
+        """
+        if self.voxel_size is None:
+            raise ValueError("PointIndex was built without voxel_size.")
+        return np.where(voxel_mask[self.voxel_ids])[0]
+
+    def prune_voxels(self, voxel_distances: NDArray[np.floating], max_distance: float) -> NDArray[np.intp]:
+        """
+        ボクセル中心から図形までの距離をもとに、図形から max_distance 以内にある可能性のある点を絞り込む
+
+        ボクセル内の点とボクセル中心の距離はボクセルの外接球半径以下であるため、
+        中心の距離が max_distance + 外接球半径 を超えるボクセルの点は除外できる。
+
+        :param voxel_distances: ボクセル中心から図形までの距離(V, )
+        :param max_distance: 距離閾値
+        :return: 候補の点ポインタ(M, ) (昇順)
+        """
+        if self.voxel_size is None:
+            raise ValueError("PointIndex was built without voxel_size.")
+        margin = self.voxel_size * np.sqrt(self.points.shape[1]) / 2
+        return self.points_in_voxels(voxel_distances <= max_distance + margin)
+
+    def query_radius(self, center: NDArray[np.floating], radius: float, strict: bool = False) -> NDArray[np.intp]:
+        """
+        中心から半径以内にある点を探索する
+
+        :param center: 中心座標(D, )
+        :param radius: 半径
+        :param strict: Trueの場合は半径ちょうどの点を含めない
+        :return: 点ポインタ(M, ) (昇順)
+        """
+        if not strict:
+            indices = np.asarray(self.tree.query_ball_point(center, radius), dtype=np.intp)
+            indices.sort()
+            return indices
+        # 丸め誤差で候補から漏れないよう半径をわずかに広げて探索し、境界は後段で判定する
+        indices = np.asarray(self.tree.query_ball_point(center, radius * (1 + 1e-9)), dtype=np.intp)
+        indices.sort()
+        strict_indices: NDArray[np.intp] = indices[np.linalg.norm(self.points[indices] - center, axis=1) < radius]
+        return strict_indices
+
+    def query_box(self, lower: NDArray[np.floating], upper: NDArray[np.floating]) -> NDArray[np.intp]:
+        """
+        軸並行な直方体 lower <= p <= upper の内部にある点を探索する
+
+        :param lower: 直方体の最小座標(D, )
+        :param upper: 直方体の最大座標(D, )
+        :return: 点ポインタ(M, ) (昇順)
+        """
+        lower = np.asarray(lower, dtype=np.float64)
+        upper = np.asarray(upper, dtype=np.float64)
+        if self.voxel_size is not None:
+            # 直方体と重なるボクセルの点のみを候補とする
+            key_lower = np.floor(lower / self.voxel_size)
+            key_upper = np.floor(upper / self.voxel_size)
+            voxel_mask = np.all((self.voxel_keys >= key_lower) & (self.voxel_keys <= key_upper), axis=1)
+            candidates = self.points_in_voxels(voxel_mask)
+        else:
+            # 直方体を含む立方体(チェビシェフ距離の球)をわずかに広げて候補を絞り、境界は後段で判定する
+            center = (lower + upper) / 2
+            half_width = float(np.max(upper - lower)) / 2 * (1 + 1e-9) + 1e-12
+            candidates = np.asarray(self.tree.query_ball_point(center, half_width, p=np.inf), dtype=np.intp)
+            candidates.sort()
+        inside = np.all((self.points[candidates] >= lower) & (self.points[candidates] <= upper), axis=1)
+        indices: NDArray[np.intp] = candidates[inside]
+        return indices
+
+    def neighbors(self, eps: float) -> "csr_matrix":
+        """
+        距離eps以内の点の組を疎な距離行列として返す(自身との距離0を含む)
+
+        同じepsでの結果はキャッシュし、2回目以降は再計算しない。
+
+        :param eps: 近傍とみなす距離
+        :return: 距離行列(N, N)
+        """
+        if eps not in self._neighbors:
+            graph = self.tree.sparse_distance_matrix(self.tree, eps, output_type="coo_matrix")
+            self._neighbors[eps] = graph.tocsr()
+        return self._neighbors[eps]
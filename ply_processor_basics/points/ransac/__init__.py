@@ -1,5 +1,6 @@
 from .detect_circle import detect_circle as detect_circle
 from .detect_line import detect_line as detect_line
 from .detect_plane import detect_plane as detect_plane
+from .detect_planes import detect_planes as detect_planes
 
-__all__ = ["detect_circle", "detect_plane", "detect_line"]
+__all__ = ["detect_circle", "detect_plane", "detect_planes", "detect_line"]
@@ -1,11 +1,14 @@
-import datetime
 import math
-from typing import Tuple
+from typing import Dict, Optional, Tuple, Union
 
 import numpy as np
 from numpy.typing import NDArray
 
-from ply_processor_basics.points import transform_to_plane_coordinates
+from ply_processor_basics.points import PointIndex, transform_to_plane_coordinates
+
+from .refine import refine_circle
+from .run_hypotheses import run_hypotheses
+from .sample_indices import sample_indices
 
 
 def detect_circle(
@@ -14,6 +17,13 @@ def detect_circle(
     density_threshold: float = 0.8,
     voxel_size: float = 1.0,
     max_iteration: int = 10000,
+    confidence: Optional[float] = None,
+    seed: Union[None, int, np.random.Generator] = None,
+    workers: int = 1,
+    refine_iterations: int = 3,
+    stats: Optional[Dict[str, int]] = None,
+    index: Optional[PointIndex] = None,
+    coarse_voxel_size: Optional[float] = None,
 ) -> Tuple[NDArray[np.floating], NDArray[np.floating], NDArray[np.floating], float]:
     """
     平面上の点群から最大円をRANSACで検出する関数
@@ -23,6 +33,15 @@ def detect_circle(
     :param density_threshold: 円内に含まれる点の密度閾値
     :param voxel_size: 格子点のサイズ
     :param max_iteration: RANSACの最大繰り返し回数
+    :param confidence: 指定時は最良円の周上(±voxel_size)にある格子点の割合から必要な繰り返し回数を更新し、
+        max_iterationを上限に早期終了する(例: 0.999)
+    :param seed: 乱数シードまたは乱数生成器, 同じシードでは同じ結果を返す
+    :param workers: 仮説を並列に評価するスレッド数, 結果は並列数によらない
+    :param refine_iterations: 検出した円の外周点で円を反復重み付き最小二乗法により再推定する反復回数, 0の場合は再推定しない
+    :param stats: 指定時は実際の繰り返し回数を stats["iterations"] に格納する
+    :param index: pointsで構築した空間インデックス, 指定時は円内の点を全点走査せずに探索する
+    :param coarse_voxel_size: 指定時はこのサイズの粗い格子でRANSACを行い、元の点群の外周点で
+        粗い格子サイズ、voxel_sizeの順に円を再推定する(refine_iterationsが0でも1回以上再推定する)
     :return: 検出した円の点ポインタ(N, ), 円中心座標(3, ), 円法線(3, ), 円半径
     """
     # 方針: 平面上の点群をXY平面に射影し、RANSACで円を検出する
@@ -30,45 +49,73 @@ def detect_circle(
     # 2. 3点をランダムサンプリングし、円の方程式を求める
     # 3. 円内に含まれる点の密度を計算し、密度閾値以上である最大円を算出する
     # 4. 最大円の内部に含まれる点を返す
+    if index is not None and len(index) != len(points):
+        raise ValueError("index must be built on the same points.")
     assert abs(plane_model[2]) > 1e-6
     origin = np.asarray([0, 0, -plane_model[3] / plane_model[2]])
     points_rotated, inv_matrix = transform_to_plane_coordinates(points, origin, plane_model[:3])
     points_xy = points_rotated[:, :2]
 
     # 格子化
-    grid_size = np.floor(points_xy.ptp(axis=0) / voxel_size + 1).astype(np.int32)
-    grid = np.zeros(grid_size, dtype=np.int32)
-    for point in points_xy:
-        x, y = np.floor((point - points_xy.min(axis=0)) / voxel_size).astype(np.int32)
-        grid[x, y] = 1
-    grid_points = np.argwhere(grid == 1) * voxel_size + points_xy.min(axis=0)
+    grid_size = voxel_size if coarse_voxel_size is None else coarse_voxel_size
+    xy_min = points_xy.min(axis=0)
+    cells = np.floor((points_xy - xy_min) / grid_size).astype(np.intp)
+    grid = np.zeros(cells.max(axis=0) + 1, dtype=bool)
+    grid[cells[:, 0], cells[:, 1]] = True
+    grid_points = np.argwhere(grid) * grid_size + xy_min
+    # 列ごとの累積和(summed-area table)で円内の格子点数を数える
+    column_sums = np.zeros((grid.shape[0], grid.shape[1] + 1), dtype=np.intp)
+    np.cumsum(grid, axis=1, out=column_sums[:, 1:])
 
     # 3点をランダムサンプリング
-    best_radius = 0
-    best_center = np.zeros(2)
-    for i in range(max_iteration):
-        np.random.seed(datetime.datetime.now().microsecond)
-        sample_points = grid_points[np.random.choice(len(grid_points), 3, replace=False)]
-        # 3点から円の方程式を求める
-        p1 = sample_points[0]
-        p2 = sample_points[1]
-        p3 = sample_points[2]
-        a = np.array([[2 * (p2[0] - p1[0]), 2 * (p2[1] - p1[1])], [2 * (p3[0] - p1[0]), 2 * (p3[1] - p1[1])]])
-        b = np.array(
-            [p2[0] ** 2 + p2[1] ** 2 - p1[0] ** 2 - p1[1] ** 2, p3[0] ** 2 + p3[1] ** 2 - p1[0] ** 2 - p1[1] ** 2]
-        )
-        try:
-            center = np.linalg.solve(a, b)
-        except np.linalg.LinAlgError:
-            continue
-        radius = np.sqrt(np.sum((p1 - center) ** 2))
+    samples = sample_indices(len(grid_points), 3, max_iteration, np.random.default_rng(seed))
+
+    def score(start: int, stop: int) -> NDArray[np.floating]:
+        # 密度閾値を満たす円の半径を評価値とする
+        centers, radiuses = fit_circles(grid_points[samples[start:stop]])
+        valid = radiuses > 0
+        counts = count_grid_points_in_circles(column_sums, xy_min, grid_size, centers[valid], radiuses[valid])
 
         # 円内に含まれる格子点の密度計算
-        inliers = np.linalg.norm(grid_points - center[:2], axis=1) < radius
-        density = (len(grid_points[inliers]) * voxel_size**2) / (math.pi * radius**2)
-        if density > density_threshold and radius > best_radius:
-            best_radius = radius
-            best_center = center[:2]
+        density = (counts * grid_size**2) / (math.pi * radiuses[valid] ** 2)
+        scores = np.zeros(stop - start)
+        scores[valid] = np.where(density > density_threshold, radiuses[valid], 0.0)
+        return scores
+
+    def inlier_ratio(i: int, radius: float) -> float:
+        # 最良円の周上にある格子点をインライアとみなす
+        centers, _ = fit_circles(grid_points[samples[i : i + 1]])
+        ring = np.abs(np.linalg.norm(grid_points - centers[0], axis=1) - radius) <= grid_size
+        return np.count_nonzero(ring) / len(grid_points)
+
+    radiuses = run_hypotheses(
+        score,
+        max_iteration,
+        batch_size=256,
+        workers=workers,
+        confidence=confidence,
+        sample_size=3,
+        inlier_ratio=inlier_ratio,
+    )
+    if stats is not None:
+        stats["iterations"] = len(radiuses)
+
+    # 同じ半径の場合は先に生成された仮説を優先する
+    best_radius = 0.0
+    best_center = np.zeros(2)
+    if len(radiuses) > 0 and radiuses.max() > 0:
+        best = int(np.argmax(radiuses))
+        centers, _ = fit_circles(grid_points[samples[best : best + 1]])
+        best_center, best_radius = centers[0], float(radiuses[best])
+
+    # 円周付近の外周点のみで円を再推定する(円内部の点は円周の推定に寄与しないため除外)
+    bands = [voxel_size] if coarse_voxel_size is None else [coarse_voxel_size, voxel_size]
+    iterations = refine_iterations if coarse_voxel_size is None else max(refine_iterations, 1)
+    for band in bands:
+        if iterations == 0 or best_radius == 0:
+            break
+        edge = outer_edge_points(points_xy, best_center, best_radius, 2 * band)
+        best_center, best_radius, _ = refine_circle(points_xy[edge], best_center, best_radius, 2 * band, iterations)
 
     # # visualize
     # fig, ax = plt.subplots()
@@ -85,7 +132,112 @@ def detect_circle(
     best_center = np.dot(inv_matrix, np.hstack([best_center, 1]).T).T
 
     # 中心点から半径距離にある点を抽出
-    best_inliers = np.linalg.norm(points - best_center[:3], axis=1) < best_radius
+    if index is not None:
+        best_inliers = np.zeros(len(points), dtype=bool)
+        best_inliers[index.query_radius(best_center[:3], best_radius, strict=True)] = True
+    else:
+        best_inliers = np.linalg.norm(points - best_center[:3], axis=1) < best_radius
 
     normal = plane_model[:3] / np.linalg.norm(plane_model[:3])
     return best_inliers, best_center[:3], normal, best_radius
+
+
+def outer_edge_points(
+    points_xy: NDArray[np.floating],
+    center: NDArray[np.floating],
+    radius: float,
+    band: float,
+    n_bins: int = 64,
+) -> NDArray[np.intp]:
+    """
+    円周付近の点のうち、角度ごとに最も外側にある点を抽出する
+
+    :param points_xy: 平面座標系の点群(N, 2)
+    :param center: 円中心(2, )
+    :param radius: 円半径
+    :param band: 円周からの距離閾値
+    :param n_bins: 角度の分割数
+    :return: 外周点のポインタ(M, )
+    """
+    offsets = points_xy - center
+    distances = np.linalg.norm(offsets, axis=1)
+    candidates = np.where(np.abs(distances - radius) <= band)[0]
+    angles = np.arctan2(offsets[candidates, 1], offsets[candidates, 0])
+    bins = np.minimum(np.floor((angles + np.pi) / (2 * np.pi) * n_bins).astype(np.intp), n_bins - 1)
+
+    # 角度ごとに距離の降順に並べ、先頭の点を取る
+    order = np.lexsort((-distances[candidates], bins))
+    first = np.concatenate([[True], bins[order][1:] != bins[order][:-1]])
+    edge: NDArray[np.intp] = candidates[order[first]]
+    return edge
+
+
+def fit_circles(sample_points: NDArray[np.floating]) -> Tuple[NDArray[np.floating], NDArray[np.floating]]:
+    """
+    3点を通る円を一括で求める
+
+    :param sample_points: 平面上の3点の組(K, 3, 2)
+    :return: 円中心(K, 2), 円半径(K, ), 3点が同一直線上にある場合の半径は0
+    """
+    p1 = sample_points[:, 0, :]
+    p2 = sample_points[:, 1, :]
+    p3 = sample_points[:, 2, :]
+    # 2(p2 - p1)・c = |p2|^2 - |p1|^2, 2(p3 - p1)・c = |p3|^2 - |p1|^2 をクラメルの公式で解く
+    a = 2 * (p2 - p1)
+    b = 2 * (p3 - p1)
+    rhs1 = np.sum(p2**2, axis=1) - np.sum(p1**2, axis=1)
+    rhs2 = np.sum(p3**2, axis=1) - np.sum(p1**2, axis=1)
+    det = a[:, 0] * b[:, 1] - a[:, 1] * b[:, 0]
+    valid = det != 0
+    det = np.where(valid, det, 1.0)
+    centers = np.column_stack([(rhs1 * b[:, 1] - a[:, 1] * rhs2) / det, (a[:, 0] * rhs2 - rhs1 * b[:, 0]) / det])
+    radiuses: NDArray[np.floating] = np.where(valid, np.linalg.norm(p1 - centers, axis=1), 0.0)
+    return centers, radiuses
+
+
+def count_grid_points_in_circles(
+    column_sums: NDArray[np.intp],
+    grid_origin: NDArray[np.floating],
+    voxel_size: float,
+    centers: NDArray[np.floating],
+    radiuses: NDArray[np.floating],
+) -> NDArray[np.intp]:
+    """
+    列ごとの累積和を用いて、円の内部(境界を含まない)にある格子点の数を一括で数える
+
+    円がかかる列ごとに、円内に入る行の範囲の格子点数を累積和の差で求めるため、
+    計算量は格子点数ではなく円の直径方向の列数に比例する。
+
+    :param column_sums: 列ごとの格子点数の累積和(nx, ny + 1)
+    :param grid_origin: 格子点(0, 0)の座標(2, )
+    :param voxel_size: 格子点の間隔
+    :param centers: 円中心(K, 2)
+    :param radiuses: 円半径(K, )
+    :return: 円内の格子点数(K, )
+    """
+    nx, ny = column_sums.shape[0], column_sums.shape[1] - 1
+    u = (centers - grid_origin) / voxel_size
+    r = radiuses / voxel_size
+
+    # 円がかかる列の範囲 (u_x - r < i < u_x + r)
+    lo = (np.floor(np.clip(u[:, 0] - r, -1, nx)) + 1).astype(np.intp)
+    hi = (np.ceil(np.clip(u[:, 0] + r, -1, nx)) - 1).astype(np.intp)
+    lo = np.maximum(lo, 0)
+    hi = np.minimum(hi, nx - 1)
+    spans = np.maximum(hi - lo + 1, 0)
+
+    # 円ごとの列を1次元に展開する
+    circle_ids = np.repeat(np.arange(len(r)), spans)
+    columns = lo[circle_ids] + np.arange(np.sum(spans)) - np.repeat(np.cumsum(spans) - spans, spans)
+
+    # 各列で円内に入る行の範囲 (u_y - w < j < u_y + w)
+    dx = columns - u[circle_ids, 0]
+    w = np.sqrt(np.maximum(r[circle_ids] ** 2 - dx**2, 0.0))
+    row_lo = np.maximum((np.floor(np.clip(u[circle_ids, 1] - w, -1, ny)) + 1).astype(np.intp), 0)
+    row_hi = np.minimum((np.ceil(np.clip(u[circle_ids, 1] + w, -1, ny)) - 1).astype(np.intp), ny - 1)
+    inside = row_hi >= row_lo
+    column_counts = np.where(
+        inside, column_sums[columns, np.maximum(row_hi, -1) + 1] - column_sums[columns, np.minimum(row_lo, ny)], 0
+    )
+    counts: NDArray[np.intp] = np.bincount(circle_ids, weights=column_counts, minlength=len(r)).astype(np.intp)
+    return counts
@@ -1,10 +1,13 @@
-import datetime
-from typing import Tuple, Union
+from typing import Dict, Optional, Tuple, Union
 
 import numpy as np
 from numpy.typing import NDArray
 
-from ply_processor_basics.points import get_distances_to_line
+from ply_processor_basics.points import get_distances_to_line, get_distances_to_lines, voxel_downsample
+
+from .refine import refine_line
+from .run_hypotheses import run_hypotheses
+from .sample_indices import sample_indices
 
 
 def detect_line(
@@ -12,6 +15,14 @@ def detect_line(
     threshold: float = 0.1,
     max_iteration: int = 1000,
     recursive: bool = True,
+    refine_iterations: int = 3,
+    confidence: Optional[float] = None,
+    pretest: int = 0,
+    seed: Union[None, int, np.random.Generator] = None,
+    workers: int = 1,
+    stats: Optional[Dict[str, int]] = None,
+    coarse_voxel_size: Optional[float] = None,
+    chunk_size: int = 8192,
 ) -> Tuple[NDArray[np.intp], Union[NDArray[np.floating], None]]:
     """
     点群データから最大点数の直線を検出する関数
@@ -19,30 +30,98 @@ def detect_line(
     :param points: 点群データ(N, 3)
     :threshold: 抽出距離閾値
     :max_iteration: 最大繰り返し回数
-    :recursive: 再帰的に直線を検出するかどうか
+    :recursive: インライアで直線を再推定し、閾値の半分で点群を絞り込むかどうか
+    :refine_iterations: 再推定(反復重み付き最小二乗法)の反復回数
+    :confidence: 指定時はインライア率から必要な繰り返し回数を更新し、max_iterationを上限に早期終了する(例: 0.999)
+    :pretest: 指定時は各仮説をランダムなpretest点で事前評価し(T(d,d)テスト)、全点がインライアだった仮説のみ点群全体で評価する
+    :seed: 乱数シードまたは乱数生成器, 同じシードでは同じ結果を返す
+    :workers: 仮説を並列に評価するスレッド数, 結果は並列数によらない
+    :stats: 指定時は実際の繰り返し回数を stats["iterations"] に、
+        点群全体で評価した仮説数を stats["evaluated"] に格納する
+    :coarse_voxel_size: 指定時はこのボクセルサイズで間引いた点群でRANSACを行い、元の点群で直線を再推定してインライアを選ぶ
+    :chunk_size: 仮説の評価で一度に評価する点の数
     :return: 直線の点群ポインタ(N, ), 直線の方程式p+tv=0
     """
     best_inliers = np.array([], dtype=np.intp)
     best_model = None
 
-    for _ in range(max_iteration):
-        np.random.seed(datetime.datetime.now().microsecond)
-        sample_indices = np.random.choice(len(points), 2, replace=False)
-        p1, p2 = points[sample_indices]
+    # 粗い点群で仮説を評価し、元の点群で再推定する
+    fit_points = points if coarse_voxel_size is None else voxel_downsample(points, coarse_voxel_size)[0]
+
+    # 仮説と事前評価に使う点をまとめてサンプリング
+    rng = np.random.default_rng(seed)
+    samples = sample_indices(len(fit_points), 2, max_iteration, rng)
+    test_indices = rng.integers(0, len(fit_points), size=(max_iteration, pretest))
 
-        # 直線の方向ベクトルを計算
-        v = p2 - p1
-        v = v / np.linalg.norm(v)
-        p = p1
+    def line_models(start: int, stop: int) -> Tuple[NDArray[np.floating], NDArray[np.bool_]]:
+        # 仮説 start..stop-1 の直線の方程式(B, 2, 3)と、2点が一致せず方向が定まるかどうか(B, )
+        p1 = fit_points[samples[start:stop, 0]]
+        v = fit_points[samples[start:stop, 1]] - p1
+        norms = np.linalg.norm(v, axis=1)
+        valid = norms > 0
+        v = np.where(valid[:, np.newaxis], v / np.where(valid, norms, 1.0)[:, np.newaxis], [1.0, 0.0, 0.0])
+        return np.stack([p1, v], axis=1), valid
 
-        distances = get_distances_to_line(points, p, v)
-        inliers = np.where(distances < threshold)[0]
+    def score(start: int, stop: int) -> NDArray[np.floating]:
+        models, valid = line_models(start, stop)
+        n_models = len(models)
+        # 事前評価で外れた仮説は点群全体での評価を省略する
+        passed = np.ones(n_models, dtype=bool)
+        if pretest > 0:
+            # 各仮説の評価点(B, pretest, 3)から自身の直線への距離の2乗 |x - p|^2 - ((x - p)・v)^2
+            diffs = fit_points[test_indices[start:stop]] - models[:, np.newaxis, 0]
+            projections = np.einsum("bij,bj->bi", diffs, models[:, 1])
+            test_distances = np.einsum("bij,bij->bi", diffs, diffs) - projections**2
+            passed = np.all(test_distances < threshold**2, axis=1) | ~valid
+        # 2点が一致する仮説はインライア数0とする
+        counts = np.where(passed, 0.0, -1.0)
+        evaluate = passed & valid
+        if np.any(evaluate):
+            counts[evaluate] = _count_line_inliers(fit_points, models[evaluate], threshold, chunk_size)
+        return counts
 
-        if len(inliers) > len(best_inliers):
-            best_inliers = inliers
-            best_model = np.asarray([p, v])
+    counts = run_hypotheses(
+        score,
+        max_iteration,
+        batch_size=64,
+        workers=workers,
+        confidence=confidence,
+        sample_size=2 + pretest,
+        inlier_ratio=lambda i, count: count / len(fit_points),
+    )
+    iterations = len(counts)
+    evaluated = int(np.count_nonzero(counts >= 0))
 
-    if recursive:
-        inliers, best_model = detect_line(points[best_inliers], threshold / 2, max_iteration, recursive=False)
+    # 同数の場合は先に生成された仮説を優先する
+    if len(counts) > 0 and counts.max() > 0:
+        best = int(np.argmax(counts))
+        best_model = line_models(best, best + 1)[0][0]
+        if coarse_voxel_size is not None:
+            best_model, best_inliers = refine_line(points, best_model, threshold, max(refine_iterations, 1))
+        else:
+            best_inliers = np.where(get_distances_to_line(points, best_model[0], best_model[1]) < threshold)[0]
+
+    # インライアのみで直線を再推定し、閾値の半分で絞り込む
+    if recursive and best_model is not None:
+        best_model, inliers = refine_line(points[best_inliers], best_model, threshold / 2, refine_iterations)
         best_inliers = best_inliers[inliers]
+    if stats is not None:
+        stats["iterations"] = iterations
+        stats["evaluated"] = evaluated
+    # モデルのパラメータは入力の型によらずfloat64で返す
+    if best_model is not None:
+        best_model = np.asarray(best_model, dtype=np.float64)
     return best_inliers, best_model
+
+
+def _count_line_inliers(
+    points: NDArray[np.floating], line_models: NDArray[np.floating], threshold: float, chunk_size: int
+) -> NDArray[np.intp]:
+    """
+    直線仮説(K, 2, 3)ごとに距離が閾値未満の点数を数える, 距離の2乗で比較し (chunk_size, K) 以上の配列を作らない
+    """
+    counts = np.zeros(len(line_models), dtype=np.intp)
+    for start in range(0, len(points), chunk_size):
+        squared = get_distances_to_lines(points[start : start + chunk_size], line_models, squared=True)
+        counts += np.count_nonzero(squared < threshold**2, axis=0)
+    return counts
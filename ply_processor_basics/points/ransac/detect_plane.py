@@ -1,11 +1,13 @@
-import datetime
-import random
-from typing import Tuple, Union
+from typing import Dict, Optional, Tuple, Union
 
 import numpy as np
 from numpy.typing import NDArray
 
-from ply_processor_basics.points import get_normal_vector
+from ply_processor_basics.points import get_normal_vector, voxel_downsample
+
+from .refine import refine_plane
+from .run_hypotheses import run_hypotheses
+from .sample_indices import sample_indices
 
 
 def detect_plane(
@@ -13,6 +15,13 @@ def detect_plane(
     threshold: float = 0.1,
     minPoints: int = 100,
     maxIteration: int = 1000,
+    confidence: Optional[float] = None,
+    pretest: int = 0,
+    seed: Union[None, int, np.random.Generator] = None,
+    workers: int = 1,
+    refine_iterations: int = 0,
+    stats: Optional[Dict[str, int]] = None,
+    coarse_voxel_size: Optional[float] = None,
 ) -> Union[Tuple[NDArray[np.floating], NDArray[np.floating]], Tuple[None, None]]:
     """
     点群から最大平面をRANSACで検出する関数
@@ -21,63 +30,209 @@ def detect_plane(
     :param threshold: threshold for RANSAC
     :param minPoints: minimum number of points for RANSAC
     :param maxIteration: maximum number of iterations for RANSAC
+    :param confidence: 指定時はインライア率から必要な繰り返し回数を更新し、maxIterationを上限に早期終了する(例: 0.999)
+    :param pretest: 指定時は各仮説をランダムなpretest点で事前評価し(T(d,d)テスト)、
+        全点がインライアだった仮説のみ点群全体で評価する
+    :param seed: 乱数シードまたは乱数生成器, 同じシードでは同じ結果を返す
+    :param workers: 仮説を並列に評価するスレッド数, 結果は並列数によらない
+    :param refine_iterations: 指定時は検出した平面を反復重み付き最小二乗法で再推定し、インライアを選び直す
+    :param stats: 指定時は実際の繰り返し回数を stats["iterations"] に、
+        点群全体で評価した仮説数を stats["evaluated"] に格納する
+    :param coarse_voxel_size: 指定時はこのボクセルサイズで間引いた点群でRANSACを行い、
+        元の点群で平面を再推定してインライアを選ぶ(minPointsは元の点群のインライア数で判定する)
     :return: 検出した平面上の点ポインタ, 平面方程式 ax+by+cz+d=0 の係数(N, 4)
 
     検出失敗時は None を返す
     """
     plane = Plane()
 
-    inliers = plane.fit(points, thresh=threshold, minPoints=minPoints, maxIteration=maxIteration)
+    # 粗い点群で仮説を評価し、元の点群で再推定する
+    fit_points = points if coarse_voxel_size is None else voxel_downsample(points, coarse_voxel_size)[0]
+    inliers = plane.fit(
+        fit_points,
+        thresh=threshold,
+        minPoints=minPoints if coarse_voxel_size is None else 3,
+        maxIteration=maxIteration,
+        confidence=confidence,
+        pretest=pretest,
+        rng=np.random.default_rng(seed),
+        workers=workers,
+    )
+    if stats is not None:
+        stats["iterations"] = plane.iterations
+        stats["evaluated"] = plane.evaluated
 
     if len(inliers) == 0:
         return None, None
 
     # 平面方程式を算出
-    normal = get_normal_vector(points[inliers])
-    center = np.mean(points[inliers], axis=0)
+    normal = get_normal_vector(fit_points[inliers])
+    center = np.mean(fit_points[inliers], axis=0)
     plane_model = np.asarray([normal[0], normal[1], normal[2], -np.dot(normal, center)])
+    if coarse_voxel_size is not None:
+        plane_model, inliers = refine_plane(points, plane_model, threshold, max(refine_iterations, 1))
+        if len(inliers) < minPoints:
+            return None, None
+    elif refine_iterations > 0:
+        plane_model, inliers = refine_plane(points, plane_model, threshold, refine_iterations)
     return inliers, plane_model
 
 
 class Plane:
     def __init__(self):
         self.inliers = []
-
-    def fit(self, pts, thresh=0.1, minPoints=100, maxIteration=1000, normal_samples=10):
+        self.iterations = 0
+        self.evaluated = 0
+
+    def fit(
+        self,
+        pts,
+        thresh=0.1,
+        minPoints=100,
+        maxIteration=1000,
+        normal_samples=10,
+        rng=None,
+        batch_size=128,
+        chunk_size=8192,
+        confidence=None,
+        pretest=0,
+        workers=1,
+    ):
+        """
+        RANSACで最大平面の点ポインタを求める
+
+        仮説(3点の組)を batch_size 個ずつまとめて生成し、外積1回で法線を算出する。
+        インライア数は点群を chunk_size 点ずつに分割した (chunk_size, batch_size) の行列積で数えるため、
+        使用メモリは点数によらず batch_size * chunk_size に抑えられる。
+
+        :param pts: 点群(N, 3)
+        :param thresh: 平面からの距離閾値
+        :param minPoints: 平面とみなす最小点数
+        :param maxIteration: 仮説の数
+        :param rng: 乱数生成器, Noneの場合は新規に生成
+        :param batch_size: 一度に評価する仮説の数
+        :param chunk_size: 一度に評価する点の数
+        :param confidence: 指定時は適応的RANSACで早期終了する, 実際の繰り返し回数は self.iterations に格納
+        :param pretest: T(d,d)テストの点数d, 0の場合は全仮説を点群全体で評価する
+        :param workers: 仮説を並列に評価するスレッド数, 結果は並列数によらない
+        :return: 平面上の点ポインタ(M, ), 検出失敗時は空リスト
+        """
         n_points = pts.shape[0]
-        best_inliers = []
-
-        for it in range(maxIteration):
-            random.seed(datetime.datetime.now().microsecond)
-            id_samples = random.sample(range(0, n_points), 3)
-            pt_samples = pts[id_samples]
-
-            vecA = pt_samples[1, :] - pt_samples[0, :]
-            vecB = pt_samples[2, :] - pt_samples[0, :]
-
-            vecC = np.cross(vecA, vecB)
-            normC = np.linalg.norm(vecC)
-
-            # ランダムサンプリングした3点がほぼ同一直線上にある場合はスキップ
-            if normC < 1e-6:
-                continue
+        if rng is None:
+            rng = np.random.default_rng()
+        # 仮説と事前評価に使う点をまとめてサンプリングするため、結果はバッチ分割・並列数によらない
+        samples = sample_indices(n_points, 3, maxIteration, rng)
+        test_indices = rng.integers(0, n_points, size=(maxIteration, pretest))
+
+        def score(start: int, stop: int) -> NDArray[np.floating]:
+            normals, offsets = self.hypothesize(pts[samples[start:stop]])
+            if pretest == 0:
+                return self.count_inliers(pts, normals, offsets, thresh, chunk_size).astype(np.float64)
+            counts = np.full(len(normals), -1.0)
+            passed = self.pretest(pts, normals, offsets, thresh, test_indices[start:stop])
+            counts[passed] = self.count_inliers(pts, normals[passed], offsets[passed], thresh, chunk_size)
+            return counts
+
+        # 事前評価を通過する確率も考慮し、サンプル点数を3 + pretestとして扱う
+        counts = run_hypotheses(
+            score,
+            maxIteration,
+            batch_size=batch_size,
+            workers=workers,
+            confidence=confidence,
+            sample_size=3 + pretest,
+            inlier_ratio=lambda i, count: count / n_points,
+        )
+        self.iterations = len(counts)
+        self.evaluated = int(np.count_nonzero(counts >= 0))
+
+        # 同数の場合は先に生成された仮説を優先する(逐次評価と同じ結果になる)
+        best_model = None
+        if len(counts) > 0 and counts.max() > 0:
+            normals, offsets = self.hypothesize(pts[samples[[int(np.argmax(counts))]]])
+            best_model = (normals[0], offsets[0])
 
-            vecC = vecC / normC
-            k = -np.sum(np.multiply(vecC, pt_samples[1, :]))
-            plane_eq = [vecC[0], vecC[1], vecC[2], k]
-
-            pt_id_inliers = []
-            dist_pt = (
-                plane_eq[0] * pts[:, 0] + plane_eq[1] * pts[:, 1] + plane_eq[2] * pts[:, 2] + plane_eq[3]
-            ) / np.sqrt(plane_eq[0] ** 2 + plane_eq[1] ** 2 + plane_eq[2] ** 2)
-
-            pt_id_inliers = np.where(np.abs(dist_pt) <= thresh)[0]
-            if len(pt_id_inliers) > len(best_inliers):
-                best_inliers = pt_id_inliers
-
-        self.inliers = best_inliers
+        self.inliers = []
+        if best_model is not None:
+            normal, offset = best_model
+            self.inliers = np.where(np.abs(np.dot(pts, normal) + offset) <= thresh)[0]
 
         if len(self.inliers) < minPoints:
             return []
 
         return self.inliers
+
+    @staticmethod
+    def hypothesize(pt_samples: NDArray[np.floating]) -> Tuple[NDArray[np.floating], NDArray[np.floating]]:
+        """
+        3点の組から平面仮説を一括で求める
+
+        :param pt_samples: 3点の組(K, 3, 3)
+        :return: 単位法線(K, 3), 定数項(K, ), 3点がほぼ同一直線上にある仮説の法線は0ベクトル
+        """
+        vecA = pt_samples[:, 1, :] - pt_samples[:, 0, :]
+        vecB = pt_samples[:, 2, :] - pt_samples[:, 0, :]
+
+        vecC = np.cross(vecA, vecB)
+        normC = np.linalg.norm(vecC, axis=1)
+
+        # ランダムサンプリングした3点がほぼ同一直線上にある場合は無効な仮説とする
+        valid = normC >= 1e-6
+        normals = np.where(valid[:, np.newaxis], vecC / np.where(valid, normC, 1.0)[:, np.newaxis], 0.0)
+        offsets = -np.einsum("ij,ij->i", normals, pt_samples[:, 1, :])
+        return normals, offsets
+
+    @staticmethod
+    def pretest(
+        pts: NDArray[np.floating],
+        normals: NDArray[np.floating],
+        offsets: NDArray[np.floating],
+        thresh: float,
+        test_indices: NDArray[np.intp],
+    ) -> NDArray[np.bool_]:
+        """
+        T(d,d)テスト: 仮説ごとにランダムに選んだd点が全てインライアの仮説のみを通過させる
+
+        :param pts: 点群(N, 3)
+        :param normals: 単位法線(K, 3)
+        :param offsets: 定数項(K, )
+        :param thresh: 平面からの距離閾値
+        :param test_indices: 仮説ごとの評価点ポインタ(K, d)
+        :return: 通過した仮説のマスク(K, )
+        """
+        test_points = pts[test_indices]
+        dist_pt = np.abs(np.einsum("kdj,kj->kd", test_points, normals) + offsets[:, np.newaxis])
+        passed: NDArray[np.bool_] = np.all(dist_pt <= thresh, axis=1) & np.any(normals != 0, axis=1)
+        return passed
+
+    @staticmethod
+    def count_inliers(
+        pts: NDArray[np.floating],
+        normals: NDArray[np.floating],
+        offsets: NDArray[np.floating],
+        thresh: float,
+        chunk_size: int = 8192,
+        mask: Optional[NDArray[np.bool_]] = None,
+    ) -> NDArray[np.intp]:
+        """
+        平面仮説ごとのインライア数を数える
+
+        :param pts: 点群(N, 3)
+        :param normals: 単位法線(K, 3), 0ベクトルは無効な仮説
+        :param offsets: 定数項(K, )
+        :param thresh: 平面からの距離閾値
+        :param chunk_size: 一度に評価する点の数
+        :param mask: 指定時はTrueの点のみを数える(N, )
+        :return: インライア数(K, ), 無効な仮説は-1
+        """
+        counts = np.zeros(len(normals), dtype=np.intp)
+        for start in range(0, pts.shape[0], chunk_size):
+            dist_pt = np.dot(pts[start : start + chunk_size], normals.T)
+            dist_pt += offsets
+            np.abs(dist_pt, out=dist_pt)
+            within = dist_pt <= thresh
+            if mask is not None:
+                within &= mask[start : start + chunk_size, np.newaxis]
+            counts += np.count_nonzero(within, axis=0)
+        counts[~np.any(normals != 0, axis=1)] = -1
+        return counts
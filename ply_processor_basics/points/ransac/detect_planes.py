@@ -0,0 +1,84 @@
+from typing import List, Tuple, Union
+
+import numpy as np
+from numpy.typing import NDArray
+
+from ply_processor_basics.points import get_normal_vector
+
+from .detect_plane import Plane
+from .sample_indices import sample_indices
+
+
+def detect_planes(
+    points: NDArray[np.floating],
+    max_planes: int,
+    threshold: float = 0.1,
+    minPoints: int = 100,
+    maxIteration: int = 1000,
+    seed: Union[None, int, np.random.Generator] = None,
+    chunk_size: int = 8192,
+) -> Tuple[NDArray[np.floating], NDArray[np.intp]]:
+    """
+    点群から点数の多い順に複数の平面をRANSACで検出する関数
+
+    検出済みの点は有効点マスクで除外し、点群のコピーは行わない。
+    前回の仮説のうち、サンプル点が全て有効点のものは再利用し、除外した点のインライア数のみを差し引く。
+    不足分の仮説だけを有効点から新たにサンプリングする。
+
+    :param points: 点群(N, 3)
+    :param max_planes: 検出する最大平面数
+    :param threshold: 平面からの距離閾値
+    :param minPoints: 平面とみなす最小点数, これを下回ると検出を終了する
+    :param maxIteration: 1平面あたりの仮説の数
+    :param seed: 乱数シードまたは乱数生成器, 同じシードでは同じ結果を返す
+    :param chunk_size: 一度に評価する点の数
+    :return: 平面方程式 ax+by+cz+d=0 の係数(P, 4), 各点の平面番号(N, ) (どの平面にも属さない点は-1)
+    """
+    rng = np.random.default_rng(seed)
+    n_points = points.shape[0]
+    active = np.ones(n_points, dtype=bool)
+    labels = np.full(n_points, -1, dtype=np.intp)
+    plane_models: List[NDArray[np.floating]] = []
+
+    samples = np.empty((0, 3), dtype=np.intp)
+    normals = np.empty((0, 3))
+    offsets = np.empty(0)
+    counts = np.empty(0, dtype=np.intp)
+    while len(plane_models) < max_planes:
+        active_indices = np.where(active)[0]
+        if len(active_indices) < max(minPoints, 3):
+            break
+
+        # 不足分の仮説を有効点からサンプリングし、有効点のみでインライア数を数える
+        n_new = maxIteration - len(samples)
+        if n_new > 0:
+            new_samples = active_indices[sample_indices(len(active_indices), 3, n_new, rng)]
+            new_normals, new_offsets = Plane.hypothesize(points[new_samples])
+            new_counts = Plane.count_inliers(points, new_normals, new_offsets, threshold, chunk_size, mask=active)
+            samples = np.concatenate([samples, new_samples])
+            normals = np.concatenate([normals, new_normals])
+            offsets = np.concatenate([offsets, new_offsets])
+            counts = np.concatenate([counts, new_counts])
+
+        # 仮説が1つもない場合(maxIteration=0 など)は検出を終了する
+        if len(counts) == 0:
+            break
+        best = int(np.argmax(counts))
+        if counts[best] < minPoints:
+            break
+        inliers = np.where((np.abs(np.dot(points, normals[best]) + offsets[best]) <= threshold) & active)[0]
+
+        # 平面方程式を算出
+        normal = get_normal_vector(points[inliers])
+        center = np.mean(points[inliers], axis=0)
+        plane_models.append(np.asarray([normal[0], normal[1], normal[2], -np.dot(normal, center)]))
+        labels[inliers] = len(plane_models) - 1
+        active[inliers] = False
+
+        # サンプル点が除外された仮説を破棄し、残りは除外点のインライア数を差し引いて再利用する
+        keep = np.all(active[samples], axis=1)
+        samples, normals, offsets, counts = samples[keep], normals[keep], offsets[keep], counts[keep]
+        removed = Plane.count_inliers(points[inliers], normals, offsets, threshold, chunk_size)
+        counts = np.where(counts >= 0, counts - removed, counts)
+
+    return np.asarray(plane_models).reshape(-1, 4), labels
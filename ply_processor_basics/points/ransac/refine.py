@@ -0,0 +1,134 @@
+from typing import Tuple
+
+import numpy as np
+from numpy.typing import NDArray
+
+from ply_processor_basics.points import get_distances_to_line
+
+
+def refine_plane(
+    points: NDArray[np.floating], plane_model: NDArray[np.floating], threshold: float, iterations: int = 3
+) -> Tuple[NDArray[np.floating], NDArray[np.intp]]:
+    """
+    平面モデルを反復重み付き最小二乗法(IRLS)で再推定する
+
+    各反復で距離閾値内の点をTukeyの重みで重み付けし、重み付き主成分分析で平面を当てはめ直す。
+
+    :param points: 点群(N, 3)
+    :param plane_model: 初期平面方程式 ax+by+cz+d=0 の係数(4, )
+    :param threshold: 平面からの距離閾値
+    :param iterations: 反復回数
+    :return: 再推定した平面方程式(4, ), 再推定した平面上の点ポインタ(M, )
+    """
+    normal = plane_model[:3] / np.linalg.norm(plane_model[:3])
+    offset = plane_model[3] / np.linalg.norm(plane_model[:3])
+    for _ in range(iterations):
+        residuals = np.dot(points, normal) + offset
+        inliers = np.where(np.abs(residuals) <= threshold)[0]
+        if len(inliers) < 3:
+            break
+        center, axes = _weighted_pca(points[inliers], _tukey_weights(residuals[inliers], threshold))
+        normal = axes[:, 0]
+        offset = -np.dot(normal, center)
+
+    inliers = np.where(np.abs(np.dot(points, normal) + offset) <= threshold)[0]
+    return np.asarray([normal[0], normal[1], normal[2], offset]), inliers
+
+
+def refine_line(
+    points: NDArray[np.floating], line_model: NDArray[np.floating], threshold: float, iterations: int = 3
+) -> Tuple[NDArray[np.floating], NDArray[np.intp]]:
+    """
+    直線モデルを反復重み付き最小二乗法(IRLS)で再推定する
+
+    :param points: 点群(N, 3)
+    :param line_model: 初期直線の方程式p+tv=0 (2, 3)
+    :param threshold: 直線からの距離閾値
+    :param iterations: 反復回数
+    :return: 再推定した直線の方程式p+tv=0 (2, 3), 再推定した直線上の点ポインタ(M, )
+    """
+    p = line_model[0]
+    v = line_model[1] / np.linalg.norm(line_model[1])
+    for _ in range(iterations):
+        residuals = get_distances_to_line(points, p, v)
+        inliers = np.where(residuals < threshold)[0]
+        if len(inliers) < 2:
+            break
+        center, axes = _weighted_pca(points[inliers], _tukey_weights(residuals[inliers], threshold))
+        # 向きは初期モデルに揃える
+        v = axes[:, 2] if np.dot(axes[:, 2], v) >= 0 else -axes[:, 2]
+        p = center
+
+    inliers = np.where(get_distances_to_line(points, p, v) < threshold)[0]
+    return np.asarray([p, v]), inliers
+
+
+def refine_circle(
+    points_xy: NDArray[np.floating],
+    center: NDArray[np.floating],
+    radius: float,
+    threshold: float,
+    iterations: int = 3,
+) -> Tuple[NDArray[np.floating], float, NDArray[np.intp]]:
+    """
+    平面上の円モデルを反復重み付き最小二乗法(IRLS)で再推定する
+
+    各反復で円周からの距離が閾値内の点をTukeyの重みで重み付けし、代数的円当てはめ(Kåsa法)を行う。
+
+    :param points_xy: 平面座標系の点群(N, 2)
+    :param center: 初期円中心(2, )
+    :param radius: 初期円半径
+    :param threshold: 円周からの距離閾値
+    :param iterations: 反復回数
+    :return: 再推定した円中心(2, ), 円半径, 円周上の点ポインタ(M, )
+    """
+    for _ in range(iterations):
+        residuals = np.linalg.norm(points_xy - center, axis=1) - radius
+        inliers = np.where(np.abs(residuals) <= threshold)[0]
+        if len(inliers) < 3:
+            break
+        center, radius = _weighted_kasa(points_xy[inliers], _tukey_weights(residuals[inliers], threshold))
+
+    inliers = np.where(np.abs(np.linalg.norm(points_xy - center, axis=1) - radius) <= threshold)[0]
+    return center, radius, inliers
+
+
+def _tukey_weights(residuals: NDArray[np.floating], threshold: float) -> NDArray[np.floating]:
+    """
+    Tukeyのbiweight関数による重み
+    """
+    weights: NDArray[np.floating] = np.square(np.clip(1.0 - np.square(residuals / threshold), 0.0, None))
+    # 全点が閾値上にある場合は等しい重みとする
+    if not np.any(weights > 0):
+        weights = np.ones(len(residuals))
+    return weights
+
+
+def _weighted_pca(
+    points: NDArray[np.floating], weights: NDArray[np.floating]
+) -> Tuple[NDArray[np.floating], NDArray[np.floating]]:
+    """
+    重み付き主成分分析
+
+    :return: 重み付き重心(3, ), 固有値の昇順に並べた主軸(3, 3) (列ベクトル)
+    """
+    center = np.average(points, axis=0, weights=weights)
+    centered = points - center
+    cov = np.dot((centered * weights[:, np.newaxis]).T, centered) / np.sum(weights)
+    _, eigenvectors = np.linalg.eigh(cov)
+    return center, eigenvectors
+
+
+def _weighted_kasa(
+    points_xy: NDArray[np.floating], weights: NDArray[np.floating]
+) -> Tuple[NDArray[np.floating], float]:
+    """
+    重み付きKåsa法による代数的円当てはめ
+
+    x^2 + y^2 = 2ax + 2by + c を重み付き最小二乗で解き、中心(a, b), 半径 sqrt(c + a^2 + b^2) を求める
+    """
+    sqrt_w = np.sqrt(weights)
+    a = np.column_stack([2 * points_xy, np.ones(len(points_xy))]) * sqrt_w[:, np.newaxis]
+    b = np.sum(points_xy**2, axis=1) * sqrt_w
+    (cx, cy, c), *_ = np.linalg.lstsq(a, b, rcond=None)
+    return np.asarray([cx, cy]), float(np.sqrt(c + cx**2 + cy**2))
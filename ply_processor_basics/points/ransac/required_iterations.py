@@ -0,0 +1,28 @@
+from typing import Union
+
+import numpy as np
+from numpy.typing import NDArray
+
+
+def required_iterations(
+    inlier_ratio: Union[float, NDArray[np.floating]], sample_size: int, confidence: float
+) -> NDArray[np.floating]:
+    """
+    適応的RANSACで必要な繰り返し回数を求める
+
+    N = log(1 - confidence) / log(1 - w^s) (w: インライア率, s: 1仮説あたりのサンプル点数)
+
+    :param inlier_ratio: 現在の最良モデルのインライア率(K, )
+    :param sample_size: 1仮説あたりのサンプル点数
+    :param confidence: 少なくとも1回はインライアのみを引く確率(0 < confidence < 1)
+    :return: 必要な繰り返し回数(K, ), インライアが無い場合はinf
+    """
+    if not 0.0 < confidence < 1.0:
+        raise ValueError("confidence must be in (0, 1).")
+
+    p_good = np.clip(np.asarray(inlier_ratio, dtype=np.float64), 0.0, 1.0) ** sample_size
+    with np.errstate(divide="ignore"):
+        n = np.where(p_good > 0.0, np.log1p(-confidence) / np.log1p(-p_good), np.inf)
+    # p_good == 1 では n == 0 となるが、最低1回は必要
+    needed: NDArray[np.floating] = np.maximum(np.ceil(n), 1.0)
+    return needed
@@ -0,0 +1,113 @@
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Optional, Tuple
+
+import numpy as np
+from numpy.typing import NDArray
+
+from .required_iterations import required_iterations
+
+
+def run_hypotheses(
+    score: Callable[[int, int], NDArray[np.floating]],
+    n_hypotheses: int,
+    batch_size: int = 128,
+    workers: int = 1,
+    confidence: Optional[float] = None,
+    sample_size: int = 1,
+    inlier_ratio: Optional[Callable[[int, float], float]] = None,
+) -> NDArray[np.floating]:
+    """
+    仮説をバッチ単位で評価する
+
+    score(start, stop) は仮説 start..stop-1 の評価値を返す。評価値が大きいほど良い仮説とし、
+    0以下は無効な仮説とみなす。workers > 1 の場合はworkers個のバッチをスレッドプールで並列に評価する。
+    結果は先頭から逐次評価した場合と同じになるため、workers, batch_size によらない。
+
+    :param score: 仮説の評価関数
+    :param n_hypotheses: 仮説の数(最大繰り返し回数)
+    :param batch_size: 一度に評価する仮説の数
+    :param workers: 並列に評価するスレッド数
+    :param confidence: 指定時は最良仮説のインライア率から必要な繰り返し回数を更新して早期終了する
+    :param sample_size: 1仮説あたりのサンプル点数(confidence指定時に使用)
+    :param inlier_ratio: inlier_ratio(index, score) で仮説のインライア率を返す関数(confidence指定時は必須)
+    :return: 評価した仮説の評価値(M, ), M は実際の繰り返し回数
+    """
+    if confidence is not None and inlier_ratio is None:
+        raise ValueError("inlier_ratio is required when confidence is given.")
+
+    results: List[NDArray[np.floating]] = []
+    n_done = 0
+    n_required = n_hypotheses
+    best_score = 0.0
+    best_needed = np.inf
+
+    executor = ThreadPoolExecutor(max_workers=workers) if workers > 1 else None
+    try:
+        while n_done < n_required:
+            # 必要回数の範囲内で最大workers個のバッチを切り出す
+            ranges: List[Tuple[int, int]] = []
+            start = n_done
+            while start < n_required and len(ranges) < workers:
+                stop = min(start + batch_size, n_required)
+                ranges.append((start, stop))
+                start = stop
+
+            if executor is None:
+                batches = [score(start, stop) for start, stop in ranges]
+            else:
+                batches = list(executor.map(lambda r: score(*r), ranges))
+
+            # 終了判定は先頭のバッチから逐次に行う
+            for (start, _), scores in zip(ranges, batches):
+                if n_done >= n_required:
+                    break
+                if confidence is not None and inlier_ratio is not None:
+                    scores, best_needed = _truncate(
+                        scores, start, best_score, best_needed, confidence, sample_size, inlier_ratio
+                    )
+                    if start + len(scores) >= best_needed:
+                        n_required = start + len(scores)
+                    else:
+                        n_required = int(min(n_hypotheses, best_needed))
+                if len(scores) > 0:
+                    best_score = max(best_score, float(np.max(scores)))
+                results.append(scores)
+                n_done = start + len(scores)
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+    if len(results) == 0:
+        return np.array([], dtype=np.float64)
+    evaluated: NDArray[np.floating] = np.concatenate(results).astype(np.float64)
+    return evaluated
+
+
+def _truncate(
+    scores: NDArray[np.floating],
+    start: int,
+    best_score: float,
+    best_needed: float,
+    confidence: float,
+    sample_size: int,
+    inlier_ratio: Callable[[int, float], float],
+) -> Tuple[NDArray[np.floating], float]:
+    """
+    バッチ内で最良仮説が更新される位置ごとに必要な繰り返し回数を求め、終了条件を満たす位置でバッチを打ち切る
+
+    :return: 打ち切り後の評価値, 打ち切り位置での必要な繰り返し回数
+    """
+    # 最良仮説が更新される位置ごとに必要回数を求め、各位置での最良仮説に対する必要回数に展開する
+    previous_best = np.maximum.accumulate(np.concatenate([[best_score], scores]))[:-1]
+    updates = np.nonzero(scores > previous_best)[0]
+    needed = np.full(len(scores), best_needed)
+    if len(updates) > 0:
+        ratios = np.array([inlier_ratio(start + i, float(scores[i])) for i in updates])
+        update_needed = required_iterations(ratios, sample_size, confidence)
+        latest = np.searchsorted(updates, np.arange(len(scores)), side="right") - 1
+        needed = np.where(latest >= 0, update_needed[np.maximum(latest, 0)], best_needed)
+
+    reached = np.nonzero(start + np.arange(1, len(scores) + 1) >= needed)[0]
+    if len(reached) > 0:
+        return scores[: reached[0] + 1], float(needed[reached[0]])
+    return scores, float(needed[-1])
@@ -0,0 +1,25 @@
+import numpy as np
+from numpy.typing import NDArray
+
+
+def sample_indices(n_points: int, sample_size: int, n_samples: int, rng: np.random.Generator) -> NDArray[np.intp]:
+    """
+    重複のない点ポインタの組を一括でランダムサンプリングする
+
+    :param n_points: 点群の点数
+    :param sample_size: 1組あたりの点数
+    :param n_samples: サンプリングする組の数
+    :param rng: 乱数生成器
+    :return: 点ポインタの組(n_samples, sample_size)
+    """
+    if n_points < sample_size:
+        raise ValueError("Not enough points to sample.")
+
+    samples = np.empty((n_samples, sample_size), dtype=np.intp)
+    for j in range(sample_size):
+        # 未選択のn_points - j点から1点を選び、選択済みの点ポインタを昇順に飛ばして詰める
+        idx = rng.integers(0, n_points - j, size=n_samples).astype(np.intp)
+        for taken in np.sort(samples[:, :j], axis=1).T:
+            idx += idx >= taken
+        samples[:, j] = idx
+    return samples
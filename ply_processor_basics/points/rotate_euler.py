@@ -3,6 +3,8 @@ import math
 import numpy as np
 from numpy.typing import NDArray
 
+from .float_dtype import float_dtype
+
 
 def rotate_euler(points: NDArray[np.floating], radians: NDArray[np.floating]) -> NDArray[np.floating]:
     """
@@ -41,5 +43,6 @@ def rotate_euler(points: NDArray[np.floating], radians: NDArray[np.floating]) ->
     )
 
     rot_matrix = rot_z.dot(rot_y.dot(rot_x))
-    rot_pointcloud: NDArray[np.floating] = rot_matrix.dot(points.T).T
+    # 回転行列を点群の型に揃え、float32の点群はfloat32のまま回転する
+    rot_pointcloud: NDArray[np.floating] = np.dot(points, rot_matrix.T.astype(float_dtype(points)))
     return rot_pointcloud
@@ -0,0 +1,13 @@
+from .clip_by_plane import clip_by_plane as clip_by_plane
+from .count_plane_inliers import count_plane_inliers as count_plane_inliers
+from .filter_by_plane import filter_by_plane as filter_by_plane
+from .get_mean_and_covariance import get_mean_and_covariance as get_mean_and_covariance
+from .get_normal_vector import get_normal_vector as get_normal_vector
+
+__all__ = [
+    "clip_by_plane",
+    "count_plane_inliers",
+    "filter_by_plane",
+    "get_mean_and_covariance",
+    "get_normal_vector",
+]
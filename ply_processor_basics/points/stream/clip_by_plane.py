@@ -0,0 +1,52 @@
+from typing import Iterable, Iterator
+
+import numpy as np
+from numpy.typing import NDArray
+
+from ply_processor_basics.points.clip_by_plane import _above_plane
+
+
+def clip_by_plane(
+    chunks: Iterable[NDArray[np.floating]], plane_eq: NDArray[np.floating], invert: bool = False
+) -> Iterator[NDArray[np.floating]]:
+    """
+    points.clip_by_plane のチャンク版, 点を多く含む側(invert時は少ない側)の点を順に返す
+
+    重心, 両側の点数, 切り出しの3回チャンクを走査するため、chunks は何度でも反復できる必要がある
+    (io.PlyChunks やリスト, 1回しか反復できないイテレータは不可)。
+
+    :param chunks: 点群のチャンク(M, 3)の列
+    :param plane_eq: 平面の方程式の係数 (4,)
+    :param invert: 点の少ない側を返す
+    :return: チャンクごとの切り出した点群(L, 3)
+    """
+    if iter(chunks) is chunks:
+        raise ValueError("chunks must be re-iterable (e.g. io.PlyChunks or a list), not an iterator.")
+
+    total = np.zeros(3)
+    count = 0
+    for chunk in chunks:
+        total += np.sum(chunk, axis=0)
+        count += len(chunk)
+    mean = total / count
+
+    n_above = sum(int(np.count_nonzero(_above_plane(chunk, plane_eq, mean))) for chunk in chunks)
+    # 点を多く含む側を返す
+    keep_above = n_above >= count - n_above
+    if invert:
+        keep_above = not keep_above
+    return _clip(chunks, plane_eq, mean, keep_above)
+
+
+def _clip(
+    chunks: Iterable[NDArray[np.floating]],
+    plane_eq: NDArray[np.floating],
+    mean: NDArray[np.floating],
+    keep_above: bool,
+) -> Iterator[NDArray[np.floating]]:
+    """
+    チャンクごとに平面の指定した側の点を返す
+    """
+    for chunk in chunks:
+        above = _above_plane(chunk, plane_eq, mean)
+        yield chunk[above if keep_above else ~above]
@@ -0,0 +1,38 @@
+from typing import Iterable
+
+import numpy as np
+from numpy.typing import NDArray
+
+from ply_processor_basics.points.ransac.detect_plane import Plane
+
+
+def count_plane_inliers(
+    chunks: Iterable[NDArray[np.floating]],
+    plane_models: NDArray[np.floating],
+    threshold: float,
+    chunk_size: int = 8192,
+) -> NDArray[np.intp]:
+    """
+    点群のチャンクを1回走査して、与えた平面モデルごとのインライア数を数える
+
+    RANSACの仮説(平面モデル)の集合をメモリに収まらない点群で評価するために用いる。
+    使用メモリはチャンクの点数と chunk_size * K に抑えられる。
+
+    :param chunks: 点群のチャンク(M, 3)の列 (io.PlyChunks など)
+    :param plane_models: 平面方程式 ax+by+cz+d=0 の係数(K, 4)
+    :param threshold: 平面からの距離閾値
+    :param chunk_size: チャンク内で一度に評価する点の数
+    :return: インライア数(K, ), 法線が0ベクトルの無効なモデルは-1
+    """
+    plane_models = np.asarray(plane_models, dtype=np.float64).reshape(-1, 4)
+    norms = np.linalg.norm(plane_models[:, :3], axis=1)
+    valid = norms > 0
+    scale = np.where(valid, norms, 1.0)
+    normals = np.where(valid[:, np.newaxis], plane_models[:, :3] / scale[:, np.newaxis], 0.0)
+    offsets = plane_models[:, 3] / scale
+
+    counts = np.zeros(len(plane_models), dtype=np.intp)
+    for chunk in chunks:
+        counts += np.maximum(Plane.count_inliers(chunk, normals, offsets, threshold, chunk_size), 0)
+    counts[~valid] = -1
+    return counts
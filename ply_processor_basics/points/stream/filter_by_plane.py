@@ -0,0 +1,23 @@
+from typing import Iterable, Iterator
+
+import numpy as np
+from numpy.typing import NDArray
+
+from ply_processor_basics.points import get_distances_to_plane
+
+
+def filter_by_plane(
+    chunks: Iterable[NDArray[np.floating]], plane_model: NDArray[np.floating], max_distance: float
+) -> Iterator[NDArray[np.floating]]:
+    """
+    点群のチャンクから平面との距離が max_distance 以内の点を順に取り出す
+
+    チャンクを1回だけ走査する遅延評価のため、戻り値をさらに別の stream 関数へ渡せる。
+
+    :param chunks: 点群のチャンク(M, 3)の列 (io.PlyChunks など)
+    :param plane_model: 平面の方程式の係数 (4,)
+    :param max_distance: 平面からの距離閾値
+    :return: チャンクごとの平面付近の点群(L, 3)
+    """
+    for chunk in chunks:
+        yield chunk[get_distances_to_plane(chunk, plane_model) <= max_distance]
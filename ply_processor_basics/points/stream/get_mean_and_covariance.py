@@ -0,0 +1,40 @@
+from typing import Iterable, Tuple
+
+import numpy as np
+from numpy.typing import NDArray
+
+
+def get_mean_and_covariance(
+    chunks: Iterable[NDArray[np.floating]],
+) -> Tuple[NDArray[np.floating], NDArray[np.floating], int]:
+    """
+    点群のチャンクを1回走査して重心と共分散行列を求める
+
+    チャンクごとの重心と偏差平方和を逐次合成する(Chanらの方法)ため、座標値が大きい点群でも桁落ちしにくい。
+    共分散行列は np.cov と同じく不偏推定(N - 1で割る)とする。
+
+    :param chunks: 点群のチャンク(M, D)の列 (io.PlyChunks など)
+    :return: 重心(D, ), 共分散行列(D, D), 点数
+    """
+    count = 0
+    mean = np.zeros(0)
+    m2 = np.zeros((0, 0))
+    for chunk in chunks:
+        if len(chunk) == 0:
+            continue
+        chunk = np.asarray(chunk, dtype=np.float64)
+        chunk_mean = np.mean(chunk, axis=0)
+        centered = chunk - chunk_mean
+        chunk_m2 = np.dot(centered.T, centered)
+        if count == 0:
+            count, mean, m2 = len(chunk), chunk_mean, chunk_m2
+            continue
+        total = count + len(chunk)
+        delta = chunk_mean - mean
+        m2 = m2 + chunk_m2 + np.outer(delta, delta) * (count * len(chunk) / total)
+        mean = mean + delta * (len(chunk) / total)
+        count = total
+
+    if count < 2:
+        raise ValueError("At least 2 points are required.")
+    return mean, m2 / (count - 1), count
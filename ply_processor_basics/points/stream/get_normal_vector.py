@@ -0,0 +1,20 @@
+from typing import Iterable
+
+import numpy as np
+from numpy.typing import NDArray
+
+from .get_mean_and_covariance import get_mean_and_covariance
+
+
+def get_normal_vector(chunks: Iterable[NDArray[np.floating]]) -> NDArray[np.floating]:
+    """
+    点群のチャンクを1回走査して主成分分析を行い、最小の固有値の固有ベクトル(法線ベクトル)を返す
+
+    :param chunks: 点群のチャンク(M, 3)の列 (io.PlyChunks など)
+    :return: 法線ベクトル(3, )
+    """
+    _, cov, _ = get_mean_and_covariance(chunks)
+    # 共分散行列は対称なので固有値は昇順の実数で求まる
+    _, eigenvectors = np.linalg.eigh(cov)
+    normal_vector: NDArray[np.floating] = eigenvectors[:, 0] / np.linalg.norm(eigenvectors[:, 0])
+    return normal_vector
@@ -1,38 +1,53 @@
 # ply_processor/matrix/coordinate_transform.py
 
-from typing import Tuple
+from typing import Optional, Tuple
 
 import numpy as np
 from numpy.typing import NDArray
 
 from ply_processor_basics.matrix import get_rotation_from_vectors
 
+from .float_dtype import float_dtype
+
 
 def transform_to_plane_coordinates(
-    points: NDArray[np.floating], origin: NDArray[np.floating], normal: NDArray[np.floating]
+    points: NDArray[np.floating],
+    origin: NDArray[np.floating],
+    normal: NDArray[np.floating],
+    out: Optional[NDArray[np.floating]] = None,
 ) -> Tuple[NDArray[np.floating], NDArray[np.floating]]:
     """
     点群を、平面上の1点を原点とし法線方向をZ軸とする座標系に変換する。
 
+    同次座標の点群を作らず、回転行列 R と並進 t = -R・origin で R・p + t を直接計算する。
+    float32の点群はfloat32のまま変換する(それ以外はfloat64)。
+
     :param points: 変換する点群 (N, 3)
     :param origin: 新しい座標系の原点 (3,)
     :param normal: 平面の法線ベクトル (3,)
+    :param out: 指定時は変換後の点群をこの配列(N, 3)に書き込み、新たな配列を確保しない
     :return: 変換後の点群 (N, 3), 逆変換行列 (4, 4)
     """
     # 法線ベクトルを正規化
     z_axis = normal / np.linalg.norm(normal)
 
-    transformation_matrix = np.eye(4)
     rotation = get_rotation_from_vectors(
         z_axis[:3],
         np.array([0, 0, 1]),
     )
-    transformation_matrix[:3, 3] = -np.dot(rotation, origin)
-    transformation_matrix[:3, :3] = rotation
-    transformation_matrix_inv = np.linalg.inv(transformation_matrix)
-
-    # アフィン変換のために4x1に変換
-    points = np.hstack([points, np.ones((points.shape[0], 1))])
-    points = np.dot(transformation_matrix, points.T).T
-
-    return points[:, :3], transformation_matrix_inv
+    translation = -np.dot(rotation, origin)
+
+    # 逆変換は p = R^T・p' + origin (回転行列の逆行列は転置)
+    transformation_matrix_inv = np.eye(4)
+    transformation_matrix_inv[:3, :3] = rotation.T
+    transformation_matrix_inv[:3, 3] = origin
+
+    dtype = float_dtype(points)
+    if out is None:
+        out = np.empty((points.shape[0], 3), dtype=dtype)
+    elif out.shape != (points.shape[0], 3):
+        raise ValueError("out must be a (N, 3) array.")
+    np.matmul(points, rotation.T.astype(dtype), out=out)
+    out += translation.astype(dtype)
+
+    return out, transformation_matrix_inv
@@ -0,0 +1,48 @@
+from typing import Literal, Tuple
+
+import numpy as np
+from numpy.typing import NDArray
+
+
+def voxel_downsample(
+    points: NDArray[np.floating], voxel_size: float, method: Literal["centroid", "first"] = "centroid"
+) -> Tuple[NDArray[np.floating], NDArray[np.intp]]:
+    """
+    点群をボクセルごとに1点へ間引く
+
+    :param points: 点群(N, D)
+    :param voxel_size: ボクセルサイズ
+    :param method: ボクセルの代表点
+        "centroid": ボクセル内の点の重心
+        "first": ボクセル内で最初に現れる点
+    :return: 間引いた点群(V, D), 各点の属するボクセル番号(N, ) (間引いた点群のポインタ)
+    """
+    if voxel_size <= 0:
+        raise ValueError("voxel_size must be positive.")
+    if len(points) == 0:
+        return np.empty((0,) + points.shape[1:], dtype=points.dtype), np.empty(0, dtype=np.intp)
+
+    # ボクセルの格子座標を1つの整数に詰めて一意化する
+    keys = np.floor(points / voxel_size).astype(np.int64)
+    keys -= keys.min(axis=0)
+    extents = keys.max(axis=0) + 1
+    if np.prod(extents.astype(np.float64)) < np.iinfo(np.int64).max:
+        codes = np.ravel_multi_index(tuple(keys.T), tuple(extents))
+        _, first, voxel_ids = np.unique(codes, return_index=True, return_inverse=True)
+    else:
+        _, first, voxel_ids = np.unique(keys, axis=0, return_index=True, return_inverse=True)
+    voxel_ids = voxel_ids.reshape(-1)
+
+    if method == "first":
+        return points[first], voxel_ids
+    if method != "centroid":
+        raise ValueError(f"Unknown method: {method}")
+
+    counts = np.bincount(voxel_ids, minlength=len(first))
+    centroids = np.column_stack(
+        [np.bincount(voxel_ids, weights=points[:, i], minlength=len(first)) for i in range(points.shape[1])]
+    )
+    downsampled: NDArray[np.floating] = (centroids / counts[:, np.newaxis]).astype(
+        np.result_type(points.dtype, np.float32), copy=False
+    )
+    return downsampled, voxel_ids
@@ -3,7 +3,6 @@
 from typing import List
 
 import numpy as np
-import open3d as o3d
 
 
 def stl2ply(
@@ -20,6 +19,9 @@ def stl2ply(
     :param voxel_size: size of the voxel
     :return: None
     """
+    # open3dの読み込みは時間がかかるため、使用時に読み込む
+    import open3d as o3d
+
     mesh = o3d.io.read_triangle_mesh(name + ".stl")
     mesh.compute_vertex_normals()
     pcd = mesh.sample_points_uniformly(number_of_points=sample_points)
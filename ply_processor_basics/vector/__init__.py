@@ -1,5 +1,13 @@
 from .estimate import ensure_consistent_direction as ensure_consistent_direction
+from .estimate import ensure_consistent_directions as ensure_consistent_directions
 from .estimate import estimate_vector as estimate_vector
+from .estimate import estimate_vectors as estimate_vectors
 from .normalize import normalize as normalize
 
-__all__ = ["ensure_consistent_direction", "estimate_vector", "normalize"]
+__all__ = [
+    "ensure_consistent_direction",
+    "ensure_consistent_directions",
+    "estimate_vector",
+    "estimate_vectors",
+    "normalize",
+]
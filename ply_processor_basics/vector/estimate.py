@@ -1,3 +1,5 @@
+from typing import Optional
+
 import numpy as np
 from numpy.typing import NDArray
 
@@ -7,6 +9,7 @@ def estimate_vector(vector_samples: NDArray[np.floating]) -> NDArray[np.floating
     複数のベクトルから外れ値を考慮した平均ベクトルを推定する
 
     外れ値除去の閾値 1.5 * IQR
+    cos類似度の丸め誤差で全てのベクトルが閾値外となった場合は、全てのベクトルを用いる
 
     :param vector_samples: ベクトルの集合(N, 3)
     :return: 推定された平均ベクトル(1, 3)
@@ -27,6 +30,8 @@ def estimate_vector(vector_samples: NDArray[np.floating]) -> NDArray[np.floating
     lower_bound = q1 - 1.5 * iqr
     upper_bound = q3 + 1.5 * iqr
     filtered_samples = vector_samples[(cos_similarities >= lower_bound) & (cos_similarities <= upper_bound)]
+    if len(filtered_samples) == 0:
+        filtered_samples = vector_samples
 
     # 4. 最終的なベクトルの計算
     final: NDArray[np.floating] = np.mean(filtered_samples, axis=0)
@@ -57,3 +62,118 @@ def ensure_consistent_direction(samples: NDArray[np.floating], reference_vector=
     samples[dots < 0] *= -1
 
     return samples
+
+
+def estimate_vectors(
+    vector_samples: NDArray[np.floating], group_ids: NDArray[np.integer], n_groups: Optional[int] = None
+) -> NDArray[np.floating]:
+    """
+    グループごとに estimate_vector を一括で行う
+
+    ベクトルの集合をグループ番号でまとめて与え、平均・四分位数・外れ値除去をグループごとに一括で計算する。
+    四分位数は np.percentile と同じ線形補間で求める。
+    cos類似度の丸め誤差で全てのベクトルが閾値外となったグループは、グループの全てのベクトルを用いる。
+
+    :param vector_samples: ベクトルの集合(M, 3)
+    :param group_ids: 各ベクトルのグループ番号(M, ) (0以上の整数)
+    :param n_groups: グループ数, Noneの場合は group_ids の最大値 + 1
+    :return: グループごとの推定された平均ベクトル(G, 3), ベクトルを含まないグループ、平均ベクトルが0となるグループはnan
+    """
+    vector_samples = np.asarray(vector_samples)
+    group_ids = np.asarray(group_ids, dtype=np.intp)
+    if n_groups is None:
+        n_groups = int(group_ids.max()) + 1 if len(group_ids) > 0 else 0
+
+    # 1. 単位ベクトル化
+    vector_samples = vector_samples / np.linalg.norm(vector_samples, axis=1)[:, np.newaxis]
+
+    # 2. 平均ベクトルの計算
+    mean = _normalize_rows(_group_sums(vector_samples, group_ids, n_groups))
+
+    # 3. 外れ値の除去(四分位数はグループ内でcos類似度を昇順に並べて求める)
+    cos_similarities = np.einsum("ij,ij->i", vector_samples, mean[group_ids])
+    order = np.lexsort((cos_similarities, group_ids))
+    sorted_similarities = cos_similarities[order]
+    counts = np.bincount(group_ids, minlength=n_groups)
+    starts = np.concatenate([[0], np.cumsum(counts)[:-1]])
+    q1 = _group_percentile(sorted_similarities, starts, counts, 25)
+    q3 = _group_percentile(sorted_similarities, starts, counts, 75)
+    iqr = q3 - q1
+    lower_bound = (q1 - 1.5 * iqr)[group_ids]
+    upper_bound = (q3 + 1.5 * iqr)[group_ids]
+    inliers = (cos_similarities >= lower_bound) & (cos_similarities <= upper_bound)
+    # 2点のグループなどでは等しいはずのcos類似度が数ulp異なり、IQRが0となって全点が外れることがある
+    inliers |= (np.bincount(group_ids[inliers], minlength=n_groups) == 0)[group_ids]
+
+    # 4. 最終的なベクトルの計算
+    final: NDArray[np.floating] = _normalize_rows(_group_sums(vector_samples[inliers], group_ids[inliers], n_groups))
+    return final
+
+
+def ensure_consistent_directions(
+    samples: NDArray[np.floating],
+    group_ids: NDArray[np.integer],
+    reference_vectors: Optional[NDArray[np.floating]] = None,
+) -> NDArray[np.floating]:
+    """
+    グループごとに ensure_consistent_direction を一括で行う
+
+    :param samples: ベクトルの集合(M, 3)
+    :param group_ids: 各ベクトルのグループ番号(M, ) (0以上の整数)
+    :param reference_vectors: グループごとの参照ベクトル(G, 3), Noneの場合は各グループで最初に現れるベクトル
+    :return: 一貫性が確保されたベクトルの集合(M, 3)
+    """
+    samples = np.array(samples)
+    group_ids = np.asarray(group_ids, dtype=np.intp)
+
+    if reference_vectors is None:
+        # 各グループで最初に現れるベクトルを参照ベクトルとする
+        first = np.full(int(group_ids.max()) + 1 if len(group_ids) > 0 else 0, len(samples), dtype=np.intp)
+        np.minimum.at(first, group_ids, np.arange(len(samples)))
+        references = samples[first[group_ids]]
+    else:
+        references = np.asarray(reference_vectors)[group_ids]
+
+    # 各ベクトルと参照ベクトルの内積を計算し、負のベクトルを反転
+    dots = np.einsum("ij,ij->i", samples, references)
+    samples[dots < 0] *= -1
+
+    return samples
+
+
+def _group_sums(vectors: NDArray[np.floating], group_ids: NDArray[np.integer], n_groups: int) -> NDArray[np.floating]:
+    """
+    グループごとのベクトルの和(G, D)
+    """
+    return np.column_stack(
+        [np.bincount(group_ids, weights=vectors[:, i], minlength=n_groups) for i in range(vectors.shape[1])]
+    )
+
+
+def _normalize_rows(vectors: NDArray[np.floating]) -> NDArray[np.floating]:
+    """
+    行ごとに単位ベクトル化する, 0ベクトルはnan
+    """
+    with np.errstate(invalid="ignore", divide="ignore"):
+        normalized: NDArray[np.floating] = vectors / np.linalg.norm(vectors, axis=1)[:, np.newaxis]
+    return normalized
+
+
+def _group_percentile(
+    sorted_values: NDArray[np.floating], starts: NDArray[np.intp], counts: NDArray[np.intp], q: float
+) -> NDArray[np.floating]:
+    """
+    グループごとに昇順に並んだ値の百分位数(G, ), np.percentile(method="linear") と同じ補間
+    """
+    if len(sorted_values) == 0:
+        return np.full(len(counts), np.nan)
+    positions = (counts - 1) * (q / 100)
+    lower = np.floor(positions).astype(np.intp)
+    upper = np.minimum(lower + 1, counts - 1)
+    t = positions - lower
+    valid = counts > 0
+    a = np.where(valid, sorted_values[np.where(valid, starts + lower, 0)], np.nan)
+    b = np.where(valid, sorted_values[np.where(valid, starts + upper, 0)], np.nan)
+    # np.percentile と同じく t >= 0.5 では上側の値から補間する
+    percentile: NDArray[np.floating] = np.where(t >= 0.5, b - (b - a) * (1 - t), a + (b - a) * t)
+    return percentile
@@ -0,0 +1,72 @@
+import numpy as np
+import open3d as o3d
+import pytest
+
+from ply_processor_basics.io import as_points, read_ply, write_ply
+
+
+@pytest.mark.parametrize("plypath", ["data/samples/sample.ply", "data/samples/sample_circle.ply"])
+def test_same_as_open3d(plypath):
+    expected = np.asarray(o3d.io.read_point_cloud(plypath).points)
+    vertices = read_ply(plypath)
+    assert isinstance(vertices, np.memmap)
+    points = as_points(vertices)
+    assert np.array_equal(points, expected)
+    # メモリマップのビューでありコピーしない
+    assert np.shares_memory(points, vertices)
+    assert not points.flags.writeable
+
+
+@pytest.mark.parametrize("format", ["binary_little_endian", "binary_big_endian", "ascii"])
+def test_roundtrip(tmp_path, format):
+    rng = np.random.default_rng(0)
+    vertices = np.empty(
+        1000, dtype=[("x", "f8"), ("y", "f8"), ("z", "f8"), ("intensity", "f4"), ("red", "u1"), ("label", "i4")]
+    )
+    for name in vertices.dtype.names:
+        vertices[name] = rng.uniform(0, 200, 1000)
+    path = str(tmp_path / "roundtrip.ply")
+    write_ply(path, vertices, format=format, comment="test", chunk_size=300)
+
+    loaded = read_ply(path)
+    assert loaded.dtype.names == vertices.dtype.names
+    for name in vertices.dtype.names:
+        assert np.array_equal(loaded[name], vertices[name])
+    assert np.array_equal(as_points(loaded), as_points(vertices))
+    if format != "ascii":
+        assert np.array_equal(np.asarray(o3d.io.read_point_cloud(path).points), as_points(vertices))
+
+
+def test_write_points(tmp_path):
+    points = np.random.default_rng(0).uniform(-1, 1, (100, 3)).astype(np.float32)
+    path = str(tmp_path / "points.ply")
+    write_ply(path, points)
+    vertices = read_ply(path, mmap=False)
+    assert vertices.dtype == np.dtype([("x", "<f4"), ("y", "<f4"), ("z", "<f4")])
+    assert np.array_equal(as_points(vertices), points)
+
+
+@pytest.mark.parametrize("format", ["binary_little_endian", "binary_big_endian", "ascii"])
+def test_write_memmap_points(tmp_path, format):
+    # read_ply のメモリマップのビューをチャンクごとに書き出す
+    points = as_points(read_ply("data/samples/sample_circle.ply"))
+    path = str(tmp_path / "points.ply")
+    write_ply(path, points, format=format, chunk_size=1000)
+    assert np.array_equal(as_points(read_ply(path)), points)
+
+
+def test_as_points_copy():
+    # フィールドが連続していない場合はコピーを返す
+    vertices = np.zeros(10, dtype=[("x", "f8"), ("label", "i4"), ("y", "f8"), ("z", "f8")])
+    vertices["x"] = np.arange(10)
+    points = as_points(vertices)
+    assert points.shape == (10, 3)
+    assert np.array_equal(points[:, 0], np.arange(10))
+    assert not np.shares_memory(points, vertices)
+
+
+def test_invalid(tmp_path):
+    path = tmp_path / "invalid.ply"
+    path.write_bytes(b"not a ply file\n")
+    with pytest.raises(ValueError):
+        read_ply(str(path))
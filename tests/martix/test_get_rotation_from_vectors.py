@@ -70,3 +70,34 @@ def test_rotation_properties():
     vec1 = np.array([1, 2, 3])
     vec2 = np.array([3, 2, 1])
     R = get_rotation_from_vectors(vec1, vec2)
+
+
+def test_batch_rotation():
+    """(K, 3) のベクトルの組に対して一括で回転行列を求めるテスト"""
+    rng = np.random.default_rng(0)
+    vec1 = rng.normal(size=(50, 3))
+    vec2 = rng.normal(size=(50, 3))
+    # 同じ向き, 逆向き, Z軸方向の逆向きを含める
+    vec2[:5] = vec1[:5] * 2
+    vec2[5:10] = -vec1[5:10]
+    vec1[10], vec2[10] = [0, 0, 1], [0, 0, -3]
+    result = get_rotation_from_vectors(vec1, vec2)
+    assert result.shape == (50, 3, 3)
+    for i in range(50):
+        assert_array_almost_equal(result[i], get_rotation_from_vectors(vec1[i], vec2[i]))
+    rotated = np.einsum("kij,kj->ki", result, vec1 / np.linalg.norm(vec1, axis=1)[:, np.newaxis])
+    assert_array_almost_equal(rotated, vec2 / np.linalg.norm(vec2, axis=1)[:, np.newaxis])
+    assert_array_almost_equal(np.einsum("kji,kjl->kil", result, result), np.broadcast_to(np.eye(3), (50, 3, 3)))
+    assert_array_almost_equal(np.linalg.det(result), np.ones(50))
+
+    # 目標ベクトルが1つの場合はブロードキャストする
+    result = get_rotation_from_vectors(vec1, np.array([0, 0, 1]))
+    assert_array_almost_equal(result[:, 2, :], vec1 / np.linalg.norm(vec1, axis=1)[:, np.newaxis])
+
+
+def test_zero_vector():
+    """ゼロベクトルはエラーとなることをテスト"""
+    with pytest.raises(ZeroDivisionError):
+        get_rotation_from_vectors(np.zeros(3), np.array([0, 0, 1]))
+    with pytest.raises(ZeroDivisionError):
+        get_rotation_from_vectors(np.array([[1, 0, 0], [0, 0, 0]]), np.array([0, 0, 1]))
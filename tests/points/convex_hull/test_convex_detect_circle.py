@@ -3,8 +3,9 @@ import open3d as o3d
 import pytest
 from scipy import stats
 
+from ply_processor_basics.points import PointIndex
 from ply_processor_basics.points.convex_hull import detect_circle
-from ply_processor_basics.points.convex_hull.detect_circle import fit_circle
+from ply_processor_basics.points.convex_hull.detect_circle import fit_circle, fit_circle_algebraic, fit_circles
 from ply_processor_basics.points.ransac import detect_plane
 
 
@@ -66,3 +67,73 @@ def test_variance(plypath, expected_center, expected_radius, num_samples, tolera
     # アサーション
     assert center_ci[1] < tolerance, "中心座標の誤差が許容範囲を超えています"
     assert radius_ci[1] < tolerance, "半径の誤差が許容範囲を超えています"
+
+
+@pytest.mark.parametrize("plypath", ["data/samples/sample_circle.ply"])
+def test_seed_reproducible(plypath):
+    pcd = o3d.io.read_point_cloud(plypath)
+    points = np.asarray(pcd.points)
+    inliers_plane, plane_model = detect_plane(points, seed=0)
+    inliers1, center1, _, radius1 = detect_circle(points[inliers_plane], plane_model, seed=42)
+    inliers2, center2, _, radius2 = detect_circle(points[inliers_plane], plane_model, seed=42)
+    assert np.array_equal(inliers1, inliers2)
+    assert np.array_equal(center1, center2)
+    assert radius1 == radius2
+
+
+def test_fit_circles():
+    rng = np.random.default_rng(0)
+    center = np.array([1.0, -2.0, 3.0])
+    normal = np.array([1.0, 2.0, 2.0]) / 3.0
+    u = np.cross(normal, [1.0, 0.0, 0.0])
+    u /= np.linalg.norm(u)
+    v = np.cross(normal, u)
+    angles = rng.uniform(0, 2 * np.pi, size=(50, 3))
+    points = center + 5.0 * (np.cos(angles)[..., np.newaxis] * u + np.sin(angles)[..., np.newaxis] * v)
+
+    centers, normals, radiuses = fit_circles(points)
+    assert np.allclose(centers, center)
+    assert np.allclose(np.abs(normals @ normal), 1.0)
+    assert np.allclose(radiuses, 5.0)
+
+    # 同一直線上の3点は半径0
+    _, _, radiuses = fit_circles(np.array([[[0.0, 0.0, 0.0], [1.0, 1.0, 1.0], [2.0, 2.0, 2.0]]]))
+    assert radiuses[0] == 0
+
+
+@pytest.mark.parametrize("method", ["kasa", "taubin"])
+def test_fit_circle_algebraic(method):
+    rng = np.random.default_rng(0)
+    angles = rng.uniform(0, 2 * np.pi, size=200)
+    points_xy = np.column_stack([3.0 + 10.0 * np.cos(angles), -4.0 + 10.0 * np.sin(angles)])
+    center, radius = fit_circle_algebraic(points_xy, method)
+    assert np.allclose(center, [3.0, -4.0])
+    assert np.isclose(radius, 10.0)
+
+
+@pytest.mark.parametrize("plypath", ["data/samples/sample_circle.ply"])
+@pytest.mark.parametrize("expected_center", [[49.0, 52.0, 50.0]])
+@pytest.mark.parametrize("expected_radius", [17.5])
+@pytest.mark.parametrize("method", ["kasa", "taubin"])
+def test_strict_algebraic(plypath, expected_center, expected_radius, method):
+    pcd = o3d.io.read_point_cloud(plypath)
+    points = np.asarray(pcd.points)
+    inliers_plane, plane_model = detect_plane(points, seed=0)
+    inliers, center, normal, radius = detect_circle(points[inliers_plane], plane_model, method=method)
+    assert np.allclose(center, expected_center, atol=1.0)
+    assert np.allclose(radius, expected_radius, atol=1.0)
+    assert np.array_equal(inliers, np.where(np.linalg.norm(points[inliers_plane] - center, axis=1) < radius + 1.0)[0])
+
+
+@pytest.mark.parametrize("plypath", ["data/samples/sample_circle.ply"])
+def test_index(plypath):
+    pcd = o3d.io.read_point_cloud(plypath)
+    points = np.asarray(pcd.points)
+    inliers_plane, plane_model = detect_plane(points, seed=0)
+    plane_points = points[inliers_plane]
+    inliers1, center1, _, radius1 = detect_circle(plane_points, plane_model, seed=0)
+    inliers2, center2, _, radius2 = detect_circle(plane_points, plane_model, seed=0, index=PointIndex(plane_points))
+    assert np.array_equal(inliers1, inliers2)
+    # 別の点群で構築した空間インデックスは受け付けない
+    with pytest.raises(ValueError):
+        detect_circle(plane_points, plane_model, seed=0, index=PointIndex(plane_points[:-1]))
@@ -2,7 +2,7 @@ import numpy as np
 import open3d as o3d
 import pytest
 
-from ply_processor_basics.points.convex_hull import detect_plane_edge
+from ply_processor_basics.points.convex_hull import detect_plane_edge, detect_plane_edge_layers
 from ply_processor_basics.points.ransac import detect_plane
 
 
@@ -94,3 +94,21 @@ def test_visualize_realdata(plypath):
 
     vis.run()
     vis.destroy_window()
+
+
+def test_edge_layers():
+    rng = np.random.default_rng(0)
+    points = np.column_stack([rng.uniform(-10, 10, (2000, 2)), np.zeros(2000)])
+    plane_model = np.array([0.0, 0.0, 1.0, 0.0])
+    edge_inliers = detect_plane_edge_layers(points, plane_model, 5)
+
+    # 1層ずつ点群を除いて凸包を求めた結果と一致する
+    expected = np.array([], dtype=np.intp)
+    for _ in range(5):
+        outliers = np.setdiff1d(np.arange(len(points)), expected)
+        inliers, _ = detect_plane_edge(points[outliers], plane_model)
+        expected = np.concatenate([expected, outliers[inliers]])
+    assert np.array_equal(edge_inliers, expected)
+
+    # 全点を剥がしきった場合は残りの点で終了する
+    assert len(detect_plane_edge_layers(points[:10], plane_model, 100)) <= 10
@@ -5,7 +5,10 @@ import open3d as o3d
 import pytest
 
 from ply_processor_basics.points.convex_hull import detect_line
-from ply_processor_basics.points.convex_hull.detect_plane_edge import ramer_douglas_peucker
+from ply_processor_basics.points.convex_hull.detect_plane_edge import (
+    ramer_douglas_peucker,
+    ramer_douglas_peucker_batch,
+)
 from ply_processor_basics.points.ransac import detect_plane
 
 sample_pcd = o3d.io.read_point_cloud("data/samples/sample.ply")
@@ -97,3 +100,47 @@ def test_douglas_peucker():
     epsilon = 0.5
     results = ramer_douglas_peucker(points, inliers, epsilon)
     assert len(results) == 3
+
+
+def test_douglas_peucker_closed():
+    # 辺上に点を含む正方形は4頂点のみ残る
+    points = np.array([[0, 0, 0], [1, 0, 0], [2, 0, 0], [2, 1, 0], [2, 2, 0], [1, 2, 0], [0, 2, 0], [0, 1, 0]])
+    inliers = np.arange(len(points))
+    results = ramer_douglas_peucker(points, inliers, 0.5, closed=True)
+    assert np.array_equal(results, [0, 2, 4, 6])
+
+
+def _reference_douglas_peucker(points_raw, inliers, epsilon):
+    # 再帰による素朴な実装(比較用)
+    points = points_raw[inliers]
+
+    def recursive(start_index, end_index):
+        p = points[start_index]
+        v = points[end_index] - p
+        d = np.linalg.norm(np.cross(points[start_index + 1 : end_index] - p, v), axis=1) / np.linalg.norm(v)
+        if len(d) > 0 and d.max() > epsilon:
+            index = start_index + 1 + int(np.argmax(d))
+            return recursive(start_index, index) + recursive(index, end_index)[1:]
+        return [inliers[start_index], inliers[end_index]]
+
+    return np.array(recursive(0, len(inliers) - 1))
+
+
+def test_douglas_peucker_batch():
+    rng = np.random.default_rng(0)
+    points = np.column_stack([np.arange(3000.0), rng.normal(0, 1, 3000), np.zeros(3000)])
+    polylines = [np.arange(0, 1000), np.arange(1000, 3000), np.array([], dtype=np.intp)]
+    results = ramer_douglas_peucker_batch(points, polylines, 0.5)
+    assert len(results) == 3
+    for polyline, result in zip(polylines[:2], results[:2]):
+        assert np.array_equal(result, _reference_douglas_peucker(points, polyline, 0.5))
+        assert result[0] == polyline[0] and result[-1] == polyline[-1]
+    assert len(results[2]) == 0
+
+
+def test_douglas_peucker_dense():
+    # 曲線上の密な点は閾値0では全て残る
+    t = np.linspace(0, 1, 5000)
+    points = np.column_stack([t, t**8, np.zeros_like(t)])
+    results = ramer_douglas_peucker(points, np.arange(len(points)), 0.0)
+    assert len(results) == len(points)
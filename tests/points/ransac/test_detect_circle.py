@@ -3,6 +3,7 @@ import open3d as o3d
 import pytest
 from scipy import stats
 
+from ply_processor_basics.points import PointIndex
 from ply_processor_basics.points.ransac import detect_circle, detect_plane
 
 
@@ -96,3 +97,108 @@ def test_variance(plypath, expected_center, expected_radius, num_samples, tolera
     # アサーション
     assert center_ci[1] < tolerance, "中心座標の誤差が許容範囲を超えています"
     assert radius_ci[1] < tolerance, "半径の誤差が許容範囲を超えています"
+
+
+@pytest.mark.parametrize("plypath", ["data/samples/sample_circle.ply"])
+def test_adaptive_iterations(plypath):
+    pcd = o3d.io.read_point_cloud(plypath)
+    points = np.asarray(pcd.points)
+    inliers_plane, plane_model = detect_plane(points)
+    stats: dict = {}
+    detect_circle(points[inliers_plane], plane_model, confidence=0.99, stats=stats)
+    assert 0 < stats["iterations"] <= 10000
+
+
+@pytest.mark.parametrize("plypath", ["data/samples/sample_circle.ply"])
+def test_seed_reproducible(plypath):
+    pcd = o3d.io.read_point_cloud(plypath)
+    points = np.asarray(pcd.points)
+    inliers_plane, plane_model = detect_plane(points, seed=0)
+    _, center1, _, radius1 = detect_circle(points[inliers_plane], plane_model, max_iteration=1000, seed=42)
+    _, center2, _, radius2 = detect_circle(points[inliers_plane], plane_model, max_iteration=1000, seed=42)
+    assert np.array_equal(center1, center2)
+    assert radius1 == radius2
+
+
+@pytest.mark.parametrize("plypath", ["data/samples/sample_circle.ply"])
+def test_workers_deterministic(plypath):
+    pcd = o3d.io.read_point_cloud(plypath)
+    points = np.asarray(pcd.points)
+    inliers_plane, plane_model = detect_plane(points, seed=0)
+    _, center1, _, radius1 = detect_circle(points[inliers_plane], plane_model, max_iteration=1000, seed=7)
+    _, center2, _, radius2 = detect_circle(points[inliers_plane], plane_model, max_iteration=1000, seed=7, workers=4)
+    assert np.array_equal(center1, center2)
+    assert radius1 == radius2
+
+
+@pytest.mark.parametrize("plypath", ["data/samples/sample_circle.ply"])
+@pytest.mark.parametrize("expected_center", [[49.0, 52.0, 50.0]])
+@pytest.mark.parametrize("expected_radius", [17.5])
+@pytest.mark.parametrize("tolerance", [1.0])
+def test_refined(plypath, expected_center, expected_radius, tolerance):
+    pcd = o3d.io.read_point_cloud(plypath)
+    points = np.asarray(pcd.points)
+    inliers_plane, plane_model = detect_plane(points, seed=0)
+    # 外周点での再推定により、格子点上のRANSACより精度が上がる
+    for seed in range(5):
+        inliers, center, normal, radius = detect_circle(points[inliers_plane], plane_model, seed=seed)
+        assert np.allclose(center, expected_center, atol=tolerance)
+        assert np.allclose(radius, expected_radius, atol=tolerance)
+
+
+def test_count_grid_points_in_circles():
+    from ply_processor_basics.points.ransac.detect_circle import count_grid_points_in_circles, fit_circles
+
+    rng = np.random.default_rng(0)
+    voxel_size = 0.5
+    grid_origin = np.array([-3.0, 2.0])
+    grid = rng.random((40, 30)) < 0.6
+    grid_points = np.argwhere(grid) * voxel_size + grid_origin
+    column_sums = np.zeros((grid.shape[0], grid.shape[1] + 1), dtype=np.intp)
+    np.cumsum(grid, axis=1, out=column_sums[:, 1:])
+
+    # 格子外にはみ出す円を含めて、全格子点との距離による数え上げと一致する
+    centers = rng.uniform([-10.0, -5.0], [25.0, 25.0], size=(200, 2))
+    radiuses = rng.uniform(0.1, 20.0, size=200)
+    counts = count_grid_points_in_circles(column_sums, grid_origin, voxel_size, centers, radiuses)
+    expected = [
+        np.count_nonzero(np.linalg.norm(grid_points - center, axis=1) < radius)
+        for center, radius in zip(centers, radiuses)
+    ]
+    assert np.array_equal(counts, expected)
+
+    # 3点を通る円
+    samples = grid_points[rng.integers(0, len(grid_points), size=(200, 3))]
+    centers, radiuses = fit_circles(samples)
+    valid = radiuses > 0
+    assert np.allclose(np.linalg.norm(samples[valid] - centers[valid, np.newaxis], axis=2), radiuses[valid, np.newaxis])
+
+
+@pytest.mark.parametrize("plypath", ["data/samples/sample_circle.ply"])
+def test_index(plypath):
+    pcd = o3d.io.read_point_cloud(plypath)
+    points = np.asarray(pcd.points)
+    inliers_plane, plane_model = detect_plane(points, seed=0)
+    plane_points = points[inliers_plane]
+    inliers1, _, _, _ = detect_circle(plane_points, plane_model, max_iteration=1000, seed=0)
+    inliers2, _, _, _ = detect_circle(
+        plane_points, plane_model, max_iteration=1000, seed=0, index=PointIndex(plane_points)
+    )
+    assert np.array_equal(inliers1, inliers2)
+    # 別の点群で構築した空間インデックスは受け付けない
+    with pytest.raises(ValueError):
+        detect_circle(plane_points, plane_model, seed=0, index=PointIndex(plane_points[:-1]))
+
+
+@pytest.mark.parametrize("plypath", ["data/samples/sample_circle.ply"])
+@pytest.mark.parametrize("expected_center", [[49.0, 52.0, 50.0]])
+@pytest.mark.parametrize("expected_radius", [17.5])
+def test_coarse(plypath, expected_center, expected_radius):
+    pcd = o3d.io.read_point_cloud(plypath)
+    points = np.asarray(pcd.points)
+    inliers_plane, plane_model = detect_plane(points, seed=0)
+    inliers, center, normal, radius = detect_circle(
+        points[inliers_plane], plane_model, seed=0, refine_iterations=0, coarse_voxel_size=3.0
+    )
+    assert np.allclose(center, expected_center, atol=1.0)
+    assert np.allclose(radius, expected_radius, atol=1.0)
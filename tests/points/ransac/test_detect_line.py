@@ -43,3 +43,49 @@ def test_success(points):
     assert np.allclose(line_model[1], test_line_model[1], atol=1e-1) or np.allclose(
         line_model[1], test_line_model[1] * -1, atol=1e-1
     )
+
+
+@pytest.mark.parametrize("points", [test_points, test_points_2])
+def test_adaptive_iterations(points):
+    stats: dict = {}
+    inliers, line_model = detect_line(points, 0.1, max_iteration=1000, confidence=0.99, stats=stats)
+    assert 0 < stats["iterations"] <= 2000
+    assert np.allclose(line_model[1], test_line_model[1], atol=1e-1) or np.allclose(
+        line_model[1], test_line_model[1] * -1, atol=1e-1
+    )
+
+
+@pytest.mark.parametrize("points", [test_points, test_points_2])
+def test_pretest(points):
+    stats: dict = {}
+    inliers, line_model = detect_line(points, 0.1, pretest=1, stats=stats)
+    assert stats["evaluated"] < stats["iterations"]
+    assert np.allclose(line_model[1], test_line_model[1], atol=1e-1) or np.allclose(
+        line_model[1], test_line_model[1] * -1, atol=1e-1
+    )
+
+
+def test_seed_reproducible():
+    inliers1, line_model1 = detect_line(test_points_2, 0.1, max_iteration=100, pretest=1, seed=42)
+    inliers2, line_model2 = detect_line(test_points_2, 0.1, max_iteration=100, pretest=1, seed=42)
+    assert np.array_equal(inliers1, inliers2)
+    assert np.array_equal(line_model1, line_model2)
+
+
+def test_workers_deterministic():
+    inliers1, line_model1 = detect_line(test_points_2, 0.1, max_iteration=200, seed=7, workers=1)
+    inliers2, line_model2 = detect_line(test_points_2, 0.1, max_iteration=200, seed=7, workers=4)
+    assert np.array_equal(inliers1, inliers2)
+    assert np.array_equal(line_model1, line_model2)
+
+
+def test_coarse():
+    rng = np.random.default_rng(0)
+    t = rng.uniform(-test_length / 2, test_length / 2, 5000)
+    points = test_line_model[0] + np.outer(t, test_line_model[1]) + rng.uniform(-diff, diff, (5000, 3))
+    points = np.concatenate([rng.uniform(-diff * 100, diff * 100, (200, 3)), points])
+    inliers, line_model = detect_line(points, 0.3, seed=0, coarse_voxel_size=1.0)
+    # 間引いた点群で検出しても、インライアは元の点群から選ばれる
+    assert len(inliers) > 2500
+    assert np.count_nonzero(inliers < 200) < 10
+    assert np.isclose(abs(np.dot(line_model[1], test_v)), 1.0, atol=1e-3)
@@ -2,6 +2,8 @@ import numpy as np
 import open3d as o3d
 
 from ply_processor_basics.points.ransac import detect_plane
+from ply_processor_basics.points.ransac.detect_plane import Plane
+from ply_processor_basics.points.ransac.sample_indices import sample_indices
 
 
 def test_success():
@@ -24,3 +26,90 @@ def test_failed_to_detect():
     inliers, model = detect_plane(points, threshold=0.1, minPoints=100000, maxIteration=1000)
     assert inliers is None
     assert model is None
+
+
+def test_batched_matches_sequential():
+    pcd = o3d.io.read_point_cloud("data/samples/sample.ply")
+    points = np.asarray(pcd.points)
+    threshold = 1.0
+    samples = sample_indices(len(points), 3, 200, np.random.default_rng(0))
+
+    # 仮説を1つずつ評価する逐次実装との一致を確認
+    expected: np.ndarray = np.array([], dtype=np.intp)
+    for sample in samples:
+        p1, p2, p3 = points[sample]
+        normal = np.cross(p2 - p1, p3 - p1)
+        if np.linalg.norm(normal) < 1e-6:
+            continue
+        normal = normal / np.linalg.norm(normal)
+        inliers = np.where(np.abs(np.dot(points, normal) - np.dot(normal, p2)) <= threshold)[0]
+        if len(inliers) > len(expected):
+            expected = inliers
+
+    plane = Plane()
+    inliers = plane.fit(points, thresh=threshold, maxIteration=200, rng=np.random.default_rng(0), batch_size=64)
+    assert np.array_equal(inliers, expected)
+
+
+def test_adaptive_iterations():
+    pcd = o3d.io.read_point_cloud("data/samples/sample.ply")
+    points = np.asarray(pcd.points)
+    stats: dict = {}
+    inliers, model = detect_plane(points, threshold=1.0, maxIteration=1000, confidence=0.999, stats=stats)
+    assert inliers is not None
+    assert len(inliers) > 10000
+    # 大半の点が平面上にあるため、上限より十分少ない回数で終了する
+    assert 0 < stats["iterations"] < 1000
+
+
+def test_pretest():
+    pcd = o3d.io.read_point_cloud("data/samples/sample.ply")
+    points = np.asarray(pcd.points)
+    stats: dict = {}
+    inliers, model = detect_plane(points, threshold=1.0, maxIteration=1000, pretest=1, stats=stats)
+    assert inliers is not None
+    assert len(inliers) > 10000
+    # 事前評価で棄却された仮説は点群全体で評価されない
+    assert stats["evaluated"] < stats["iterations"]
+    normalized = model[:3] / np.linalg.norm(model[:3])
+    assert np.allclose(normalized, [0, 0, 1], atol=0.1) or np.allclose(normalized, [0, 0, -1], atol=0.1)
+
+
+def test_seed_reproducible():
+    pcd = o3d.io.read_point_cloud("data/samples/sample.ply")
+    points = np.asarray(pcd.points)
+    inliers1, model1 = detect_plane(points, threshold=1.0, maxIteration=100, seed=42)
+    inliers2, model2 = detect_plane(points, threshold=1.0, maxIteration=100, seed=42)
+    assert np.array_equal(inliers1, inliers2)
+    assert np.array_equal(model1, model2)
+
+
+def test_workers_deterministic():
+    pcd = o3d.io.read_point_cloud("data/samples/sample.ply")
+    points = np.asarray(pcd.points)
+    results = [
+        detect_plane(points, threshold=1.0, maxIteration=300, confidence=0.999, pretest=1, seed=7, workers=workers)
+        for workers in [1, 4]
+    ]
+    assert np.array_equal(results[0][0], results[1][0])
+    assert np.array_equal(results[0][1], results[1][1])
+
+
+def test_refine():
+    pcd = o3d.io.read_point_cloud("data/samples/sample.ply")
+    points = np.asarray(pcd.points)
+    inliers, model = detect_plane(points, threshold=1.0, maxIteration=100, seed=0, refine_iterations=3)
+    assert len(inliers) > 10000
+    normalized = model[:3] / np.linalg.norm(model[:3])
+    assert np.allclose(normalized, [0, 0, 1], atol=0.1) or np.allclose(normalized, [0, 0, -1], atol=0.1)
+
+
+def test_coarse():
+    pcd = o3d.io.read_point_cloud("data/samples/sample.ply")
+    points = np.asarray(pcd.points)
+    inliers, model = detect_plane(points, threshold=1.0, seed=0)
+    coarse_inliers, coarse_model = detect_plane(points, threshold=1.0, seed=0, coarse_voxel_size=2.0)
+    # 間引いた点群で検出しても、インライアは元の点群から選ばれる
+    assert len(coarse_inliers) > 10000
+    assert abs(len(coarse_inliers) - len(inliers)) < 0.05 * len(inliers)
+    assert np.allclose(np.abs(coarse_model[:3]), np.abs(model[:3]), atol=0.05)
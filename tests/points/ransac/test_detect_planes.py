@@ -0,0 +1,49 @@
+import numpy as np
+import open3d as o3d
+
+from ply_processor_basics.points.ransac import detect_plane, detect_planes
+
+# 3平面(z=0, x=0, y=0)上の点群を生成
+rng = np.random.default_rng(0)
+face_z = np.c_[rng.uniform(0, 100, (3000, 2)), np.zeros(3000)]
+face_x = np.c_[np.zeros(2000), rng.uniform(0, 100, (2000, 2))]
+face_y = np.c_[rng.uniform(0, 100, 1000), np.zeros(1000), rng.uniform(0, 100, 1000)]
+test_points = np.concatenate([face_z, face_x, face_y]) + rng.normal(0, 0.01, (6000, 3))
+test_normals = np.asarray([[0, 0, 1], [1, 0, 0], [0, 1, 0]])
+
+
+def test_success():
+    plane_models, labels = detect_planes(test_points, max_planes=3, threshold=0.1, seed=0)
+    assert plane_models.shape == (3, 4)
+    assert labels.shape == (len(test_points),)
+    # 点数の多い順に検出される
+    for i, normal in enumerate(test_normals):
+        assert np.allclose(np.abs(plane_models[i, :3]), normal, atol=1e-2)
+    counts = [np.count_nonzero(labels == i) for i in range(3)]
+    assert counts[0] > counts[1] > counts[2] > 900
+
+
+def test_max_planes():
+    plane_models, labels = detect_planes(test_points, max_planes=1, threshold=0.1, seed=0)
+    assert plane_models.shape == (1, 4)
+    assert set(np.unique(labels)) == {-1, 0}
+
+
+def test_stops_below_min_points():
+    plane_models, labels = detect_planes(test_points, max_planes=10, threshold=0.1, minPoints=500, seed=0)
+    assert plane_models.shape == (3, 4)
+
+
+def test_no_hypotheses():
+    plane_models, labels = detect_planes(test_points, max_planes=3, threshold=0.1, maxIteration=0, seed=0)
+    assert plane_models.shape == (0, 4)
+    assert np.all(labels == -1)
+
+
+def test_matches_detect_plane():
+    pcd = o3d.io.read_point_cloud("data/samples/sample.ply")
+    points = np.asarray(pcd.points)
+    plane_models, labels = detect_planes(points, max_planes=1, threshold=1.0, seed=0)
+    inliers, plane_model = detect_plane(points, threshold=1.0, seed=0)
+    assert np.array_equal(np.where(labels == 0)[0], inliers)
+    assert np.allclose(plane_models[0], plane_model)
@@ -0,0 +1,35 @@
+import numpy as np
+
+from ply_processor_basics.points.ransac.refine import refine_circle, refine_line, refine_plane
+
+rng = np.random.default_rng(0)
+
+
+def test_refine_plane():
+    points = np.c_[rng.uniform(-10, 10, (1000, 2)), rng.normal(0, 0.01, 1000)]
+    # 傾いた初期モデルから z=0 に収束する
+    initial = np.array([0.05, 0.0, 1.0, 0.0])
+    plane_model, inliers = refine_plane(points, initial, threshold=1.0, iterations=5)
+    assert np.allclose(np.abs(plane_model[:3]), [0, 0, 1], atol=1e-3)
+    assert abs(plane_model[3]) < 1e-2
+    assert len(inliers) == len(points)
+
+
+def test_refine_line():
+    t = rng.uniform(-10, 10, 500)
+    points = np.outer(t, [1, 0, 0]) + rng.normal(0, 0.01, (500, 3))
+    outliers = rng.uniform(-10, 10, (100, 3))
+    initial = np.array([[0, 0.2, 0], [1, 0.02, 0]])
+    line_model, inliers = refine_line(np.concatenate([points, outliers]), initial, threshold=0.5, iterations=5)
+    assert np.allclose(line_model[1], [1, 0, 0], atol=1e-3)
+    assert np.allclose(line_model[0][1:], [0, 0], atol=1e-2)
+    assert np.all(inliers[: len(t)] == np.arange(len(t)))
+
+
+def test_refine_circle():
+    theta = rng.uniform(0, 2 * np.pi, 500)
+    points_xy = np.c_[3 + 5 * np.cos(theta), -2 + 5 * np.sin(theta)] + rng.normal(0, 0.01, (500, 2))
+    center, radius, inliers = refine_circle(points_xy, np.array([3.3, -2.2]), 4.7, threshold=1.0, iterations=5)
+    assert np.allclose(center, [3, -2], atol=1e-2)
+    assert abs(radius - 5) < 1e-2
+    assert len(inliers) == len(points_xy)
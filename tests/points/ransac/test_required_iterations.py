@@ -0,0 +1,24 @@
+import numpy as np
+import pytest
+
+from ply_processor_basics.points.ransac.required_iterations import required_iterations
+
+
+def test_known_values():
+    # w=0.5, s=3, p=0.99 -> log(0.01) / log(1 - 0.125) = 34.5
+    assert required_iterations(0.5, 3, 0.99) == 35
+    # 全点がインライアなら1回で十分
+    assert required_iterations(1.0, 3, 0.99) == 1
+    # インライアが無ければ終了しない
+    assert np.isinf(required_iterations(0.0, 3, 0.99))
+
+
+def test_monotonic():
+    ratios = np.linspace(0.05, 0.95, 10)
+    needed = required_iterations(ratios, 2, 0.999)
+    assert np.all(np.diff(needed) <= 0)
+
+
+def test_invalid_confidence():
+    with pytest.raises(ValueError):
+        required_iterations(0.5, 3, 1.0)
@@ -0,0 +1,36 @@
+import numpy as np
+import pytest
+
+from ply_processor_basics.points.ransac.run_hypotheses import run_hypotheses
+
+rng = np.random.default_rng(0)
+test_scores = rng.integers(0, 1000, size=500).astype(np.float64)
+
+
+def score(start, stop):
+    return test_scores[start:stop]
+
+
+@pytest.mark.parametrize("batch_size", [1, 7, 64, 1000])
+@pytest.mark.parametrize("workers", [1, 4])
+def test_all_hypotheses(batch_size, workers):
+    scores = run_hypotheses(score, len(test_scores), batch_size=batch_size, workers=workers)
+    assert np.array_equal(scores, test_scores)
+
+
+@pytest.mark.parametrize("batch_size", [1, 7, 64, 1000])
+@pytest.mark.parametrize("workers", [1, 4])
+def test_adaptive_independent_of_partition(batch_size, workers):
+    # 逐次評価(batch_size=1, workers=1)と同じ位置で終了する
+    def inlier_ratio(i, s):
+        return s / 1000
+
+    expected = run_hypotheses(score, len(test_scores), 1, 1, 0.99, 3, inlier_ratio)
+    scores = run_hypotheses(score, len(test_scores), batch_size, workers, 0.99, 3, inlier_ratio)
+    assert 0 < len(expected) < len(test_scores)
+    assert np.array_equal(scores, expected)
+
+
+def test_confidence_requires_inlier_ratio():
+    with pytest.raises(ValueError):
+        run_hypotheses(score, len(test_scores), confidence=0.99)
@@ -0,0 +1,81 @@
+import numpy as np
+import pytest
+
+from ply_processor_basics.io import PlyChunks, write_ply
+from ply_processor_basics.points import clip_by_plane, get_distances_to_plane, get_normal_vector
+from ply_processor_basics.points.ransac.detect_plane import Plane
+from ply_processor_basics.points.stream import clip_by_plane as stream_clip_by_plane
+from ply_processor_basics.points.stream import (
+    count_plane_inliers,
+    filter_by_plane,
+    get_mean_and_covariance,
+)
+from ply_processor_basics.points.stream import get_normal_vector as stream_get_normal_vector
+
+rng = np.random.default_rng(0)
+# 平面 z = 0.1x + 100 付近の点と一様なノイズ
+plane_points = rng.uniform(-50, 50, (3000, 3))
+plane_points[:, 2] = 0.1 * plane_points[:, 0] + 100 + rng.normal(0, 0.05, 3000)
+test_points = np.concatenate([plane_points, rng.uniform(-50, 150, (1000, 3))])
+test_plane = np.array([0.1, 0, -1, 100])
+
+
+def split(points, chunk_size):
+    return [points[start : start + chunk_size] for start in range(0, len(points), chunk_size)]
+
+
+@pytest.mark.parametrize("format", ["binary_little_endian", "ascii"])
+def test_ply_chunks(tmp_path, format):
+    path = str(tmp_path / "points.ply")
+    write_ply(path, test_points, format=format)
+    chunks = PlyChunks(path, chunk_size=1500)
+    assert len(chunks) == len(test_points)
+    # 何度でも反復できる
+    for _ in range(2):
+        loaded = list(chunks)
+        assert [len(chunk) for chunk in loaded] == [1500, 1500, 1000]
+        assert np.array_equal(np.concatenate(loaded), test_points)
+
+
+def test_filter_by_plane():
+    filtered = np.concatenate(list(filter_by_plane(split(test_points, 700), test_plane, 0.2)))
+    expected = test_points[get_distances_to_plane(test_points, test_plane) <= 0.2]
+    assert np.array_equal(filtered, expected)
+
+
+@pytest.mark.parametrize("invert", [False, True])
+def test_clip_by_plane(invert):
+    chunks = split(test_points, 700)
+    clipped = np.concatenate(list(stream_clip_by_plane(chunks, test_plane, invert=invert)))
+    assert np.array_equal(clipped, clip_by_plane(test_points, test_plane, invert=invert))
+
+    with pytest.raises(ValueError):
+        stream_clip_by_plane(iter(chunks), test_plane)
+
+
+def test_mean_and_covariance():
+    points = test_points + 1e6
+    mean, cov, count = get_mean_and_covariance(split(points, 333))
+    assert count == len(points)
+    assert np.allclose(mean, np.mean(points, axis=0))
+    assert np.allclose(cov, np.cov(points.T))
+
+
+def test_normal_vector():
+    normal = stream_get_normal_vector(split(plane_points, 500))
+    expected = get_normal_vector(plane_points)
+    assert np.allclose(normal, expected, atol=1e-8) or np.allclose(normal, -expected, atol=1e-8)
+
+
+def test_count_plane_inliers(tmp_path):
+    path = str(tmp_path / "points.ply")
+    write_ply(path, test_points)
+    plane_models = np.array([test_plane, 2 * test_plane, [0, 0, 1, 0], [0, 0, 0, 1]])
+    counts = count_plane_inliers(PlyChunks(path, chunk_size=1000), plane_models, 0.2, chunk_size=300)
+
+    normals = plane_models[:3, :3] / np.linalg.norm(plane_models[:3, :3], axis=1)[:, np.newaxis]
+    offsets = plane_models[:3, 3] / np.linalg.norm(plane_models[:3, :3], axis=1)
+    expected = Plane.count_inliers(test_points, normals, offsets, 0.2)
+    assert np.array_equal(counts[:3], expected)
+    assert counts[0] == counts[1]
+    assert counts[3] == -1
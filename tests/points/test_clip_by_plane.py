@@ -1,5 +1,7 @@
 import numpy as np
+import pytest
 
+from ply_processor_basics.points import clip_by_planes
 from ply_processor_basics.points.clip_by_plane import clip_by_plane
 
 
@@ -11,3 +13,16 @@ def test_simple():
 
     clipped = clip_by_plane(points, plane_eq, invert=True)
     assert clipped.shape[0] == 1
+
+
+@pytest.mark.parametrize("invert", [False, True])
+def test_clip_by_planes(invert):
+    rng = np.random.default_rng(0)
+    points = rng.uniform(-10, 10, (3000, 3))
+    plane_eqs = np.concatenate([rng.normal(size=(6, 3)), rng.uniform(-5, 5, (6, 1))], axis=1)
+    # c = 0 の平面を含める
+    plane_eqs[0, 2] = 0
+    clipped = clip_by_planes(points, plane_eqs, invert=invert, chunk_size=700)
+    assert len(clipped) == len(plane_eqs)
+    for k, plane_eq in enumerate(plane_eqs):
+        assert np.array_equal(clipped[k], clip_by_plane(points, plane_eq, invert=invert))
@@ -2,7 +2,7 @@ import numpy as np
 import open3d as o3d
 import pytest
 
-from ply_processor_basics.points import plane_clustering
+from ply_processor_basics.points import PointIndex, grid_clustering, plane_clustering
 from ply_processor_basics.points.ransac import detect_plane
 
 
@@ -34,3 +34,68 @@ def test_visualize(plypath):
         pcd.paint_uniform_color([np.random.rand(), np.random.rand(), np.random.rand()])
         pcds.append(pcd)
     o3d.visualization.draw_geometries(pcds)
+
+
+test_rng = np.random.default_rng(0)
+test_points = np.vstack(
+    [test_rng.normal(center, 2, (size, 2)) for center, size in [((0, 0), 300), ((20, 0), 800), ((0, 25), 500)]]
+    + [test_rng.uniform(-10, 35, (150, 2))]
+)
+
+
+@pytest.mark.parametrize("eps, min_samples", [(0.5, 5), (1.0, 10), (3.0, 3)])
+def test_grid_same_as_dbscan(eps, min_samples):
+    expected = plane_clustering(test_points, eps=eps, min_samples=min_samples)
+    clusters = plane_clustering(test_points, eps=eps, min_samples=min_samples, algorithm="grid")
+    assert len(clusters) == len(expected)
+    for cluster, expected_cluster in zip(clusters, expected):
+        assert np.array_equal(cluster, expected_cluster)
+
+
+def test_unknown_algorithm():
+    with pytest.raises(ValueError):
+        plane_clustering(test_points, eps=1.0, min_samples=10, algorithm="optics")
+
+
+def test_sorted_by_size():
+    clusters = plane_clustering(test_points, eps=2.0, min_samples=10)
+    sizes = [len(cluster) for cluster in clusters]
+    assert len(clusters) == 3
+    assert sizes == sorted(sizes, reverse=True)
+    # 全クラスタの点は重複しない
+    assert len(np.unique(np.concatenate(clusters))) == sum(sizes)
+
+
+def test_precomputed_neighbors():
+    neighbors = PointIndex(test_points).neighbors(1.0)
+    expected = plane_clustering(test_points, eps=1.0, min_samples=10, n_jobs=2)
+    clusters = plane_clustering(test_points, eps=1.0, min_samples=10, neighbors=neighbors)
+    assert len(clusters) == len(expected)
+    for cluster, expected_cluster in zip(clusters, expected):
+        assert np.array_equal(cluster, expected_cluster)
+
+
+def test_grid_clustering():
+    rng = np.random.default_rng(0)
+    # 2つの島と孤立点
+    points = np.vstack(
+        [rng.uniform(0, 10, (2000, 2)), rng.uniform(20, 25, (500, 2)), np.array([[40.0, 40.0], [41.0, 41.0]])]
+    )
+    clusters = grid_clustering(points, cell=1.0, min_points=5)
+    assert len(clusters) == 2
+    assert np.array_equal(clusters[0], np.arange(2000))
+    assert np.array_equal(clusters[1], np.arange(2000, 2500))
+
+    # 対角に隣接するマスは同じクラスタ
+    clusters = grid_clustering(np.array([[0.5, 0.5], [1.5, 1.5], [5.5, 5.5]]), cell=1.0)
+    assert [len(cluster) for cluster in clusters] == [2, 1]
+
+
+@pytest.mark.parametrize("plypath", ["data/samples/sample_clustering.ply"])
+def test_grid_clustering_sample(plypath):
+    pcd = o3d.io.read_point_cloud(plypath)
+    points = np.asarray(pcd.points)
+    inliers, plane_model = detect_plane(points, threshold=1.0, seed=0)
+    clusters = grid_clustering(points[inliers][:, :2], cell=5.0, min_points=100)
+    expected = plane_clustering(points[inliers], eps=10.0)
+    assert len(clusters) == len(expected) == 2
@@ -0,0 +1,45 @@
+import numpy as np
+import open3d as o3d
+import pytest
+
+from ply_processor_basics.points import PointIndex, estimate_normals, get_normal_vector
+
+
+def test_plane() -> None:
+    rng = np.random.default_rng(0)
+    normal = np.array([1.0, 2.0, 2.0]) / 3
+    u = np.cross(normal, [1, 0, 0])
+    u /= np.linalg.norm(u)
+    v = np.cross(normal, u)
+    coords = rng.uniform(-10, 10, (2000, 2))
+    points = coords[:, :1] * u + coords[:, 1:] * v + rng.normal(0, 1e-3, (2000, 1)) * normal
+    normals = estimate_normals(points, k=20, chunk_size=300)
+    assert normals.shape == points.shape
+    assert np.allclose(np.abs(np.dot(normals, normal)), 1.0, atol=1e-3)
+    assert np.allclose(np.abs(np.dot(get_normal_vector(points), normal)), 1.0, atol=1e-6)
+
+
+def test_sphere() -> None:
+    rng = np.random.default_rng(0)
+    points = rng.normal(size=(5000, 3))
+    points /= np.linalg.norm(points, axis=1)[:, np.newaxis]
+    normals = estimate_normals(points, PointIndex(points), k=10)
+    # 球面の法線は動径方向
+    assert np.all(np.abs(np.einsum("ij,ij->i", normals, points)) > 0.99)
+
+
+@pytest.mark.parametrize("plypath", ["data/samples/sample.ply"])
+def test_same_as_open3d(plypath) -> None:
+    pcd = o3d.io.read_point_cloud(plypath)
+    points = np.asarray(pcd.points)
+    pcd.estimate_normals(o3d.geometry.KDTreeSearchParamKNN(30))
+    normals = estimate_normals(points, k=30)
+    # 法線の向き(符号)は問わない
+    assert np.percentile(np.abs(np.einsum("ij,ij->i", normals, np.asarray(pcd.normals))), 1) > 0.999
+
+
+def test_float32() -> None:
+    points = np.random.default_rng(0).uniform(-10, 10, (1000, 3))
+    normals32 = estimate_normals(points.astype(np.float32), k=10)
+    assert normals32.dtype == np.float32
+    assert np.allclose(np.abs(np.einsum("ij,ij->i", normals32, estimate_normals(points, k=10))), 1.0, atol=1e-3)
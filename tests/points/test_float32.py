@@ -0,0 +1,101 @@
+import numpy as np
+import pytest
+
+from ply_processor_basics.points import (
+    clip_by_plane,
+    clip_by_planes,
+    convex_hull,
+    get_distances_to_line,
+    get_distances_to_lines,
+    get_distances_to_plane,
+    get_distances_to_planes,
+    get_nearest_plane,
+    get_normal_vector,
+    rotate_euler,
+    transform_to_plane_coordinates,
+    voxel_downsample,
+)
+from ply_processor_basics.points.ransac import detect_line, detect_plane
+
+# float32の点群はfloat32のまま計算し、float64と許容誤差内で一致する
+rng = np.random.default_rng(0)
+points64 = rng.uniform(-100, 100, (20000, 3))
+points32 = points64.astype(np.float32)
+plane_model = np.array([0.3, -0.4, 1.0, 12.0])
+plane_models = np.concatenate([rng.normal(size=(6, 3)), rng.uniform(-10, 10, (6, 1))], axis=1)
+line_model = np.array([[1.0, 2.0, 3.0], [0.2, 1.0, -0.5]])
+line_models = np.stack([rng.uniform(-50, 50, (6, 3)), rng.normal(size=(6, 3))], axis=1)
+
+ATOL = 1e-3
+
+
+@pytest.mark.parametrize(
+    "function",
+    [
+        lambda points: get_distances_to_plane(points, plane_model),
+        lambda points: get_distances_to_plane(points, plane_model, max_distance=5.0),
+        lambda points: get_distances_to_planes(points, plane_models),
+        lambda points: get_nearest_plane(points, plane_models)[1],
+        lambda points: get_distances_to_line(points, line_model[0], line_model[1]),
+        lambda points: get_distances_to_line(points, line_model[0], line_model[1], max_distance=5.0),
+        lambda points: get_distances_to_lines(points, line_models),
+        lambda points: transform_to_plane_coordinates(points, np.array([1.0, 2.0, 3.0]), plane_model[:3])[0],
+        lambda points: rotate_euler(points, np.array([0.1, 0.2, 0.3])),
+        lambda points: voxel_downsample(points, 5.0)[0],
+    ],
+)
+def test_agreement(function) -> None:
+    result32 = function(points32)
+    result64 = function(points64)
+    assert result32.dtype == np.float32
+    assert result64.dtype == np.float64
+    assert result32.shape == result64.shape
+    finite = np.isfinite(result64)
+    # 距離閾値の境界付近の点はinfになるかが変わりうる
+    assert np.count_nonzero(np.isfinite(result32) != finite) <= 5
+    both = finite & np.isfinite(result32)
+    assert np.allclose(result32[both], result64[both], atol=ATOL)
+
+
+def test_nearest_plane_labels() -> None:
+    labels32, distances32 = get_nearest_plane(points32, plane_models)
+    labels64, distances64 = get_nearest_plane(points64, plane_models)
+    # 距離がほぼ等しい点以外は同じ平面を選ぶ
+    differ = labels32 != labels64
+    gaps = np.abs(get_distances_to_planes(points64, plane_models)[differ, labels32[differ]] - distances64[differ])
+    assert np.all(gaps < ATOL)
+
+
+def test_clip() -> None:
+    clipped32 = clip_by_plane(points32, plane_model)
+    clipped64 = clip_by_plane(points64, plane_model)
+    assert clipped32.dtype == np.float32
+    # 平面上の境界付近の点以外は一致する
+    assert abs(len(clipped32) - len(clipped64)) <= 5
+    for k, clipped in enumerate(clip_by_planes(points32, plane_models)):
+        assert clipped.dtype == np.float32
+        assert abs(len(clipped) - len(clip_by_plane(points64, plane_models[k]))) <= 5
+
+
+def test_normal_vector() -> None:
+    # 原点から遠いfloat32の点群でも重心と共分散はfloat64で累積する
+    plane_points = rng.uniform(-10, 10, (20000, 3))
+    plane_points[:, 2] = 0.5 * plane_points[:, 0]
+    plane_points32 = (plane_points + 1000).astype(np.float32)
+    normal32 = get_normal_vector(plane_points32)
+    normal64 = get_normal_vector(plane_points + 1000)
+    assert np.allclose(np.abs(np.dot(normal32, normal64)), 1.0, atol=1e-6)
+
+
+@pytest.mark.parametrize("recursive", [True, False])
+def test_ransac_models_are_float64(recursive) -> None:
+    # 点群がfloat32でもモデルのパラメータはfloat64で返す
+    line_points = np.outer(np.linspace(0, 10, 500), [0.6, 0.8, 0.0]) + rng.normal(0, 0.01, (500, 3))
+    plane_points = np.c_[rng.uniform(0, 10, (500, 2)), rng.normal(0, 0.01, 500)]
+    _, line = detect_line(line_points.astype(np.float32), 0.1, recursive=recursive, seed=0)
+    _, plane = detect_plane(plane_points.astype(np.float32), 0.1)
+    disk_points = plane_points[np.linalg.norm(plane_points[:, :2] - 5, axis=1) < 4]
+    _, center, normal, _ = convex_hull.detect_circle(disk_points.astype(np.float32), np.array([0, 0, 1, 0.0]), seed=0)
+    assert line is not None and line.dtype == np.float64
+    assert plane is not None and plane.dtype == np.float64
+    assert center.dtype == np.float64 and normal.dtype == np.float64
@@ -1,9 +1,10 @@
 import math
 
 import numpy as np
+import pytest
 from pytest import approx
 
-from ply_processor_basics.points import get_distances_to_line
+from ply_processor_basics.points import PointIndex, get_distances_to_line
 
 
 def test_simple():
@@ -12,3 +13,23 @@ def test_simple():
     line_vector = np.array([1, 1, 1], dtype=np.float64)
     distances = get_distances_to_line(points, line_point, line_vector)
     assert distances == approx([0, math.sqrt(6) / 3, math.sqrt(6) / 3, math.sqrt(6) / 3, 0])
+
+
+@pytest.mark.parametrize("voxel_size", [None, 0.7])
+def test_max_distance(voxel_size):
+    points = np.random.default_rng(0).uniform(-10, 10, (2000, 3))
+    line_point = np.array([1.0, 0.0, -2.0])
+    line_vector = np.array([1.0, 1.0, 0.5])
+    expected = get_distances_to_line(points, line_point, line_vector)
+    expected[expected > 2.0] = np.inf
+    index = PointIndex(points, voxel_size=voxel_size)
+    distances = get_distances_to_line(points, line_point, line_vector, index=index, max_distance=2.0)
+    assert np.array_equal(distances, expected)
+
+
+@pytest.mark.parametrize("n_index_points", [500, 3000])
+def test_index_mismatch(n_index_points):
+    points = np.random.default_rng(0).uniform(-10, 10, (1000, 3))
+    index = PointIndex(np.random.default_rng(1).uniform(-10, 10, (n_index_points, 3)), voxel_size=0.7)
+    with pytest.raises(ValueError):
+        get_distances_to_line(points, np.zeros(3), np.array([1.0, 0.0, 0.0]), index=index, max_distance=0.5)
@@ -0,0 +1,41 @@
+import numpy as np
+import pytest
+
+from ply_processor_basics.points import get_distances_to_line, get_distances_to_lines
+
+rng = np.random.default_rng(0)
+test_points = rng.uniform(-100, 100, (5000, 3))
+test_lines = np.stack([rng.uniform(-100, 100, (8, 3)), rng.normal(size=(8, 3))], axis=1)
+
+
+@pytest.mark.parametrize("chunk_size", [700, 8192])
+def test_get_distances_to_lines(chunk_size) -> None:
+    distances = get_distances_to_lines(test_points, test_lines, chunk_size=chunk_size)
+    assert distances.shape == (len(test_points), len(test_lines))
+    for k, (line_point, line_vector) in enumerate(test_lines):
+        assert np.allclose(distances[:, k], get_distances_to_line(test_points, line_point, line_vector), atol=1e-6)
+
+    squared = get_distances_to_lines(test_points, test_lines, squared=True)
+    assert np.allclose(squared, distances**2)
+
+    out = np.empty_like(distances)
+    assert get_distances_to_lines(test_points, test_lines, out=out) is out
+    assert np.array_equal(out, get_distances_to_lines(test_points, test_lines))
+
+
+def test_large_coordinates() -> None:
+    # 原点から遠い点群でも桁落ちしない
+    offset = np.array([1e6, -2e6, 5e5])
+    distances = get_distances_to_lines(test_points + offset, test_lines + [offset, np.zeros(3)])
+    assert np.allclose(distances, get_distances_to_lines(test_points, test_lines), atol=1e-6)
+
+
+def test_float32() -> None:
+    distances = get_distances_to_lines(test_points.astype(np.float32), test_lines)
+    assert distances.dtype == np.float32
+    assert np.allclose(distances, get_distances_to_lines(test_points, test_lines), atol=1e-3)
+
+
+def test_zero_vector() -> None:
+    with pytest.raises(ZeroDivisionError):
+        get_distances_to_lines(test_points, np.array([[[0, 0, 0], [0, 0, 0]]]))
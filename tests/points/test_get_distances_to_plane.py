@@ -1,7 +1,8 @@
 import numpy as np
+import pytest
 from pytest import approx
 
-from ply_processor_basics.points import get_distances_to_plane
+from ply_processor_basics.points import PointIndex, get_distances_to_plane
 
 
 def test_get_distances_to_plane_success() -> None:
@@ -9,3 +10,22 @@ def test_get_distances_to_plane_success() -> None:
     plane_model = np.array([0, 0, 1, 0])
     distances = get_distances_to_plane(points, plane_model)
     assert distances == approx([0, 0, 0, 1])
+
+
+@pytest.mark.parametrize("voxel_size", [None, 0.7])
+def test_max_distance(voxel_size) -> None:
+    points = np.random.default_rng(0).uniform(-10, 10, (2000, 3))
+    plane_model = np.array([1.0, 2.0, 2.0, -3.0])
+    expected = get_distances_to_plane(points, plane_model)
+    expected[expected > 1.0] = np.inf
+    index = PointIndex(points, voxel_size=voxel_size)
+    distances = get_distances_to_plane(points, plane_model, index=index, max_distance=1.0)
+    assert np.array_equal(distances, expected)
+
+
+@pytest.mark.parametrize("n_index_points", [500, 3000])
+def test_index_mismatch(n_index_points) -> None:
+    points = np.random.default_rng(0).uniform(-10, 10, (1000, 3))
+    index = PointIndex(np.random.default_rng(1).uniform(-10, 10, (n_index_points, 3)), voxel_size=0.7)
+    with pytest.raises(ValueError):
+        get_distances_to_plane(points, np.array([0.0, 0.0, 1.0, 0.0]), index=index, max_distance=0.5)
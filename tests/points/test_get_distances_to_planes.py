@@ -0,0 +1,36 @@
+import numpy as np
+import pytest
+
+from ply_processor_basics.points import get_distances_to_plane, get_distances_to_planes, get_nearest_plane
+
+rng = np.random.default_rng(0)
+test_points = rng.uniform(-10, 10, (5000, 3))
+test_planes = np.concatenate([rng.normal(size=(8, 3)), rng.uniform(-5, 5, (8, 1))], axis=1)
+
+
+@pytest.mark.parametrize("chunk_size", [700, 65536])
+def test_get_distances_to_planes(chunk_size) -> None:
+    distances = get_distances_to_planes(test_points, test_planes, chunk_size=chunk_size)
+    assert distances.shape == (len(test_points), len(test_planes))
+    for k, plane_model in enumerate(test_planes):
+        assert np.allclose(distances[:, k], get_distances_to_plane(test_points, plane_model))
+
+    out = np.empty_like(distances)
+    assert get_distances_to_planes(test_points, test_planes, out=out) is out
+    assert np.array_equal(out, get_distances_to_planes(test_points, test_planes))
+
+    with pytest.raises(ValueError):
+        get_distances_to_planes(test_points, np.array([[0, 0, 0, 1]]))
+
+
+@pytest.mark.parametrize("max_distance", [None, 0.5])
+def test_get_nearest_plane(max_distance) -> None:
+    labels, distances = get_nearest_plane(test_points, test_planes, max_distance=max_distance, chunk_size=700)
+    all_distances = get_distances_to_planes(test_points, test_planes)
+    expected_labels = np.argmin(all_distances, axis=1)
+    expected_distances = np.min(all_distances, axis=1)
+    if max_distance is not None:
+        expected_labels[expected_distances > max_distance] = -1
+        expected_distances[expected_distances > max_distance] = np.inf
+    assert np.array_equal(labels, expected_labels)
+    assert np.array_equal(distances, expected_distances)
@@ -0,0 +1,48 @@
+import numpy as np
+import pytest
+
+from ply_processor_basics.points import PointIndex, line_clustering, plane_clustering
+
+rng = np.random.default_rng(0)
+test_points = rng.uniform(-10, 10, (3000, 3))
+
+
+@pytest.mark.parametrize("voxel_size", [None, 1.5])
+def test_query_radius(voxel_size):
+    index = PointIndex(test_points, voxel_size=voxel_size)
+    center = np.array([1.0, -2.0, 0.5])
+    distances = np.linalg.norm(test_points - center, axis=1)
+    assert np.array_equal(index.query_radius(center, 4.0), np.where(distances <= 4.0)[0])
+    assert np.array_equal(index.query_radius(center, 4.0, strict=True), np.where(distances < 4.0)[0])
+
+
+@pytest.mark.parametrize("voxel_size", [None, 1.5])
+def test_query_box(voxel_size):
+    index = PointIndex(test_points, voxel_size=voxel_size)
+    lower = np.array([-3.0, 0.0, -8.0])
+    upper = np.array([2.0, 9.0, -1.0])
+    expected = np.where(np.all((test_points >= lower) & (test_points <= upper), axis=1))[0]
+    assert np.array_equal(index.query_box(lower, upper), expected)
+
+
+def test_neighbors_cached():
+    index = PointIndex(test_points)
+    graph = index.neighbors(1.0)
+    assert graph.shape == (len(test_points), len(test_points))
+    assert index.neighbors(1.0) is graph
+
+
+def test_clustering_with_index():
+    # 2つの離れた点群
+    points = np.vstack([rng.normal(0, 1, (300, 3)), rng.normal(20, 1, (200, 3))])
+    expected = line_clustering(points, eps=1.0, min_samples=5)
+    clusters = line_clustering(points, eps=1.0, min_samples=5, index=PointIndex(points))
+    assert len(clusters) == len(expected)
+    for cluster, expected_cluster in zip(clusters, expected):
+        assert np.array_equal(cluster, expected_cluster)
+
+    expected = plane_clustering(points, eps=1.0, min_samples=5)
+    clusters = plane_clustering(points, eps=1.0, min_samples=5, index=PointIndex(points[:, :2]))
+    assert len(clusters) == len(expected)
+    for cluster, expected_cluster in zip(clusters, expected):
+        assert np.array_equal(cluster, expected_cluster)
@@ -22,3 +22,33 @@ def test_simple_with_translate() -> None:
     assert points[0] == approx([0, 1, 0])
     assert points[1] == approx([0, 0, -1])
     assert points[2] == approx([-1, 0, 0])
+
+
+def test_inverse_and_out() -> None:
+    rng = np.random.default_rng(0)
+    points = rng.uniform(-100, 100, (1000, 3))
+    origin = np.array([10.0, -5.0, 3.0])
+    normal = np.array([1.0, 2.0, 3.0])
+    transformed, inv_matrix = transform_to_plane_coordinates(points, origin, normal)
+    # 原点は(0, 0, 0)に, 法線方向はZ軸に移る
+    assert transform_to_plane_coordinates(origin[np.newaxis], origin, normal)[0][0] == approx([0, 0, 0], abs=1e-12)
+    assert transform_to_plane_coordinates((origin + normal)[np.newaxis], origin, normal)[0][0] == approx(
+        [0, 0, np.linalg.norm(normal)]
+    )
+    # 逆変換行列で元の点群に戻る
+    restored = np.dot(inv_matrix[:3, :3], transformed.T).T + inv_matrix[:3, 3]
+    assert np.allclose(restored, points)
+
+    out = np.empty_like(points)
+    result, _ = transform_to_plane_coordinates(points, origin, normal, out=out)
+    assert result is out
+    assert np.array_equal(out, transformed)
+
+
+def test_float32() -> None:
+    points = np.random.default_rng(0).uniform(-100, 100, (1000, 3))
+    origin = np.array([10.0, -5.0, 3.0])
+    normal = np.array([1.0, 2.0, 3.0])
+    transformed, _ = transform_to_plane_coordinates(points.astype(np.float32), origin, normal)
+    assert transformed.dtype == np.float32
+    assert np.allclose(transformed, transform_to_plane_coordinates(points, origin, normal)[0], atol=1e-3)
@@ -0,0 +1,32 @@
+import numpy as np
+import pytest
+
+from ply_processor_basics.points import voxel_downsample
+
+
+def test_centroid():
+    points = np.array([[0.1, 0.1, 0.1], [0.3, 0.5, 0.1], [1.2, 0.1, 0.1], [0.9, 0.9, 0.9], [-0.5, 0.0, 0.0]])
+    downsampled, voxel_ids = voxel_downsample(points, 1.0)
+    assert len(downsampled) == 3
+    # 各点のボクセルの重心は元の点と同じボクセルに属する
+    assert np.array_equal(np.floor(downsampled[voxel_ids]), np.floor(points))
+    assert np.allclose(downsampled[voxel_ids[0]], [1.3 / 3, 1.5 / 3, 1.1 / 3])
+
+
+def test_first():
+    rng = np.random.default_rng(0)
+    points = rng.uniform(-5, 5, (1000, 3))
+    downsampled, voxel_ids = voxel_downsample(points, 2.0, method="first")
+    # 代表点はボクセル内で最初に現れる点
+    for voxel, point in enumerate(downsampled):
+        assert np.array_equal(point, points[np.where(voxel_ids == voxel)[0][0]])
+
+
+@pytest.mark.parametrize("voxel_size", [0.5, 2.0])
+def test_mapping(voxel_size):
+    rng = np.random.default_rng(0)
+    points = rng.uniform(-10, 10, (5000, 3)).astype(np.float32)
+    downsampled, voxel_ids = voxel_downsample(points, voxel_size)
+    assert downsampled.dtype == np.float32
+    assert len(downsampled) == len(np.unique(np.floor(points / voxel_size), axis=0))
+    assert np.allclose(downsampled, [points[voxel_ids == v].mean(axis=0) for v in range(len(downsampled))], atol=1e-5)
@@ -0,0 +1,41 @@
+import subprocess
+import sys
+
+import pytest
+
+# numpyを除いたパッケージの読み込み時間の上限(秒)
+IMPORT_BUDGET = 0.5
+
+HEAVY_MODULES = ("scipy", "sklearn", "open3d")
+
+
+@pytest.mark.parametrize(
+    "statement",
+    [
+        "from ply_processor_basics.points import get_distances_to_plane",
+        "import ply_processor_basics.points",
+        "import ply_processor_basics.points.ransac",
+        "import ply_processor_basics.points.stream",
+        "import ply_processor_basics.io",
+        "import ply_processor_basics.matrix",
+        "import ply_processor_basics.pcd",
+        "import ply_processor_basics.stl",
+        "import ply_processor_basics.vector",
+    ],
+)
+def test_lazy_import(statement):
+    # 読み込み済みのモジュールの影響を受けないよう、別プロセスで計測する
+    script = "\n".join(
+        [
+            "import sys, time",
+            "import numpy",
+            "start = time.perf_counter()",
+            statement,
+            "print(time.perf_counter() - start)",
+            f"print(','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))",
+        ]
+    )
+    result = subprocess.run([sys.executable, "-c", script], capture_output=True, text=True, check=True)
+    elapsed, loaded = result.stdout.splitlines()
+    assert loaded == ""
+    assert float(elapsed) < IMPORT_BUDGET
@@ -1,7 +1,12 @@
 import numpy as np
 import pytest
 
-from ply_processor_basics.vector import ensure_consistent_direction, estimate_vector
+from ply_processor_basics.vector import (
+    ensure_consistent_direction,
+    ensure_consistent_directions,
+    estimate_vector,
+    estimate_vectors,
+)
 
 
 @pytest.mark.parametrize(
@@ -27,3 +32,58 @@ def test_estimate_vector(vector_samples):
     vector_samples = ensure_consistent_direction(vector_samples)
     estimated = estimate_vector(vector_samples)
     assert np.allclose(estimated, [0.577, 0.577, 0.577], 1e-2) or np.allclose(estimated, [-0.577, -0.577, -0.577], 1e-2)
+
+
+def test_estimate_vectors():
+    rng = np.random.default_rng(0)
+    sizes = rng.integers(3, 30, 200)
+    group_ids = np.repeat(np.arange(200), sizes)
+    rng.shuffle(group_ids)
+    directions = rng.normal(size=(200, 3))
+    vector_samples = directions[group_ids] + rng.normal(0, 0.1, (len(group_ids), 3))
+    # 外れ値を混ぜる
+    outliers = rng.random(len(group_ids)) < 0.1
+    vector_samples[outliers] = rng.normal(size=(np.count_nonzero(outliers), 3))
+
+    estimated = estimate_vectors(vector_samples, group_ids)
+    assert estimated.shape == (200, 3)
+    for group in range(200):
+        assert np.allclose(estimated[group], estimate_vector(vector_samples[group_ids == group]))
+
+    # ベクトルを含まないグループはnan
+    estimated = estimate_vectors(vector_samples, group_ids, n_groups=201)
+    assert np.all(np.isnan(estimated[200]))
+
+
+def test_estimate_vectors_small_groups():
+    # 1点・2点のグループでは丸め誤差で全点が外れ値とならないこと
+    rng = np.random.default_rng(0)
+    sizes = np.tile([1, 2], 2500)
+    group_ids = np.repeat(np.arange(len(sizes)), sizes)
+    vector_samples = rng.normal(size=(len(group_ids), 3))
+    unit_samples = vector_samples / np.linalg.norm(vector_samples, axis=1)[:, np.newaxis]
+    expected = np.column_stack([np.bincount(group_ids, weights=unit_samples[:, i]) for i in range(3)])
+    expected /= np.linalg.norm(expected, axis=1)[:, np.newaxis]
+
+    estimated = estimate_vectors(vector_samples, group_ids)
+    assert not np.any(np.isnan(estimated))
+    assert np.allclose(estimated, expected)
+    for group in range(0, len(sizes), 50):
+        assert np.allclose(estimate_vector(vector_samples[group_ids == group]), expected[group])
+
+
+def test_ensure_consistent_directions():
+    rng = np.random.default_rng(0)
+    group_ids = rng.integers(0, 50, 1000)
+    samples = rng.normal(size=(1000, 3))
+    consistent = ensure_consistent_directions(samples, group_ids)
+    references = rng.normal(size=(50, 3))
+    consistent_to_reference = ensure_consistent_directions(samples, group_ids, references)
+    for group in range(50):
+        in_group = group_ids == group
+        assert np.array_equal(consistent[in_group], ensure_consistent_direction(samples[in_group]))
+        assert np.array_equal(
+            consistent_to_reference[in_group], ensure_consistent_direction(samples[in_group], references[group])
+        )
+    # 入力は変更しない
+    assert not np.array_equal(samples, consistent)